@@ -0,0 +1,9 @@
+"""Kept so ``uvicorn asgi_app:app`` keeps working; see ``autoreqpy.asgi``."""
+import os
+
+from autoreqpy.asgi import app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "8000")))
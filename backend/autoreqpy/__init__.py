@@ -0,0 +1,8 @@
+"""AutoReqPy: generate a minimal requirements.txt for a Python project.
+
+Importing the package loads nothing else. The command line lives in
+``autoreqpy.cli``, local analysis in ``autoreqpy.pipeline``, repository
+analysis in ``autoreqpy.remote``, and the Flask and ASGI apps in
+``autoreqpy.server`` and ``autoreqpy.asgi``.
+"""
+__version__ = "0.1.0"
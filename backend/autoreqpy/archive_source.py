@@ -0,0 +1,291 @@
+"""Python sources read from a repository's source archive.
+
+Forges serve a tarball or zip of any commit over plain HTTP, which needs
+neither git nor a work tree. The archive is decompressed as it downloads:
+``.py`` members are kept in memory and every other member is skipped
+without being read, so nothing is ever written to disk.
+"""
+import logging
+import struct
+import tarfile
+import zlib
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from .scanner import is_pruned_path
+
+logger = logging.getLogger(__name__)
+
+# {url} is the repository URL without ".git"; GitLab, for example, serves
+# "{url}/-/archive/{ref}/{repo}-{ref}.tar.gz"
+DEFAULT_ARCHIVE_URL = "https://codeload.github.com/{owner}/{repo}/tar.gz/{ref}"
+
+CHUNK_SIZE = 64 * 1024
+# Progress is reported, and so the download size checked, once per step
+PROGRESS_STEP = 1024 * 1024
+
+_ZIP_LOCAL = b"PK\x03\x04"
+_ZIP_DESCRIPTOR = b"PK\x07\x08"
+# signature, version, flags, method, time, date, crc, compressed size,
+# size, name length, extra field length
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+_ZIP_ENCRYPTED = 0x01
+_ZIP_DATA_DESCRIPTOR = 0x08
+_ZIP_UTF8 = 0x800
+_ZIP_STORED, _ZIP_DEFLATED = 0, 8
+
+
+class ArchiveError(RuntimeError):
+    pass
+
+
+def archive_url(repo_url: str, ref: str = "HEAD", template: str = DEFAULT_ARCHIVE_URL) -> str:
+    """The archive URL of ``repo_url`` at ``ref``.
+
+    ``template`` may use ``{url}``, ``{owner}``, ``{repo}`` and ``{ref}``.
+    """
+    url = repo_url.rstrip("/").removesuffix(".git")
+    parts = urlsplit(url).path.rstrip("/").split("/")
+    return template.format(url=url, owner=parts[-2] if len(parts) > 1 else "", repo=parts[-1], ref=ref)
+
+
+class _Download:
+    """A response body that counts the bytes it delivers.
+
+    Bytes can be pushed back with ``unread()``, for sniffing the format and
+    for what a zip member's deflate stream read past its end.
+    """
+
+    def __init__(self, response, progress=None):
+        self._response = response
+        self._pushed = b""
+        self._progress = progress
+        self._next_report = PROGRESS_STEP
+        self.received = 0
+        self.files = 0
+
+    def read(self, size: int) -> bytes:
+        pushed, self._pushed = self._pushed, b""
+        if len(pushed) >= size:
+            self._pushed = pushed[size:]
+            return pushed[:size]
+        data = self._response.read(size - len(pushed))
+        # http.client returns b"" rather than raising when a body with a
+        # Content-Length is cut off; what it still expected is left in length
+        if not data and getattr(self._response, "length", None):
+            raise ArchiveError(f"download ended after {self.received} bytes, "
+                               f"{self._response.length} short of the archive's length")
+        self.received += len(data)
+        if self.received >= self._next_report:
+            self._next_report = self.received + PROGRESS_STEP
+            self.report()
+        return pushed + data
+
+    def unread(self, data: bytes):
+        self._pushed = data + self._pushed
+
+    def report(self):
+        # Shaped like git's progress, so Budget.watch_clone can stop the download
+        if self._progress is not None:
+            self._progress("receiving", self.files, 0, self.received)
+
+
+def _read_exactly(stream, size: int) -> bytes:
+    data = stream.read(size)
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            raise ArchiveError("archive ended unexpectedly")
+        data += more
+    return data
+
+
+def _skip(stream, size: int):
+    while size > 0:
+        chunk = stream.read(min(size, CHUNK_SIZE))
+        if not chunk:
+            raise ArchiveError("archive ended unexpectedly")
+        size -= len(chunk)
+
+
+def _tar_members(stream, wanted):
+    """``(name, content)`` of the wanted regular files of a tar stream."""
+    with tarfile.open(fileobj=stream, mode="r|*") as tar:
+        while True:
+            member = tar.next()
+            if member is None:
+                return
+            # A stream only ever needs the current member, but TarFile
+            # remembers every one it has seen
+            tar.members = []
+            if member.isfile() and wanted(member.name, member.size):
+                yield member.name, tar.extractfile(member).read()
+
+
+def _zip64_sizes(extra: bytes, size: int, compressed: int):
+    """``(size, compressed size, zip64)``, taking sizes the header left out from the zip64 field."""
+    offset = 0
+    while offset + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, offset)
+        if tag == 0x0001:
+            values = list(struct.unpack_from(f"<{length // 8}Q", extra, offset + 4))
+            if size == 0xFFFFFFFF and values:
+                size = values.pop(0)
+            if compressed == 0xFFFFFFFF and values:
+                compressed = values.pop(0)
+            return size, compressed, True
+        offset += 4 + length
+    return size, compressed, False
+
+
+def _inflate_to_end(stream, limit=None):
+    """Inflate a deflate stream whose length is unknown, pushing back what follows it.
+
+    Returns ``(content, size)``. Only up to ``limit`` bytes are kept (None
+    keeps everything); past that ``content`` is None and the rest is
+    inflated a chunk at a time, and thrown away, just to find the end.
+    """
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+    parts = []
+    size = 0
+    while not inflater.eof:
+        chunk = inflater.unconsumed_tail
+        if not chunk:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                raise ArchiveError("archive ended inside a compressed member")
+        # Bounding the output keeps a highly compressed member from
+        # inflating far past the limit within one chunk of input
+        data = inflater.decompress(chunk, CHUNK_SIZE)
+        size += len(data)
+        if parts is not None:
+            if limit is not None and size > limit:
+                parts = None
+            else:
+                parts.append(data)
+    stream.unread(inflater.unused_data)
+    return (b"".join(parts) if parts is not None else None), size
+
+
+def _zip_members(stream, wanted, room):
+    """``(name, content)`` of the wanted files of a zip stream.
+
+    Only the local headers are read, in order; the central directory at
+    the end, which a seekable reader would start from, is never needed.
+    ``room(name)`` is how many bytes of a member are worth keeping before
+    its size is known.
+    """
+    while True:
+        header = stream.read(_ZIP_LOCAL_HEADER.size)
+        if not header.startswith(_ZIP_LOCAL):
+            # The central directory, or a truncated archive
+            return
+        if len(header) < _ZIP_LOCAL_HEADER.size:
+            raise ArchiveError("archive ended unexpectedly")
+        _, _, flags, method, _, _, _, compressed, size, name_length, extra_length = _ZIP_LOCAL_HEADER.unpack(header)
+        name = _read_exactly(stream, name_length).decode("utf-8" if flags & _ZIP_UTF8 else "cp437")
+        size, compressed, zip64 = _zip64_sizes(_read_exactly(stream, extra_length), size, compressed)
+
+        if flags & _ZIP_DATA_DESCRIPTOR:
+            # The sizes follow the data, so the data has to be read to find its end
+            if method != _ZIP_DEFLATED or flags & _ZIP_ENCRYPTED:
+                # Only a deflate stream marks its own end; any other member can
+                # only be measured from the central directory, after everything
+                kind = ("encrypted" if flags & _ZIP_ENCRYPTED
+                        else "stored" if method == _ZIP_STORED else f"method {method}")
+                raise ArchiveError(f"cannot stream {name}, a {kind} zip member whose size only follows its data; "
+                                   "use FETCH_MODE=sparse, objects or full, or a tar.gz ARCHIVE_URL, instead")
+            content, size = _inflate_to_end(stream, room(name))
+            descriptor = _read_exactly(stream, 4)
+            _read_exactly(stream, (4 if descriptor == _ZIP_DESCRIPTOR else 0) + (16 if zip64 else 8))
+            # wanted() turns down, and notes, a member that outgrew its room
+            if wanted(name, size) and content is not None:
+                yield name, content
+            continue
+
+        readable = not flags & _ZIP_ENCRYPTED and method in (_ZIP_STORED, _ZIP_DEFLATED)
+        if not readable or not wanted(name, size):
+            _skip(stream, compressed)
+            continue
+        content = _read_exactly(stream, compressed)
+        if method == _ZIP_DEFLATED:
+            # Never inflate past the size the header declared; a max_length of 0 means no limit
+            content = zlib.decompressobj(-zlib.MAX_WBITS).decompress(content, size) if size else b""
+        yield name, content
+
+
+def _member_path(name: str, strip_components: int):
+    """The project-relative path of a member worth scanning, or None."""
+    parts = name.split("/")
+    if len(parts) <= strip_components:
+        return None
+    path = "/".join(parts[strip_components:])
+    if not path.endswith(".py") or is_pruned_path(path):
+        return None
+    return path
+
+
+def iter_python_sources(stream, select=None, strip_components: int = 1):
+    """Yield ``(path, content)`` for the non-pruned ``.py`` files of an archive stream.
+
+    Zip and tar archives, plain or gzip, bzip2 or xz compressed, are told
+    apart by their first bytes. ``strip_components`` leading directories are
+    dropped from member names, like ``tar --strip-components``; forges wrap
+    archives in one. ``select(path, size)``, when given, decides which
+    files are read; the others are skipped unread. Zip members whose size
+    is only known once they are inflated are held to ``select.room()``,
+    when ``select`` has it, while they are.
+    """
+    def wanted(name, size):
+        path = _member_path(name, strip_components)
+        return path is not None and (select is None or select(path, size))
+
+    def room(name):
+        if _member_path(name, strip_components) is None:
+            return 0
+        return select.room() if hasattr(select, "room") else None
+
+    magic = stream.read(len(_ZIP_LOCAL))
+    stream.unread(magic)
+    if magic == _ZIP_LOCAL:
+        members = _zip_members(stream, wanted, room)
+    else:
+        members = _tar_members(stream, wanted)
+    try:
+        for name, content in members:
+            yield _member_path(name, strip_components), content
+    except (tarfile.TarError, zlib.error, EOFError) as e:
+        raise ArchiveError(f"unreadable archive: {e}") from e
+
+
+def read_archive_sources(url: str, progress=None, budget=None, timeout=None, strip_components: int = 1,
+                         stats=None) -> list:
+    """``(path, content)`` of the Python files in the archive at ``url``.
+
+    ``progress(phase, files, total, bytes)`` is called as the download
+    proceeds, like the git progress callbacks; the wrapper from
+    ``Budget.watch_clone`` stops it once over the clone size limit. A
+    ``budgets.Budget`` also drops files before they are read. When given,
+    ``stats`` gets the ``bytes`` downloaded.
+    """
+    # urllib.request is slow to import and only this fetch mode needs it
+    import http.client
+    import urllib.request
+
+    request = urllib.request.Request(url, headers={"User-Agent": "autoreqpy"})
+    sources = []
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        download = _Download(response, progress)
+        try:
+            with budget.stream_selector() if budget is not None else nullcontext() as select:
+                for path, content in iter_python_sources(download, select, strip_components):
+                    sources.append((path, content))
+                    download.files += 1
+        except (http.client.HTTPException, OSError) as e:
+            # e.g. a chunked body cut off mid-chunk, or a read that timed out
+            raise ArchiveError(f"download failed after {download.received} bytes: {e!r}") from e
+        download.report()
+    logger.info(f"Read {len(sources)} Python file(s) from a {download.received} byte archive")
+    if stats is not None:
+        stats["bytes"] = stats.get("bytes", 0) + download.received
+    return sources
@@ -0,0 +1,349 @@
+"""ASGI serving mode.
+
+``/clone-repo/`` and ``/clone-repo/stream`` run natively on the event loop.
+Clones and ``ls-remote`` run as asyncio subprocesses and the Gemini call
+is awaited, so one worker process can keep many analyses in flight. The
+steps shared with ``remote.clone_and_generate`` (reading blobs, parsing
+and resolution) block, so they go to worker threads, and parsing from
+there to the scanner's process pool. Every other route is served by the
+Flask app through asgiref's WSGI adapter.
+
+    uvicorn autoreqpy.asgi:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from urllib.parse import parse_qs
+
+from pydantic import ValidationError
+
+from . import pipeline, remote, server
+from .async_git import CLONERS, pin_commit_async, resolve_head_sha_async
+from .budgets import BudgetExceeded
+from .metrics import time_analysis, time_stage
+from .pipeline import _no_progress
+from .result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+ASGI_MAX_IN_FLIGHT = int(os.getenv("ASGI_MAX_IN_FLIGHT", "64"))
+ASGI_SHUTDOWN_TIMEOUT = float(os.getenv("ASGI_SHUTDOWN_TIMEOUT", "30"))
+LS_REMOTE_TIMEOUT = float(os.getenv("LS_REMOTE_TIMEOUT", "30"))
+
+
+async def analyze_dependencies_with_gemini_async(requirements_content: str) -> str:
+    if not pipeline.GEMINI_API_KEY:
+        return pipeline.llm_skipped(requirements_content)
+
+    try:
+        cleaned = await pipeline.llm_cleanup.acleanup(requirements_content)
+        logger.debug(f"Gemini Analysis Response: {cleaned}")
+        return cleaned
+    except Exception as e:
+        return pipeline.llm_failed(requirements_content, e)
+
+
+class _Flight:
+    """One shared analysis and the progress callbacks of the requests waiting on it.
+
+    Events are fanned out to every subscriber. One that joins late is first
+    sent the events it missed, so every stream sees the whole analysis.
+    Events arrive from worker threads too, hence the lock.
+    """
+
+    def __init__(self):
+        self.task = None
+        self._events = []
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def progress(self, event, **data):
+        with self._lock:
+            self._events.append((event, data))
+            for subscriber in self._subscribers:
+                subscriber(event, **data)
+
+    def subscribe(self, progress):
+        with self._lock:
+            for event, data in self._events:
+                progress(event, **data)
+            self._subscribers.append(progress)
+
+    def unsubscribe(self, progress):
+        with self._lock:
+            self._subscribers.remove(progress)
+
+
+class AsyncAnalyzer:
+    """Runs analyses as tasks owned by the analyzer rather than by requests.
+
+    A client that disconnects stops waiting, but the clone it started still
+    finishes, fills the result cache and releases its workspace. Concurrent
+    requests for the same commit share one task, and each is sent all of
+    its progress events. ``drain()`` waits for the outstanding tasks at
+    shutdown.
+    """
+
+    def __init__(self, max_in_flight: int = ASGI_MAX_IN_FLIGHT):
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._flights = {}
+        self._tasks = set()
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def analyze(self, repo_url: str, progress=_no_progress) -> str:
+        with time_analysis():
+            try:
+                commit_sha = await resolve_head_sha_async(repo_url, timeout=LS_REMOTE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Could not resolve HEAD of {repo_url}, skipping result cache: {e}")
+                commit_sha = None
+
+            if commit_sha is None:
+                return await asyncio.shield(self._spawn(self._compute(repo_url, None, progress)))
+
+            progress("resolved_commit", commit=commit_sha)
+            cached = await asyncio.to_thread(remote.result_cache.get, repo_url, commit_sha)
+            if cached is not None:
+                return cached
+            key = ResultCache.key_for(repo_url, commit_sha)
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                flight.task = self._spawn(self._compute(repo_url, commit_sha, flight.progress, store=True))
+                flight.task.add_done_callback(lambda _: self._flights.pop(key, None))
+            flight.subscribe(progress)
+            try:
+                return await asyncio.shield(flight.task)
+            finally:
+                # A disconnected client stops receiving events; the analysis goes on
+                flight.unsubscribe(progress)
+
+    async def _compute(self, repo_url: str, commit_sha, progress, store: bool = False) -> str:
+        async with self._semaphore:
+            workspace = remote.new_workspace(repo_url)
+            budget = remote.new_budget(workspace)
+            try:
+                result = await self._clone_and_generate(repo_url, workspace, commit_sha, progress, budget)
+            finally:
+                remote.workspaces.release(workspace)
+        if store and not budget.truncated and not pipeline.is_fallback(result):
+            await asyncio.to_thread(remote.result_cache.put, repo_url, commit_sha, result)
+        return result
+
+    async def _clone_and_generate(self, repo_url: str, workspace, commit_sha, progress, budget) -> str:
+        """``remote.clone_and_generate`` with the clone and the Gemini call awaited."""
+        progress("clone_start", fetch_mode=remote.FETCH_MODE)
+        scanned = None
+        if (commit_sha and remote.FETCH_MODE != "archive" and remote.mirror_pool.enabled
+                and remote.mirror_pool.record_request(repo_url)):
+            # Mirror reads block on the mirror's threading lock, so they stay on a thread
+            scanned = await asyncio.to_thread(
+                remote.scan_from_mirror, repo_url, workspace, commit_sha, progress, True, budget)
+
+        if scanned is None:
+            on_clone_progress = budget.watch_clone(remote.clone_progress_reporter(progress))
+            try:
+                with time_stage("clone"):
+                    sources = await self._fetch(repo_url, workspace, commit_sha, on_clone_progress, budget)
+            except BudgetExceeded as e:
+                return remote.clone_aborted(repo_url, e, progress, budget)
+            scanned = await asyncio.to_thread(remote.scan_fetched, workspace, sources, progress, budget)
+
+        imports, first_party = scanned
+        requirements_content, normalized = await asyncio.to_thread(
+            pipeline.local_requirements, workspace.path, imports, first_party, progress)
+        if not normalized.unresolved:
+            return remote.annotated_result(normalized.text or requirements_content, progress, budget)
+        progress("llm_start")
+        with time_stage("llm"):
+            cleaned = await analyze_dependencies_with_gemini_async(normalized.text)
+        progress("llm_done")
+        return remote.annotated_result(cleaned, progress, budget)
+
+    @staticmethod
+    async def _fetch(repo_url: str, workspace, commit_sha, on_clone_progress, budget):
+        """``remote.fetch`` with git run through asyncio subprocesses."""
+        if remote.FETCH_MODE == "archive":
+            # urllib blocks, so the download and its decompression run on a thread
+            return await asyncio.to_thread(remote.fetch, repo_url, workspace, commit_sha, on_clone_progress, budget)
+        await CLONERS[remote.FETCH_MODE](repo_url, workspace.path, progress=on_clone_progress,
+                                         track=workspace.track_async)
+        if commit_sha:
+            await pin_commit_async(workspace.path, commit_sha, bare=remote.FETCH_MODE == "objects",
+                                   progress=on_clone_progress, track=workspace.track_async)
+        return None
+
+    async def drain(self, timeout: float):
+        if not self._tasks:
+            return
+        logger.info(f"Waiting up to {timeout}s for {len(self._tasks)} analyses to finish")
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+
+async def read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("Client disconnected")
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, status: int, payload: dict, headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AsgiApp:
+    def __init__(self, fallback=None):
+        self.analyzer = None
+        self._fallback = fallback
+        self._routes = {
+            ("POST", "/clone-repo/"): self.clone_repo,
+            ("GET", "/clone-repo/stream"): self.clone_repo_stream,
+            ("POST", "/clone-repo/stream"): self.clone_repo_stream,
+        }
+
+    @property
+    def fallback(self):
+        if self._fallback is None:
+            from asgiref.wsgi import WsgiToAsgi
+
+            self._fallback = WsgiToAsgi(server.app)
+        return self._fallback
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if self.analyzer is None:
+            # Servers that skip the lifespan protocol still get an analyzer
+            self.analyzer = AsyncAnalyzer()
+        handler = self._routes.get((scope.get("method"), scope["path"])) if scope["type"] == "http" else None
+        if handler is None:
+            return await self.fallback(scope, receive, send)
+        return await handler(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.analyzer = AsyncAnalyzer()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.analyzer is not None:
+                    await self.analyzer.drain(ASGI_SHUTDOWN_TIMEOUT)
+                await asyncio.to_thread(remote.workspaces.shutdown, True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    def _validate(github_url):
+        try:
+            return str(server.RepoInput(github_url=github_url).github_url), None
+        except (ValidationError, ValueError) as e:
+            return None, f"Invalid input: {str(e)}"
+
+    async def clone_repo(self, scope, receive, send):
+        try:
+            data = json.loads(await read_body(receive) or b"null")
+            repo_url, error = self._validate(data.get("github_url"))
+        except (ValueError, AttributeError) as e:
+            repo_url, error = None, f"Invalid input: {str(e)}"
+        if error:
+            return await send_json(send, 400, {"error": error})
+
+        try:
+            requirements_content = await self.analyzer.analyze(repo_url)
+        except Exception as e:
+            logger.error(f"Cloning operation failed: {str(e)}")
+            return await send_json(send, 400, {"error": f"Operation failed: {str(e)}"})
+        await send_json(send, 200, {"requirements.txt": requirements_content})
+
+    async def clone_repo_stream(self, scope, receive, send):
+        # GET lets browsers consume the stream with EventSource
+        github_url = (parse_qs(scope.get("query_string", b"").decode()).get("github_url") or [None])[0]
+        if github_url is None and scope["method"] == "POST":
+            try:
+                github_url = (json.loads(await read_body(receive) or b"null") or {}).get("github_url")
+            except (ValueError, AttributeError):
+                github_url = None
+        repo_url, error = self._validate(github_url)
+        if error:
+            return await send_json(send, 400, {"error": error})
+
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def emit(event, **data):
+            # Scan and resolve report from worker threads
+            loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+        async def work():
+            try:
+                requirements_content = await self.analyzer.analyze(repo_url, progress=emit)
+                emit("result", **{"requirements.txt": requirements_content})
+            except Exception as e:
+                logger.error(f"Cloning operation failed: {str(e)}")
+                emit("error", error=f"Operation failed: {str(e)}")
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        worker = asyncio.ensure_future(work())
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+                            (b"x-accel-buffering", b"no")],
+            })
+            while True:
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({getter, watcher}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    return  # client went away
+                item = getter.result()
+                if item is None:
+                    break
+                chunk = server.format_sse(*item).encode("utf-8")
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+            worker.cancel()
+
+
+app = AsgiApp()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "8000")))
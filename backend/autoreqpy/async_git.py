@@ -0,0 +1,134 @@
+import asyncio
+import re
+
+from .git_source import SPARSE_PATTERNS, GitCommandError, parse_progress_line, pin_commit_args
+
+
+def _no_track(proc):
+    pass
+
+
+async def _spawn(args, cwd, track):
+    proc = await asyncio.create_subprocess_exec(
+        "git", *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    track(proc)
+    return proc
+
+
+async def _reap(proc):
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+
+async def run_git_async(args, cwd=None, timeout=None, track=_no_track) -> str:
+    """Asyncio counterpart of ``git_source.run_git``.
+
+    ``track(proc)`` is called with the spawned process, e.g.
+    ``Workspace.track_async``. The process is killed if the awaiting task is
+    cancelled or the timeout expires.
+    """
+    proc = await _spawn(args, cwd, track)
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except BaseException:
+        await _reap(proc)
+        raise
+    if proc.returncode != 0:
+        raise GitCommandError(f"git {' '.join(args)} failed: {stderr.decode('utf-8', 'replace').strip()}")
+    return stdout.decode("utf-8", "replace")
+
+
+async def run_git_with_progress_async(args, progress, cwd=None, timeout=None, track=_no_track) -> str:
+    """Asyncio counterpart of ``git_source.run_git_with_progress``."""
+    proc = await _spawn([*args[:1], "--progress", *args[1:]], cwd, track)
+    messages = []
+
+    async def read_progress():
+        buffer = b""
+        while True:
+            chunk = await proc.stderr.read(4096)
+            if not chunk:
+                return
+            buffer += chunk
+            # git redraws progress with carriage returns
+            *lines, buffer = re.split(rb"[\r\n]", buffer)
+            for raw in lines:
+                line = raw.decode("utf-8", "replace")
+                parsed = parse_progress_line(line)
+                if parsed is not None:
+                    progress(*parsed)
+                elif line.strip():
+                    messages.append(line)
+
+    async def finish():
+        stdout, _ = await asyncio.gather(proc.stdout.read(), read_progress())
+        await proc.wait()
+        return stdout
+
+    try:
+        stdout = await asyncio.wait_for(finish(), timeout)
+    except BaseException:
+        await _reap(proc)
+        raise
+    if proc.returncode != 0:
+        raise GitCommandError(f"git {' '.join(args)} failed: {' '.join(messages).strip()}")
+    return stdout.decode("utf-8", "replace")
+
+
+async def _git(args, cwd=None, progress=None, track=_no_track) -> str:
+    if progress is None:
+        return await run_git_async(args, cwd=cwd, track=track)
+    return await run_git_with_progress_async(args, progress, cwd=cwd, track=track)
+
+
+async def sparse_clone_async(repo_url: str, destination_path: str, depth: int = 1, progress=None,
+                             track=_no_track):
+    await _git(["clone", f"--depth={depth}", "--filter=blob:none",
+                "--no-checkout", repo_url, destination_path], progress=progress, track=track)
+    await run_git_async(["sparse-checkout", "set", "--no-cone", *SPARSE_PATTERNS], cwd=destination_path,
+                        track=track)
+    await _git(["checkout"], cwd=destination_path, progress=progress, track=track)
+
+
+async def bare_clone_async(repo_url: str, destination_path: str, depth: int = 1, progress=None,
+                           track=_no_track):
+    await _git(["clone", "--bare", f"--depth={depth}", repo_url, destination_path], progress=progress,
+               track=track)
+
+
+async def full_clone_async(repo_url: str, destination_path: str, depth: int = 1, progress=None,
+                           track=_no_track):
+    await _git(["clone", f"--depth={depth}", repo_url, destination_path], progress=progress, track=track)
+
+
+async def pin_commit_async(destination_path: str, commit_sha: str, bare: bool = False, progress=None,
+                           track=_no_track):
+    """Asyncio counterpart of ``git_source.pin_commit``."""
+    head = await run_git_async(["rev-parse", "HEAD"], cwd=destination_path, track=track)
+    if head.strip() == commit_sha:
+        return
+    fetch_args, move_args = pin_commit_args(commit_sha, bare)
+    await _git(fetch_args, cwd=destination_path, progress=progress, track=track)
+    await _git(move_args, cwd=destination_path, progress=None if bare else progress, track=track)
+
+
+CLONERS = {
+    "sparse": sparse_clone_async,
+    "objects": bare_clone_async,
+    "full": full_clone_async,
+}
+
+
+async def resolve_head_sha_async(repo_url: str, timeout=None) -> str:
+    output = await run_git_async(["ls-remote", repo_url, "HEAD"], timeout=timeout)
+    if not output.strip():
+        raise ValueError(f"No HEAD found for {repo_url}")
+    return output.split()[0]
@@ -0,0 +1,228 @@
+import os
+import threading
+from contextlib import contextmanager
+from operator import itemgetter
+
+from .metrics import BUDGET_TRUNCATIONS
+
+# How many skipped file names a truncation note lists before summarizing
+MAX_LISTED_FILES = 5
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised to stop work that went over a hard limit, e.g. a clone."""
+
+    def __init__(self, limit: str, message: str):
+        super().__init__(message)
+        self.limit = limit
+
+
+def _format_bytes(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    for unit in ("KiB", "MiB", "GiB"):
+        size /= 1024
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f}".rstrip("0").rstrip(".") + f" {unit}"
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _priority(path: str):
+    # Shallow files are kept first: top-level package code says more about
+    # a project's dependencies than deeply nested fixtures or generated code.
+    path = path.replace(os.sep, "/")
+    return path.count("/"), path
+
+
+class _StreamSelector:
+    """The predicate of ``Budget.stream_selector``; records what it turns down."""
+
+    def __init__(self, max_file_bytes: int, max_memory_bytes: int):
+        self.max_file_bytes = max_file_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.held = 0
+        self.too_big = []
+        self.over_memory = []
+
+    def __call__(self, path: str, size: int) -> bool:
+        if self.max_file_bytes and size > self.max_file_bytes:
+            self.too_big.append(path)
+            return False
+        if self.max_memory_bytes and self.held + size > self.max_memory_bytes:
+            self.over_memory.append(path)
+            return False
+        self.held += size
+        return True
+
+    def room(self):
+        """The size of the largest file that would be selected now, or None if there is no limit."""
+        limits = []
+        if self.max_file_bytes:
+            limits.append(self.max_file_bytes)
+        if self.max_memory_bytes:
+            limits.append(max(self.max_memory_bytes - self.held, 0))
+        return min(limits, default=None)
+
+
+class Budget:
+    """Resource limits for one analysis, and a record of what they cut.
+
+    A limit of 0 disables it. The clone limits are hard: the fetch is
+    stopped, since nothing can be scanned without it. The other limits drop
+    files and let the analysis go on. Either way every cut is noted, and
+    ``annotate()`` puts the notes at the top of the requirements, so a
+    partial result is never mistaken for a complete one.
+
+    ``max_memory_bytes`` caps the source the analysis holds in memory at
+    once, which is what grows with the repository when blobs are read from
+    the object store. Parse timeouts are enforced by the scanner.
+    """
+
+    def __init__(self, max_clone_bytes: int = 0, max_clone_objects: int = 0, max_files: int = 0,
+                 max_file_bytes: int = 0, parse_timeout: float = 0, max_memory_bytes: int = 0):
+        self.max_clone_bytes = max_clone_bytes
+        self.max_clone_objects = max_clone_objects
+        self.max_files = max_files
+        self.max_file_bytes = max_file_bytes
+        self.parse_timeout = parse_timeout
+        self.max_memory_bytes = max_memory_bytes
+        self._lock = threading.Lock()
+        self.truncations = []
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.truncations)
+
+    @property
+    def needs_sizes(self) -> bool:
+        """Whether selecting blobs needs their sizes (``git ls-tree -l``)."""
+        return bool(self.max_file_bytes or self.max_memory_bytes)
+
+    def note(self, limit: str, message: str):
+        BUDGET_TRUNCATIONS.labels(limit=limit).inc()
+        with self._lock:
+            self.truncations.append(message)
+
+    def watch_clone(self, on_progress=None):
+        """Wrap a git progress callback so the fetch stops once over budget.
+
+        The wrapper raises BudgetExceeded, which makes the git runners kill
+        the process. It does not note anything: the caller decides whether
+        the abort truncates the result or is worked around.
+        """
+        if not (self.max_clone_bytes or self.max_clone_objects):
+            return on_progress
+        # git reports received bytes per command; sparse clones run two
+        received = {"done": 0, "last": 0}
+
+        def watched(phase, objects, total, size):
+            if on_progress is not None:
+                on_progress(phase, objects, total, size)
+            if phase != "receiving":
+                return
+            if self.max_clone_objects and total > self.max_clone_objects:
+                raise BudgetExceeded(
+                    "clone_objects",
+                    f"clone stopped: the repository has {total} objects, over the "
+                    f"{self.max_clone_objects} object limit")
+            if size is not None and self.max_clone_bytes:
+                if size < received["last"]:
+                    received["done"] += received["last"]
+                received["last"] = size
+                if received["done"] + size > self.max_clone_bytes:
+                    raise BudgetExceeded(
+                        "clone_bytes",
+                        f"clone stopped after {_format_bytes(received['done'] + size)}, over the "
+                        f"{_format_bytes(self.max_clone_bytes)} clone size limit")
+        return watched
+
+    def _note_files(self, limit: str, dropped, path_of, reason: str):
+        names = sorted(path_of(item) for item in dropped)
+        listed = ", ".join(names[:MAX_LISTED_FILES])
+        if len(names) > MAX_LISTED_FILES:
+            listed += f" and {len(names) - MAX_LISTED_FILES} more"
+        self.note(limit, f"skipped {len(names)} file(s) {reason}: {listed}")
+
+    def _select(self, items, path_of, size_of, buffered: bool) -> list:
+        items = list(items)
+        if self.max_file_bytes:
+            kept = [item for item in items if size_of(item) <= self.max_file_bytes]
+            if len(kept) < len(items):
+                too_big = [item for item in items if size_of(item) > self.max_file_bytes]
+                self._note_files("file_bytes", too_big, path_of,
+                                 f"larger than the {_format_bytes(self.max_file_bytes)} per-file limit")
+                items = kept
+        if self.max_files and len(items) > self.max_files:
+            items.sort(key=lambda item: _priority(path_of(item)))
+            self._note_files("files", items[self.max_files:], path_of,
+                             f"beyond the {self.max_files} file limit")
+            items = items[:self.max_files]
+        if buffered and self.max_memory_bytes:
+            kept, dropped, total = [], [], 0
+            for item in sorted(items, key=lambda item: _priority(path_of(item))):
+                size = size_of(item)
+                if total + size > self.max_memory_bytes:
+                    dropped.append(item)
+                else:
+                    kept.append(item)
+                    total += size
+            if dropped:
+                self._note_files("memory", dropped, path_of,
+                                 f"beyond the {_format_bytes(self.max_memory_bytes)} memory limit")
+                items = kept
+        return items
+
+    def select_files(self, paths, root: str) -> list:
+        """Apply the file count and size limits to files on disk under ``root``."""
+        size_of = _file_size if self.max_file_bytes else (lambda path: 0)
+        return self._select(paths, lambda path: os.path.relpath(path, root), size_of, buffered=False)
+
+    def select_blobs(self, blobs) -> list:
+        """Apply every file limit to ``(path, oid, size)`` blobs before they are read."""
+        return self._select(blobs, itemgetter(0), lambda blob: blob[2] or 0, buffered=True)
+
+    def select_sources(self, items) -> list:
+        """Apply every file limit to in-memory ``(filename, source)`` pairs."""
+        return self._select(items, itemgetter(0), lambda item: len(item[1]), buffered=True)
+
+    @contextmanager
+    def stream_selector(self):
+        """A ``select(path, size)`` predicate for files that arrive one at a time.
+
+        Files in an archive stream cannot be ranked before they are read, so
+        the memory limit keeps those that fit as they arrive rather than the
+        shallowest. ``select.room()`` is the largest file it would still
+        take, for files whose size is only known once they are read. What
+        was skipped is noted on exit; the file count limit is left to
+        select_sources().
+        """
+        select = _StreamSelector(self.max_file_bytes, self.max_memory_bytes)
+        try:
+            yield select
+        finally:
+            if select.too_big:
+                self._note_files("file_bytes", select.too_big, lambda path: path,
+                                 f"larger than the {_format_bytes(self.max_file_bytes)} per-file limit")
+            if select.over_memory:
+                self._note_files("memory", select.over_memory, lambda path: path,
+                                 f"beyond the {_format_bytes(self.max_memory_bytes)} memory limit")
+
+    def note_timeouts(self, filenames):
+        self._note_files("parse_timeout", filenames, lambda name: name,
+                         f"that took longer than the {self.parse_timeout:g}s parse timeout")
+
+    def report(self) -> str:
+        if not self.truncations:
+            return ""
+        with self._lock:
+            lines = [f"# - {message}" for message in self.truncations]
+        return "\n".join(["# Partial result: this analysis went over its resource budget.", *lines]) + "\n"
+
+    def annotate(self, requirements: str) -> str:
+        return self.report() + requirements
@@ -0,0 +1,164 @@
+"""The ``autoreqpy`` command.
+
+Each command imports only what it runs: ``--local`` never loads Flask,
+pydantic or the workspace and cache machinery of the servers, and the
+Gemini client only once an analysis actually reaches Gemini. Keep
+module-level imports here to the standard library; ``benchmark.py
+--startup`` checks the import time of ``--local`` against a budget.
+"""
+import argparse
+import os
+import sys
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="autoreqpy",
+                                     description="Dependency extractor for GitHub and local repositories")
+    parser.add_argument('--local', type=str, help='Path to local Python project directory')
+    parser.add_argument('--serve', action='store_true', help='Run the Flask server')
+    parser.add_argument('--debug', action='store_true', help='Run the Flask server with the debugger and reloader')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes used to parse source files (default: SCAN_WORKERS or CPU count)')
+    parser.add_argument('--index', type=str, default=None,
+                        help='Path of the persisted import index (default: IMPORT_INDEX_DIR or ~/.cache/autoreqpy)')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Re-parse every file instead of using the persisted import index')
+    parser.add_argument('--projects', action='store_true',
+                        help='Report requirements for each project in the tree: every directory with a '
+                             'pyproject.toml, setup.py, setup.cfg or requirements.txt')
+    parser.add_argument('--write', metavar='NAME', default=None,
+                        help="Write each project's requirements to NAME in its directory instead of printing them")
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and update the requirements of projects whose files change')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds between scans in --watch mode when watchdog is not installed')
+    return parser
+
+
+def process_local_repo(local_path: str, workers=None, use_index=True, index_path=None) -> int:
+    """Print the requirements of ``local_path`` to stdout; returns the exit status.
+
+    Only the requirements go to stdout, so the output can be redirected
+    straight into a requirements.txt.
+    """
+    import logging
+
+    from .import_index import scan_with_index
+    from .pipeline import GEMINI_API_KEY, generate_requirements
+
+    logger = logging.getLogger(__name__)
+    if not os.path.isdir(local_path):
+        logger.error(f"Provided path is not a valid directory: {local_path}")
+        print(f"Error: {local_path} is not a valid directory.", file=sys.stderr)
+        return 1
+
+    if not GEMINI_API_KEY:
+        print("WARNING: Gemini API key not set. Output will be raw without cleanup.", file=sys.stderr)
+    logger.info(f"Processing local repository at: {local_path}")
+    try:
+        if use_index:
+            # Only files changed since the last run are parsed again
+            imports = scan_with_index(local_path, index_path=index_path, workers=workers)
+        else:
+            imports = None
+        requirements_content = generate_requirements(local_path, workers, imports=imports)
+    except Exception as e:
+        logger.error(f"Failed to process local repository: {str(e)}")
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    print(requirements_content)
+    return 0
+
+
+def process_projects(local_path: str, workers=None, use_index=True, index_path=None, discover=True,
+                     output_name=None, watch=False, poll_interval=1.0) -> int:
+    """Requirements for each project under ``local_path``; returns the exit status.
+
+    They are printed, each headed by the project's directory, or written to
+    ``output_name`` in it. With ``watch`` this keeps running and repeats
+    that for the projects whose requirements change.
+    """
+    import logging
+
+    from .import_index import ImportIndex, default_index_path
+    from .pipeline import GEMINI_API_KEY
+    from .projects import Monorepo
+
+    logger = logging.getLogger(__name__)
+    if not os.path.isdir(local_path):
+        logger.error(f"Provided path is not a valid directory: {local_path}")
+        print(f"Error: {local_path} is not a valid directory.", file=sys.stderr)
+        return 1
+
+    if not GEMINI_API_KEY:
+        print("WARNING: Gemini API key not set. Output will be raw without cleanup.", file=sys.stderr)
+    # Without the persisted index the tree is still parsed only once
+    index = ImportIndex((index_path or default_index_path(local_path)) if use_index else None)
+    monorepo = Monorepo(local_path, index, workers, discover=discover)
+    written = set()
+
+    def output(projects):
+        for project in projects:
+            requirements = monorepo.requirements.get(project)
+            if output_name is None:
+                if discover:
+                    print(f"# {project}")
+                print(requirements if requirements is not None else "# No Python files left")
+                if discover:
+                    print()
+                sys.stdout.flush()
+            elif requirements is not None:
+                path = os.path.abspath(os.path.join(local_path, project, output_name))
+                written.add(path)
+                try:
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(requirements + "\n")
+                except OSError as e:
+                    logger.error(f"Failed to write {path}: {e}")
+                    continue
+                logger.info(f"Wrote {path}")
+
+    try:
+        if watch:
+            from .watch import watch as watch_tree
+
+            watch_tree(monorepo, output, poll_interval, ignored=written)
+        else:
+            output(monorepo.scan())
+    except KeyboardInterrupt:
+        return 0
+    except Exception as e:
+        logger.error(f"Failed to process local repository: {str(e)}")
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def serve(debug: bool = False):
+    from .pipeline import GEMINI_API_KEY
+    from .server import app
+
+    if not GEMINI_API_KEY:
+        print("WARNING: Gemini API key not set. Dependency analysis will be limited.")
+    app.run(debug=debug)
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.local:
+        from .logs import configure_logging
+
+        # stdout carries the requirements themselves
+        configure_logging(stream=sys.stderr, queued=False)
+        if args.projects or args.watch or args.write:
+            return process_projects(args.local, args.workers, use_index=not args.no_index, index_path=args.index,
+                                    discover=args.projects, output_name=args.write, watch=args.watch,
+                                    poll_interval=args.poll_interval)
+        return process_local_repo(args.local, args.workers, use_index=not args.no_index, index_path=args.index)
+    if args.serve:
+        serve(debug=args.debug)
+        return 0
+    parser.print_help()
+    return 0
@@ -0,0 +1,307 @@
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+
+from .scanner import is_pruned_path, scan_sources
+
+logger = logging.getLogger(__name__)
+
+# Non-cone sparse-checkout patterns: only Python sources reach the work tree
+SPARSE_PATTERNS = ["*.py"]
+
+
+class GitCommandError(RuntimeError):
+    pass
+
+
+def run_git(args, cwd=None, timeout=None, popen=subprocess.Popen) -> str:
+    """Run git and return its stdout.
+
+    ``popen`` lets callers such as a Workspace track the spawned process.
+    """
+    proc = popen(["git", *args], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except BaseException:
+        proc.kill()
+        proc.communicate()
+        raise
+    if proc.returncode != 0:
+        raise GitCommandError(f"git {' '.join(args)} failed: {stderr.strip()}")
+    return stdout
+
+
+_PROGRESS_RE = re.compile(
+    r"(?P<phase>[A-Za-z ]+?) objects:\s+\d+% \((?P<cur>\d+)/(?P<total>\d+)\)"
+    r"(?:, (?P<size>[\d.]+) (?P<unit>[KMG]i)?B)?")
+_UNITS = {None: 1, "Ki": 1 << 10, "Mi": 1 << 20, "Gi": 1 << 30}
+
+
+def parse_progress_line(line: str):
+    """``(phase, objects, total, bytes)`` from a git progress line, or None."""
+    match = _PROGRESS_RE.search(line)
+    if not match:
+        return None
+    received = None
+    if match.group("size"):
+        received = int(float(match.group("size")) * _UNITS[match.group("unit")])
+    return match.group("phase").strip().lower(), int(match.group("cur")), int(match.group("total")), received
+
+
+def run_git_with_progress(args, progress, cwd=None, timeout=None, popen=subprocess.Popen) -> str:
+    """Run a fetching git command with ``--progress``, reporting as it goes.
+
+    ``progress(phase, objects, total, bytes)`` is called for each progress
+    update git writes to stderr.
+    """
+    proc = popen(
+        ["git", *args[:1], "--progress", *args[1:]],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout_chunks = []
+    reader = threading.Thread(target=lambda: stdout_chunks.append(proc.stdout.read()), daemon=True)
+    reader.start()
+    deadline = time.time() + timeout if timeout else None
+    messages = []
+    buffer = b""
+    try:
+        while True:
+            chunk = proc.stderr.read1(4096) if hasattr(proc.stderr, "read1") else proc.stderr.read(4096)
+            if not chunk:
+                break
+            buffer += chunk
+            # git redraws progress with carriage returns
+            *lines, buffer = re.split(rb"[\r\n]", buffer)
+            for raw in lines:
+                line = raw.decode("utf-8", "replace")
+                parsed = parse_progress_line(line)
+                if parsed is not None:
+                    progress(*parsed)
+                elif line.strip():
+                    messages.append(line)
+            if deadline and time.time() > deadline:
+                raise subprocess.TimeoutExpired(args, timeout)
+        proc.wait(timeout=max(0.0, deadline - time.time()) if deadline else None)
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        reader.join()
+    if proc.returncode != 0:
+        raise GitCommandError(f"git {' '.join(args)} failed: {' '.join(messages).strip()}")
+    return b"".join(stdout_chunks).decode("utf-8", "replace")
+
+
+def _git(args, cwd=None, progress=None, popen=subprocess.Popen) -> str:
+    if progress is None:
+        return run_git(args, cwd=cwd, popen=popen)
+    return run_git_with_progress(args, progress, cwd=cwd, popen=popen)
+
+
+def sparse_clone(repo_url: str, destination_path: str, depth: int = 1, progress=None,
+                 popen=subprocess.Popen):
+    """Blob-filtered clone that checks out only ``*.py`` files.
+
+    Servers that support partial clone send just the trees up front, and the
+    checkout then fetches the Python blobs in one batch. Servers without
+    filter support send everything, but non-Python files still never hit the
+    work tree.
+    """
+    _git(["clone", f"--depth={depth}", "--filter=blob:none",
+          "--no-checkout", repo_url, destination_path], progress=progress, popen=popen)
+    run_git(["sparse-checkout", "set", "--no-cone", *SPARSE_PATTERNS], cwd=destination_path, popen=popen)
+    _git(["checkout"], cwd=destination_path, progress=progress, popen=popen)
+
+
+def bare_clone(repo_url: str, destination_path: str, depth: int = 1, progress=None,
+               popen=subprocess.Popen):
+    _git(["clone", "--bare", f"--depth={depth}", repo_url, destination_path], progress=progress, popen=popen)
+
+
+def full_clone(repo_url: str, destination_path: str, depth: int = 1, progress=None,
+               popen=subprocess.Popen):
+    _git(["clone", f"--depth={depth}", repo_url, destination_path], progress=progress, popen=popen)
+
+
+def pin_commit_args(commit_sha: str, bare: bool) -> list:
+    """The git commands that move a fresh shallow clone from HEAD to ``commit_sha``."""
+    return [["fetch", "--depth=1", "origin", commit_sha],
+            ["update-ref", "--no-deref", "HEAD", commit_sha] if bare else ["checkout", "--detach", commit_sha]]
+
+
+def pin_commit(destination_path: str, commit_sha: str, bare: bool = False, progress=None,
+               popen=subprocess.Popen):
+    """Make a fresh clone's HEAD ``commit_sha``, the commit the analysis was resolved to.
+
+    A push between resolving HEAD and cloning would otherwise have a newer
+    tree analyzed, and cached, as ``commit_sha``.
+    """
+    if run_git(["rev-parse", "HEAD"], cwd=destination_path, popen=popen).strip() == commit_sha:
+        return
+    logger.info(f"HEAD moved on since {commit_sha} was resolved; fetching it")
+    fetch_args, move_args = pin_commit_args(commit_sha, bare)
+    _git(fetch_args, cwd=destination_path, progress=progress, popen=popen)
+    _git(move_args, cwd=destination_path, progress=None if bare else progress, popen=popen)
+
+
+# Branches only: a plain --mirror would also pull every refs/pull/* on GitHub
+MIRROR_REFSPEC = "+refs/heads/*:refs/heads/*"
+
+
+def mirror_clone(repo_url: str, destination_path: str, progress=None, popen=subprocess.Popen):
+    """Full-history bare clone that later ``fetch_mirror`` calls keep current."""
+    _git(["clone", "--bare", repo_url, destination_path], progress=progress, popen=popen)
+    for key, value in (("remote.origin.fetch", MIRROR_REFSPEC),
+                       # Keep fetched objects packed and never repack under readers
+                       ("fetch.unpackLimit", "1"),
+                       ("gc.auto", "0")):
+        run_git(["config", key, value], cwd=destination_path, popen=popen)
+
+
+def fetch_mirror(git_dir: str, progress=None, popen=subprocess.Popen):
+    _git(["fetch", "--prune", "origin"], cwd=git_dir, progress=progress, popen=popen)
+
+
+def has_commit(git_dir: str, rev: str, popen=subprocess.Popen) -> bool:
+    try:
+        run_git(["cat-file", "-e", f"{rev}^{{commit}}"], cwd=git_dir, popen=popen)
+    except GitCommandError:
+        return False
+    return True
+
+
+def pack_bytes(repo_path: str) -> int:
+    """Total size of a clone's pack files, i.e. roughly what was transferred."""
+    for git_dir in (os.path.join(repo_path, ".git"), repo_path):
+        pack_dir = os.path.join(git_dir, "objects", "pack")
+        if os.path.isdir(pack_dir):
+            return sum(entry.stat().st_size for entry in os.scandir(pack_dir) if entry.name.endswith(".pack"))
+    return 0
+
+
+def shared_checkout(git_dir: str, destination_path: str, rev: str, sparse: bool = True,
+                    popen=subprocess.Popen):
+    """Check out ``rev`` from a local repository without copying its objects.
+
+    The new repository borrows objects from ``git_dir`` through alternates,
+    so ``git_dir`` must outlive every git command run in ``destination_path``;
+    the checked-out files do not depend on it.
+    """
+    run_git(["clone", "--shared", "--no-checkout", git_dir, destination_path], popen=popen)
+    if sparse:
+        run_git(["sparse-checkout", "set", "--no-cone", *SPARSE_PATTERNS], cwd=destination_path, popen=popen)
+    run_git(["checkout", "--detach", rev], cwd=destination_path, popen=popen)
+
+
+def ls_tree_args(rev: str = "HEAD", sizes: bool = False) -> list:
+    return ["ls-tree", "-r", "-z", "--full-tree", *(["-l"] if sizes else []), rev]
+
+
+def list_python_blobs(git_dir: str, rev: str = "HEAD", popen=subprocess.Popen, sizes: bool = False) -> list:
+    """``(path, blob id, size)`` for every non-pruned ``.py`` file at ``rev``.
+
+    Sizes are only looked up when ``sizes`` is set and are None otherwise.
+    """
+    return parse_python_blobs(run_git(ls_tree_args(rev, sizes), cwd=git_dir, popen=popen))
+
+
+def parse_python_blobs(output: str) -> list:
+    """Python blobs from ``git ls-tree -r -z [-l]`` output."""
+    blobs = []
+    for record in output.split("\0"):
+        if not record:
+            continue
+        meta, _, path = record.partition("\t")
+        mode, obj_type, oid, *size = meta.split()
+        # Skip symlinks (120000) and submodules (commit entries)
+        if obj_type != "blob" or mode == "120000" or not path.endswith(".py"):
+            continue
+        if is_pruned_path(path):
+            continue
+        blobs.append((path, oid, int(size[0]) if size else None))
+    return blobs
+
+
+def iter_blobs(git_dir: str, oids, popen=subprocess.Popen):
+    """Yield ``(oid, content)`` for each blob through one ``cat-file --batch``."""
+    oids = list(oids)
+    proc = popen(
+        ["git", "cat-file", "--batch"],
+        cwd=git_dir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def feed():
+        try:
+            for oid in oids:
+                proc.stdin.write(f"{oid}\n".encode("ascii"))
+            proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    # Writing from a separate thread keeps both pipes draining, so a large
+    # request list cannot deadlock against git's output buffer.
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        for _ in oids:
+            header = proc.stdout.readline()
+            if not header:
+                break
+            fields = header.split()
+            if len(fields) < 3 or fields[1] == b"missing":
+                logger.warning(f"Blob unavailable in {git_dir}: {header.decode(errors='replace').strip()}")
+                continue
+            size = int(fields[2])
+            content = proc.stdout.read(size)
+            proc.stdout.read(1)  # trailing newline
+            yield fields[0].decode("ascii"), content
+    finally:
+        # Closing our end first makes an abandoned git exit instead of
+        # blocking on a full pipe while the writer waits on it.
+        proc.stdout.close()
+        writer.join()
+        proc.wait()
+
+
+def paths_by_blob(blobs) -> dict:
+    """Group ``(path, oid, size)`` blobs so identical files are read once."""
+    paths = {}
+    for path, oid, _ in blobs:
+        paths.setdefault(oid, []).append(path)
+    return paths
+
+
+def read_python_sources(git_dir: str, rev: str = "HEAD", popen=subprocess.Popen, budget=None) -> list:
+    """``(path, content)`` of the Python files at ``rev``.
+
+    A ``budgets.Budget`` drops files before they are read.
+    """
+    blobs = list_python_blobs(git_dir, rev, popen=popen, sizes=budget is not None and budget.needs_sizes)
+    if budget is not None:
+        blobs = budget.select_blobs(blobs)
+    paths = paths_by_blob(blobs)
+    sources = []
+    for oid, content in iter_blobs(git_dir, paths, popen=popen):
+        for path in paths[oid]:
+            sources.append((path, content))
+    return sources
+
+
+def scan_git_objects(git_dir: str, rev: str = "HEAD", workers=None, progress=None,
+                     popen=subprocess.Popen, stats=None, budget=None):
+    """Scan ``.py`` blobs straight from the object store, without a work tree.
+
+    Returns ``(imports, paths)``; works on bare and non-bare repositories.
+    """
+    sources = read_python_sources(git_dir, rev, popen=popen, budget=budget)
+    imports = scan_sources(sources, workers=workers, progress=progress, stats=stats, budget=budget)
+    return imports, [path for path, _ in sources]
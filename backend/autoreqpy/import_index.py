@@ -0,0 +1,194 @@
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+
+from .scanner import PARSER_VERSION, is_pruned_file, iter_python_files, parse_files
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+# Files modified this close to the previous index write may have changed again
+# within the same mtime tick, so their stat data alone is not trusted.
+RACY_WINDOW_NS = 2 * 1_000_000_000
+
+
+def default_index_path(root: str) -> str:
+    base = os.getenv("IMPORT_INDEX_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "autoreqpy")
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()
+    return os.path.join(base, f"{digest}.json")
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _is_entry(entry) -> bool:
+    return (isinstance(entry, list) and len(entry) == 4 and isinstance(entry[0], int)
+            and isinstance(entry[1], int) and isinstance(entry[2], str) and isinstance(entry[3], list))
+
+
+class ImportIndex:
+    """Persisted per-file import cache for a single source tree.
+
+    Each entry maps a path relative to the tree root to
+    ``[mtime_ns, size, sha256, imports]``. A file is re-parsed only when its
+    stat data changed and its content hash no longer matches. With an
+    ``index_path`` of None the index only lives in memory.
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path
+        self.files = {}
+        self.written_at_ns = 0
+        self._dirty = False
+        self._updated = False
+        if index_path is not None:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable import index {self.index_path}: {e}")
+            return
+
+        if not isinstance(data, dict) or data.get("format") != INDEX_FORMAT:
+            logger.warning(f"Ignoring import index {self.index_path} in an unknown format, rebuilding")
+            self._dirty = True
+            return
+        if data.get("parser") != PARSER_VERSION:
+            logger.info("Import index was built by a different parser version, rebuilding")
+            self._dirty = True
+            return
+        files = data.get("files")
+        written_at_ns = data.get("written_at_ns")
+        if not (isinstance(files, dict) and isinstance(written_at_ns, int)
+                and all(_is_entry(entry) for entry in files.values())):
+            logger.warning(f"Ignoring malformed import index {self.index_path}, rebuilding")
+            self._dirty = True
+            return
+        self.files = files
+        self.written_at_ns = written_at_ns
+
+    def save(self):
+        if not self._dirty:
+            return
+        if self.index_path is None:
+            self.written_at_ns = time.time_ns()
+            self._dirty = False
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        self.written_at_ns = time.time_ns()
+        data = {
+            "format": INDEX_FORMAT,
+            "parser": PARSER_VERSION,
+            "written_at_ns": self.written_at_ns,
+            "files": self.files,
+        }
+        tmp_path = f"{self.index_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+    def _is_fresh(self, entry, st) -> bool:
+        return (entry[0] == st.st_mtime_ns and entry[1] == st.st_size
+                and st.st_mtime_ns < self.written_at_ns - RACY_WINDOW_NS)
+
+    def _stale(self, rel: str, path: str):
+        """``(rel, path, stat, digest)`` if ``path`` has to be parsed again, else None."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        entry = self.files.get(rel)
+        if entry is not None and self._is_fresh(entry, st):
+            return None
+        try:
+            digest = _hash_file(path)
+        except OSError as e:
+            logger.warning(f"Failed to read {path}: {e}")
+            return None
+        if entry is not None and entry[2] == digest:
+            # Unchanged content: refresh stat data so the next run can
+            # trust it without hashing again.
+            entry[0], entry[1] = st.st_mtime_ns, st.st_size
+            self._dirty = True
+            return None
+        return rel, path, st, digest
+
+    def _parse(self, pending, removed, workers=None) -> dict:
+        if pending:
+            results = parse_files([path for _, path, _, _ in pending], workers=workers)
+            for (rel, _, st, digest), imports in zip(pending, results):
+                self.files[rel] = [st.st_mtime_ns, st.st_size, digest, list(imports)]
+
+        if pending or removed:
+            self._dirty = True
+        # A watch re-checks the tree over and over; only report what changed it
+        log = logger.info if pending or removed or not self._updated else logger.debug
+        log(f"Import index: {len(pending)} parsed, {len(removed)} removed, "
+            f"{len(self.files) - len(pending)} reused")
+        self._updated = True
+        return {rel: entry[3] for rel, entry in self.files.items()}
+
+    def update(self, root: str, workers=None, paths=None) -> dict:
+        """Bring the index in line with ``root`` and return ``{relpath: imports}``.
+
+        ``paths``, when given, are every Python file under ``root``, from a
+        walk the caller already made.
+        """
+        seen = set()
+        pending = []
+        for path in iter_python_files(root) if paths is None else paths:
+            rel = os.path.relpath(path, root)
+            seen.add(rel)
+            stale = self._stale(rel, path)
+            if stale is not None:
+                pending.append(stale)
+
+        removed = [rel for rel in self.files if rel not in seen]
+        for rel in removed:
+            del self.files[rel]
+        return self._parse(pending, removed, workers)
+
+    def refresh(self, root: str, relpaths, workers=None) -> dict:
+        """Like update(), but only looks at ``relpaths``, e.g. files a watcher saw change."""
+        pending = []
+        removed = []
+        for rel in relpaths:
+            path = os.path.join(root, rel)
+            if rel.endswith(".py") and os.path.isfile(path) and not is_pruned_file(root, rel):
+                stale = self._stale(rel, path)
+                if stale is not None:
+                    pending.append(stale)
+            elif self.files.pop(rel, None) is not None:
+                removed.append(rel)
+        return self._parse(pending, removed, workers)
+
+    def imports(self) -> set:
+        result = set()
+        for entry in self.files.values():
+            result.update(entry[3])
+        return result
+
+
+def scan_with_index(root: str, index_path=None, workers=None) -> set:
+    index = ImportIndex(index_path or default_index_path(root))
+    index.update(root, workers=workers)
+    try:
+        index.save()
+    except OSError as e:
+        logger.warning(f"Failed to save import index {index.index_path}: {e}")
+    return index.imports()
@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+
+FINISHED_STATES = frozenset({SUCCEEDED, FAILED, CANCELLED, TIMED_OUT})
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, timeout: float):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.timeout = timeout
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def deadline(self):
+        return self.started_at + self.timeout if self.started_at and self.timeout else None
+
+    def checkpoint(self):
+        """Called by job code between stages; aborts cancelled or overdue jobs."""
+        if self.cancel_event.is_set():
+            raise JobCancelled("Job was cancelled")
+        if self.deadline and time.time() > self.deadline:
+            self.cancel_event.set()
+            raise TimeoutError(f"Job exceeded its {self.timeout}s timeout")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Runs jobs on a fixed worker pool behind a bounded queue.
+
+    Timeouts and cancellation are cooperative: a running job is only stopped
+    at its next ``checkpoint()``, but its status flips immediately and any
+    result it still produces is discarded. Until it stops it still counts
+    against the queue limit.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32,
+                 timeout: float = 300, retention: float = 3600):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    @staticmethod
+    def _occupies_worker(job: Job) -> bool:
+        # A job cancelled or expired while running keeps its worker until its
+        # code reaches a checkpoint, and the executor queues without limit
+        return job.status in (QUEUED, RUNNING) or (job.future is not None and not job.future.done())
+
+    def _active(self) -> int:
+        return sum(1 for job in self._jobs.values() if self._occupies_worker(job))
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.status in FINISHED_STATES and job.finished_at < cutoff
+                       and not self._occupies_worker(job)]:
+            del self._jobs[job_id]
+
+    def _expire(self, job: Job):
+        if job.status == RUNNING and job.deadline and time.time() > job.deadline:
+            job.cancel_event.set()
+            self._finish(job, TIMED_OUT, error=f"Job exceeded its {job.timeout}s timeout")
+
+    @staticmethod
+    def _finish(job: Job, status: str, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+
+    def submit(self, fn, *args, timeout=None) -> Job:
+        """Queue ``fn(job, *args)``; raises JobQueueFull when at capacity."""
+        with self._lock:
+            self._prune()
+            for job in list(self._jobs.values()):
+                self._expire(job)
+            if self._active() >= self.workers + self.max_queue:
+                raise JobQueueFull(f"{self.workers + self.max_queue} jobs already queued or still running")
+            job = Job(self.timeout if timeout is None else timeout)
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job: Job, fn, args):
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            job.checkpoint()
+            result = fn(job, *args)
+            outcome = (SUCCEEDED, result, None)
+        except JobCancelled:
+            outcome = (CANCELLED, None, "Job was cancelled")
+        except TimeoutError as e:
+            outcome = (TIMED_OUT, None, str(e))
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            outcome = (FAILED, None, str(e))
+        with self._lock:
+            # A job cancelled or expired while running keeps that status
+            if job.status == RUNNING:
+                self._finish(job, *outcome)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._expire(job)
+            return job
+
+    def cancel(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            job.cancel_event.set()
+            if job.future is not None:
+                job.future.cancel()
+            self._finish(job, CANCELLED, error="Job was cancelled")
+            return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "jobs": counts,
+            }
@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Part of every cache key: bump whenever the prompt text changes.
+PROMPT_VERSION = 1
+
+
+def normalize_requirements(requirements_content: str) -> str:
+    lines = set()
+    for line in requirements_content.splitlines():
+        line = " ".join(line.split())
+        if line and not line.startswith("#"):
+            lines.add(line)
+    return "\n".join(sorted(lines, key=str.lower))
+
+
+def build_cleanup_prompt(requirements_content: str) -> str:
+    return f"""Given the following Python dependencies, generate a clean requirements.txt file that:
+        1. Strictly remove duplicates any repeated dependencies.
+        2. Resolves any version conflicts.
+        3. Only includes necessary dependencies for the project.
+        4. Formats the output strictly as a `requirements.txt` file, without any additional explanations.
+
+        Input:
+        {requirements_content}
+
+        Output:
+        ```requirements.txt
+        [cleaned dependencies]
+        """
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if time.monotonic() > expires_at:
+                del self._data[key]
+                self.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class LLMCleanup:
+    """Caches and coalesces requirement cleanup calls to a generative model.
+
+    ``client_factory`` returns an object with ``generate_content(prompt)``
+    whose result has a ``text`` attribute (a Gemini ``GenerativeModel`` or a
+    local stand-in). It is called once and the client is reused.
+    """
+
+    def __init__(self, client_factory, model_name: str, max_entries: int = 1024, ttl: float = 24 * 3600):
+        self.client_factory = client_factory
+        self.model_name = model_name
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._flight = SingleFlight()
+        self._async_calls = {}
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _get_client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self.client_factory()
+        return self._client
+
+    def key_for(self, normalized: str) -> str:
+        raw = f"{self.model_name}\0{PROMPT_VERSION}\0{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def cleanup(self, requirements_content: str) -> str:
+        normalized = normalize_requirements(requirements_content)
+        key = self.key_for(normalized)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+
+        def _call():
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._count("hits")
+                return cached
+            self._count("misses")
+            response = self._get_client().generate_content(build_cleanup_prompt(normalized))
+            text = response.text
+            self._cache.put(key, text)
+            return text
+
+        text, shared = self._flight.do(key, _call)
+        if shared:
+            self._count("coalesced")
+        return text
+
+    async def acleanup(self, requirements_content: str) -> str:
+        """Awaitable ``cleanup`` for use from a single event loop.
+
+        Uses the client's ``generate_content_async`` when it has one, so no
+        thread is held while the model responds. Concurrent calls for the
+        same input share one request.
+        """
+        # Imported here: only callers already running an event loop get this far
+        import asyncio
+
+        normalized = normalize_requirements(requirements_content)
+        key = self.key_for(normalized)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+
+        task = self._async_calls.get(key)
+        if task is None:
+            self._count("misses")
+            task = asyncio.ensure_future(self._agenerate(key, normalized))
+            self._async_calls[key] = task
+            task.add_done_callback(lambda _: self._async_calls.pop(key, None))
+        else:
+            self._count("coalesced")
+        # One caller giving up must not cancel the request the others wait on
+        return await asyncio.shield(task)
+
+    async def _agenerate(self, key: str, normalized: str) -> str:
+        import asyncio
+
+        # The first call imports and configures the client library, which
+        # would stall every request on the event loop
+        client = await asyncio.to_thread(self._get_client)
+        prompt = build_cleanup_prompt(normalized)
+        if hasattr(client, "generate_content_async"):
+            response = await client.generate_content_async(prompt)
+        else:
+            response = await asyncio.to_thread(client.generate_content, prompt)
+        self._cache.put(key, response.text)
+        return response.text
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self._cache.evictions,
+                "entries": len(self._cache),
+                "in_flight": self._flight.in_flight() + len(self._async_calls),
+            }
@@ -0,0 +1,39 @@
+import atexit
+import logging
+import sys
+
+LOG_FILE = 'repo_cloner.log'
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_configured = False
+
+
+def configure_logging(stream=sys.stdout, level=logging.INFO, queued: bool = True):
+    """Log to ``stream`` and ``repo_cloner.log``; later calls have no effect.
+
+    With ``queued``, request threads only enqueue records and a listener
+    thread does the console and file writes. A one-shot command writes
+    directly and skips importing ``logging.handlers``.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    handlers = [logging.StreamHandler(stream), logging.FileHandler(LOG_FILE)]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if not queued:
+        logging.basicConfig(level=level, handlers=handlers)
+        return
+
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+
+    log_queue = queue.Queue(-1)
+    log_listener = QueueListener(log_queue, *handlers)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    queue_handler = QueueHandler(log_queue)
+    # The listener's handlers apply the real format
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=level, handlers=[queue_handler])
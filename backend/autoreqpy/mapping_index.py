@@ -0,0 +1,234 @@
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import zipfile
+import zlib
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ARQMAP01"
+_HEADER = struct.Struct("<8sII")  # magic, slot count, entry count
+_SLOT = struct.Struct("<III")     # key hash, key offset, value offset
+_LEN = struct.Struct("<H")
+_EMPTY = 0xFFFFFFFF
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "import_map.idx")
+DEFAULT_SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "import_map.tsv")
+
+
+def _hash(key: bytes) -> int:
+    return zlib.crc32(key) & 0xFFFFFFFF
+
+
+class MappingIndex:
+    """Read-only open-addressing hash table of module name -> distribution.
+
+    The file is memory-mapped, so opening it costs one syscall regardless of
+    size and each lookup touches only the slots it probes plus two strings.
+    Subclasses reuse the layout for other string tables by overriding
+    ``magic`` and, for values over 64 KiB, ``length_format``.
+    """
+
+    magic = MAGIC
+    length_format = _LEN
+    description = "an import mapping index"
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._nslots, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != self.magic:
+            self._mm.close()
+            raise ValueError(f"{path} is not {self.description}")
+        self._slots_offset = _HEADER.size
+        self._strings_offset = self._slots_offset + self._nslots * _SLOT.size
+
+    def _string(self, offset: int) -> bytes:
+        start = self._strings_offset + offset
+        (length,) = self.length_format.unpack_from(self._mm, start)
+        return self._mm[start + self.length_format.size:start + self.length_format.size + length]
+
+    def get(self, name: str):
+        if not self._nslots:
+            return None
+        key = name.encode("utf-8")
+        h = _hash(key)
+        slot = h % self._nslots
+        for _ in range(self._nslots):
+            slot_hash, key_off, val_off = _SLOT.unpack_from(self._mm, self._slots_offset + slot * _SLOT.size)
+            if key_off == _EMPTY:
+                return None
+            if slot_hash == h and self._string(key_off) == key:
+                return self._string(val_off).decode("utf-8")
+            slot = (slot + 1) % self._nslots
+        return None
+
+    def resolve(self, module: str):
+        """Longest dotted prefix of ``module`` that has a mapping."""
+        parts = module.split(".")
+        for depth in range(len(parts), 0, -1):
+            distribution = self.get(".".join(parts[:depth]))
+            if distribution is not None:
+                return distribution
+        return None
+
+    def close(self):
+        self._mm.close()
+
+
+def build_index(mapping: dict, out_path: str, magic: bytes = MAGIC, length_format=_LEN):
+    # Keep the load factor at or below 0.5 so probe chains stay short
+    nslots = max(8, len(mapping) * 2)
+    slots = [(0, _EMPTY, _EMPTY)] * nslots
+    strings = bytearray()
+    offsets = {}
+
+    def intern(value: str) -> int:
+        if value not in offsets:
+            data = value.encode("utf-8")
+            offsets[value] = len(strings)
+            strings.extend(length_format.pack(len(data)))
+            strings.extend(data)
+        return offsets[value]
+
+    for key in sorted(mapping):
+        h = _hash(key.encode("utf-8"))
+        slot = h % nslots
+        while slots[slot][1] != _EMPTY:
+            slot = (slot + 1) % nslots
+        slots[slot] = (h, intern(key), intern(mapping[key]))
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(magic, nslots, len(mapping)))
+        for slot in slots:
+            f.write(_SLOT.pack(*slot))
+        f.write(strings)
+    os.replace(tmp_path, out_path)
+
+
+def _read_tsv(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            module, _, distribution = line.partition("\t")
+            if module and distribution:
+                yield module.strip(), distribution.strip()
+
+
+def _read_wheel(path: str):
+    with zipfile.ZipFile(path) as wheel:
+        names = wheel.namelist()
+        info_dir = next((n.split("/")[0] for n in names if n.split("/")[0].endswith(".dist-info")), None)
+        if info_dir is None:
+            return
+        distribution = None
+        with wheel.open(f"{info_dir}/METADATA") as f:
+            for raw in f:
+                line = raw.decode("utf-8", "replace")
+                if line.startswith("Name:"):
+                    distribution = line.split(":", 1)[1].strip()
+                    break
+        if not distribution:
+            return
+        modules = set()
+        for name in names:
+            parts = name.split("/")
+            top = parts[0]
+            if top.endswith((".dist-info", ".data")):
+                continue
+            if len(parts) > 2 and f"{top}/__init__.py" not in names:
+                # Namespace package: the distribution owns the sub-package
+                modules.add(f"{top}.{parts[1]}")
+            else:
+                modules.add(top[:-3] if top.endswith(".py") else top)
+        for module in modules:
+            if module and not module.startswith("_"):
+                yield module, distribution
+
+
+def _read_installed():
+    from importlib import metadata
+    for module, distributions in metadata.packages_distributions().items():
+        if not module.startswith("_"):
+            yield module, distributions[0]
+
+
+def collect_mappings(sources, include_installed: bool = False) -> dict:
+    """Merge mapping sources.
+
+    TSV dumps are authoritative and earlier ones win. Names discovered from
+    wheels or the installed environment are dropped when several distributions
+    claim them, since that only happens for shared namespace roots.
+    """
+    curated = {}
+    discovered = {}
+
+    def discover(pairs):
+        for module, distribution in pairs:
+            discovered.setdefault(module, set()).add(distribution)
+
+    for source in sources:
+        if os.path.isdir(source):
+            for entry in sorted(os.scandir(source), key=lambda e: e.name):
+                if entry.name.endswith(".whl"):
+                    discover(_read_wheel(entry.path))
+                elif entry.name.endswith(".tsv"):
+                    for module, distribution in _read_tsv(entry.path):
+                        curated.setdefault(module, distribution)
+        elif source.endswith(".whl"):
+            discover(_read_wheel(source))
+        else:
+            for module, distribution in _read_tsv(source):
+                curated.setdefault(module, distribution)
+    if include_installed:
+        discover(_read_installed())
+
+    mapping = {module: next(iter(dists)) for module, dists in discovered.items() if len(dists) == 1}
+    mapping.update(curated)
+    return mapping
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_mapping_index():
+    """Lazily open the shared index; returns None when it is unavailable."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = os.getenv("IMPORT_MAP_INDEX", DEFAULT_INDEX_PATH)
+                try:
+                    _index = MappingIndex(path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Import mapping index unavailable ({e}), using installed metadata only")
+                    _index = False
+    return _index or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the import name -> distribution mapping index")
+    parser.add_argument("sources", nargs="*", default=[DEFAULT_SEED_PATH],
+                        help="TSV dumps (module<TAB>distribution), wheels, or directories of either")
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH, help="Index file to write")
+    parser.add_argument("--installed", action="store_true",
+                        help="Also include top-level modules of the distributions installed here")
+    args = parser.parse_args(argv)
+
+    mapping = collect_mappings(args.sources, include_installed=args.installed)
+    build_index(mapping, args.output)
+    print(f"Wrote {len(mapping)} mappings to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
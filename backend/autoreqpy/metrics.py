@@ -0,0 +1,229 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Collects metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+
+    def register(self, metric):
+        """Add ``metric``, replacing any earlier metric with the same name."""
+        with self._lock:
+            self._metrics = [existing for existing in self._metrics if existing.name != metric.name]
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, **labels):
+        values = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                child = self._children[values] = self._new_child()
+            return child
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+
+class _CounterValue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1):
+        self._children[()].inc(amount)
+
+    def samples(self):
+        for values, child in self._items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS,
+                 registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def samples(self):
+        for values, child in self._items():
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, values, [("le", _format_value(float(bound)))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class CallbackMetric(_Metric):
+    """A counter or gauge read from ``fn()`` at scrape time.
+
+    ``fn`` returns a number, or for labelled metrics a dict mapping label
+    value tuples to numbers. Useful for exporting counters that other
+    components (caches, queues) already keep.
+    """
+
+    def __init__(self, name: str, documentation: str, fn, kind: str = "gauge", labelnames=(),
+                 registry=REGISTRY):
+        self.kind = kind
+        self.fn = fn
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return None
+
+    def samples(self):
+        value = self.fn()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, sample in sorted(items):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(sample)}"
+
+
+STAGE_SECONDS = Histogram(
+    "autoreqpy_stage_duration_seconds",
+    "Time spent in each analysis stage.",
+    labelnames=("stage",),
+)
+ANALYSIS_SECONDS = Histogram(
+    "autoreqpy_analysis_duration_seconds",
+    "End-to-end time of repository analyses, including result cache hits.",
+    labelnames=("outcome",),
+)
+CLONED_BYTES = Counter("autoreqpy_cloned_bytes_total", "Bytes of git pack data received by clones.")
+FILES_PARSED = Counter("autoreqpy_files_parsed_total", "Python files scanned for imports.")
+PARSE_FAILURES = Counter("autoreqpy_parse_failures_total", "Python files that could not be parsed.")
+BUDGET_TRUNCATIONS = Counter(
+    "autoreqpy_budget_truncations_total",
+    "Analyses cut short by a resource budget, by the limit that was hit.",
+    labelnames=("limit",),
+)
+
+
+def time_stage(stage: str):
+    """``with time_stage("scan"): ...`` records into the stage histogram."""
+    return STAGE_SECONDS.labels(stage=stage).time()
+
+
+@contextmanager
+def time_analysis():
+    """Records one analysis into ANALYSIS_SECONDS, labelled by its outcome."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        ANALYSIS_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started)
+
+
+def record_scan(stats: dict):
+    FILES_PARSED.inc(stats.get("files", 0))
+    PARSE_FAILURES.inc(stats.get("failures", 0))
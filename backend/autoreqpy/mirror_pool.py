@@ -0,0 +1,284 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .git_source import GitCommandError, fetch_mirror, has_commit, mirror_clone
+from .result_cache import normalize_repo_url
+
+logger = logging.getLogger(__name__)
+
+# How many distinct repositories the request counter remembers
+MAX_TRACKED_REPOS = 10000
+
+
+class ReadWriteLock:
+    """Many readers or one writer; waiting writers block new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self, blocking: bool = True) -> bool:
+        with self._cond:
+            if not blocking:
+                if self._writer or self._readers:
+                    return False
+                self._writer = True
+                return True
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+            return True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                total += _dir_size(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            pass
+    return total
+
+
+class MirrorPool:
+    """Bare mirrors of frequently analyzed repositories, kept up to date.
+
+    A repository gets a mirror once it has been requested ``min_requests``
+    times. Requests for a commit the mirror already has read it straight
+    away; otherwise the mirror is brought up to date with an incremental
+    fetch. Each mirror has a read/write lock: analyses hold it for reading,
+    cloning, fetching and eviction hold it for writing. Mirrors not in use
+    are evicted least recently used first once the pool exceeds
+    ``max_bytes``. A ``max_bytes`` of 0 disables the pool.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 ** 3, min_requests: int = 2):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.min_requests = min_requests
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._mirrors = {}  # key -> [size, last_used]
+        self._requests = OrderedDict()
+        self.hits = 0
+        self.fetches = 0
+        self.clones = 0
+        self.evictions = 0
+        self.fallbacks = 0
+        if max_bytes:
+            os.makedirs(root, exist_ok=True)
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _load(self):
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            if entry.name.endswith(".tmp"):
+                # Left behind by a clone that never finished
+                shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.name.endswith(".git"):
+                self._mirrors[entry.name[:-4]] = [_dir_size(entry.path), entry.stat().st_mtime]
+
+    @staticmethod
+    def key_for(repo_url: str) -> str:
+        return hashlib.sha1(normalize_repo_url(repo_url).encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.git")
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_request(self, repo_url: str) -> bool:
+        """Count a request for ``repo_url``; True once it deserves a mirror.
+
+        ``checkout`` does this itself unless told the request was recorded.
+        """
+        key = self.key_for(repo_url)
+        with self._lock:
+            if key in self._mirrors:
+                return True
+            count = self._requests.pop(key, 0) + 1
+            self._requests[key] = count
+            while len(self._requests) > MAX_TRACKED_REPOS:
+                self._requests.popitem(last=False)
+            return count >= self.min_requests
+
+    @contextmanager
+    def _lock_for(self, key: str):
+        """The mirror's ReadWriteLock, shared by everyone using ``key`` meanwhile.
+
+        Locks are reference counted, so the lock of a mirror that is gone
+        (evicted, or never cloned) is dropped once its last user is done.
+        """
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [ReadWriteLock(), 0]
+            entry[1] += 1
+        try:
+            yield entry[0]
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1] and key not in self._mirrors:
+                    del self._locks[key]
+
+    def _touch(self, key: str, size=None):
+        now = time.time()
+        with self._lock:
+            entry = self._mirrors.setdefault(key, [0, now])
+            entry[1] = now
+            if size is not None:
+                entry[0] = size
+        try:
+            os.utime(self._path(key), (now, now))
+        except OSError:
+            pass
+
+    def _update(self, key: str, repo_url: str, commit_sha: str, progress, popen) -> bool:
+        """Clone or fetch the mirror under the write lock; True if it has the commit."""
+        path = self._path(key)
+        if os.path.isdir(path):
+            if has_commit(path, commit_sha, popen=popen):
+                return True
+            fetch_mirror(path, progress=progress, popen=popen)
+            self._count("fetches")
+        else:
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                mirror_clone(repo_url, tmp_path, progress=progress, popen=popen)
+                os.replace(tmp_path, path)
+            finally:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            self._count("clones")
+        self._touch(key, _dir_size(path))
+        return has_commit(path, commit_sha, popen=popen)
+
+    @contextmanager
+    def checkout(self, repo_url: str, commit_sha: str, progress=None, popen=subprocess.Popen,
+                 recorded: bool = False):
+        """Yield the path of a mirror containing ``commit_sha``, or None.
+
+        None means the caller should fetch the repository itself: the pool is
+        disabled, the repository is not hot yet, or the commit could not be
+        fetched (e.g. it was force-pushed away). The mirror cannot be fetched
+        into or evicted until the ``with`` block exits.
+        """
+        key = self.key_for(repo_url)
+        if not self.enabled or not (recorded or self.record_request(repo_url)):
+            yield None
+            return
+
+        with self._lock_for(key) as lock:
+            path = self._path(key)
+            lock.acquire_read()
+            try:
+                ready = os.path.isdir(path) and has_commit(path, commit_sha, popen=popen)
+            except BaseException:
+                lock.release_read()
+                raise
+            if ready:
+                self._count("hits")
+            else:
+                lock.release_read()
+                lock.acquire_write()
+                try:
+                    ready = self._update(key, repo_url, commit_sha, progress, popen)
+                except (GitCommandError, OSError) as e:
+                    # The direct clone may still work, e.g. when the mirror is damaged
+                    logger.warning(f"Updating the mirror of {repo_url} failed: {e}")
+                    ready = False
+                finally:
+                    lock.release_write()
+                self._evict(keep=key)
+                lock.acquire_read()
+                # An eviction may have slipped in between the two locks
+                ready = ready and os.path.isdir(path)
+
+            try:
+                if not ready:
+                    logger.warning(f"Mirror of {repo_url} cannot provide {commit_sha}; cloning directly")
+                    self._count("fallbacks")
+                    yield None
+                    return
+                self._touch(key)
+                yield path
+            finally:
+                lock.release_read()
+
+    def _evict(self, keep=None):
+        with self._lock:
+            total = sum(size for size, _ in self._mirrors.values())
+            candidates = sorted((last_used, key) for key, (_, last_used) in self._mirrors.items() if key != keep)
+        for _, key in candidates:
+            if total <= self.max_bytes:
+                break
+            with self._lock_for(key) as lock:
+                # Mirrors that are being read or updated are skipped, not waited for
+                if not lock.acquire_write(blocking=False):
+                    continue
+                try:
+                    with self._lock:
+                        size, _ = self._mirrors.pop(key, (0, 0))
+                    shutil.rmtree(self._path(key), ignore_errors=True)
+                finally:
+                    lock.release_write()
+            total -= size
+            self._count("evictions")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mirrors": len(self._mirrors),
+                "bytes": sum(size for size, _ in self._mirrors.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "fetches": self.fetches,
+                "clones": self.clones,
+                "evictions": self.evictions,
+                "fallbacks": self.fallbacks,
+            }
@@ -0,0 +1,308 @@
+import re
+
+_NAME_RE = re.compile(r"[-_.]+")
+
+_REQUIREMENT_RE = re.compile(
+    r"""^\s*
+    (?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*
+    (?:\[(?P<extras>[^\]]*)\])?\s*
+    (?P<specs>\(?[^;]*?\)?)\s*
+    (?:;\s*(?P<marker>.+?))?\s*$""",
+    re.VERBOSE,
+)
+_SPEC_RE = re.compile(r"^\s*(===|~=|==|!=|<=|>=|<|>)\s*([^\s,]+)\s*$")
+
+_VERSION_RE = re.compile(
+    r"""^\s*v?
+    (?:(?P<epoch>\d+)!)?
+    (?P<release>\d+(?:\.\d+)*)
+    (?:[-_.]?(?P<pre_l>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre_n>\d+)?)?
+    (?:-(?P<post_n1>\d+)|[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>\d+)?)?
+    (?:[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>\d+)?)?
+    (?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?
+    \s*$""",
+    re.VERBOSE | re.IGNORECASE,
+)
+_PRE_ORDER = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+_INF = float("inf")
+
+
+def canonicalize_name(name: str) -> str:
+    return _NAME_RE.sub("-", name).lower()
+
+
+def parse_version(version: str):
+    """Sortable key for a PEP 440 version, or None if it is not one."""
+    match = _VERSION_RE.match(version)
+    if not match:
+        return None
+    release = tuple(int(part) for part in match.group("release").split("."))
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    pre_l = match.group("pre_l")
+    post = match.group("post_n1") or match.group("post_n2")
+    has_post = match.group("post_n1") is not None or match.group("post_l") is not None
+    has_dev = match.group("dev_l") is not None
+    # Ordering per PEP 440: dev releases sort before pre-releases, which sort
+    # before the final release, which sorts before post releases.
+    if pre_l is not None:
+        pre = (_PRE_ORDER[pre_l.lower()], int(match.group("pre_n") or 0))
+    elif has_dev and not has_post:
+        pre = (-_INF, 0)
+    else:
+        pre = (_INF, 0)
+    post_key = int(post or 0) if has_post else -_INF
+    dev_key = int(match.group("dev_n") or 0) if has_dev else _INF
+    return int(match.group("epoch") or 0), release, pre, post_key, dev_key
+
+
+def is_prerelease(version: str) -> bool:
+    key = parse_version(version)
+    return key is not None and (key[2][0] != _INF or key[4] != _INF)
+
+
+def _release_prefix(version: str):
+    match = _VERSION_RE.match(version)
+    return tuple(int(part) for part in match.group("release").split(".")) if match else None
+
+
+def specifier_contains(op: str, spec_version: str, candidate: str) -> bool:
+    if op == "===":
+        return candidate.strip() == spec_version.strip()
+    if spec_version.endswith(".*") and op in ("==", "!="):
+        prefix = _release_prefix(spec_version[:-2])
+        release = _release_prefix(candidate)
+        if prefix is None or release is None:
+            return False
+        padded = release + (0,) * max(0, len(prefix) - len(release))
+        matched = padded[:len(prefix)] == prefix
+        return matched if op == "==" else not matched
+
+    spec_key = parse_version(spec_version)
+    key = parse_version(candidate)
+    if spec_key is None or key is None:
+        return False
+    if op == "==":
+        return key == spec_key
+    if op == "!=":
+        return key != spec_key
+    if op == "<=":
+        return key <= spec_key
+    if op == ">=":
+        return key >= spec_key
+    if op == "<":
+        return key < spec_key
+    if op == ">":
+        return key > spec_key
+    if op == "~=":
+        prefix = _release_prefix(spec_version)
+        if prefix is None or len(prefix) < 2:
+            return False
+        return key >= spec_key and specifier_contains("==", ".".join(map(str, prefix[:-1])) + ".*", candidate)
+    return False
+
+
+def parse_specifiers(text: str):
+    """``[(op, version), ...]`` from a comma-separated specifier string."""
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = text[1:-1]
+    specs = []
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        match = _SPEC_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid specifier {part.strip()!r}")
+        specs.append((match.group(1), match.group(2)))
+    return specs
+
+
+def satisfies(version: str, specs) -> bool:
+    return all(specifier_contains(op, spec_version, version) for op, spec_version in specs)
+
+
+class Requirement:
+    __slots__ = ("name", "extras", "specs", "marker", "line")
+
+    def __init__(self, name, extras, specs, marker, line):
+        self.name = name
+        self.extras = extras
+        self.specs = specs
+        self.marker = marker
+        self.line = line
+
+
+def parse_requirement(line: str):
+    """Parse a PEP 508 requirement line; returns None for lines it does not model."""
+    if "@" in line.split(";", 1)[0]:
+        return None  # direct URL references are left to a human or the LLM
+    match = _REQUIREMENT_RE.match(line)
+    if not match:
+        return None
+    extras = frozenset(e.strip().lower() for e in (match.group("extras") or "").split(",") if e.strip())
+    try:
+        specs = parse_specifiers(match.group("specs") or "")
+    except ValueError:
+        return None
+    marker = " ".join(match.group("marker").split()) if match.group("marker") else None
+    return Requirement(canonicalize_name(match.group("name")), extras, specs, marker, line)
+
+
+class NormalizeResult:
+    def __init__(self, requirements, unresolved):
+        self.requirements = requirements
+        self.unresolved = unresolved
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.requirements)
+
+
+def _format(name, extras, specs, marker) -> str:
+    line = name
+    if extras:
+        line += f"[{','.join(sorted(extras))}]"
+    if specs:
+        line += ",".join(f"{op}{version}" for op, version in specs)
+    if marker:
+        line += f"; {marker}"
+    return line
+
+
+def _spec_sort_key(spec):
+    op, version = spec
+    return parse_version(version.rstrip(".*")) or (0,), op
+
+
+def _merge(name, group):
+    """Return ``(line, problem)``; ``problem`` is None when merged cleanly."""
+    markers = {req.marker for req in group}
+    if len(markers) > 1:
+        return None, f"{name}: conflicting environment markers {sorted(m or '' for m in markers)}"
+    marker = markers.pop()
+    extras = frozenset().union(*(req.extras for req in group))
+
+    specs = []
+    for req in group:
+        for spec in req.specs:
+            if spec not in specs:
+                specs.append(spec)
+    pins = [(op, version) for op, version in specs if op in ("==", "===") and not version.endswith(".*")]
+    others = [spec for spec in specs if spec not in pins]
+
+    if pins:
+        if any(parse_version(version) is None for _, version in pins):
+            return None, f"{name}: unparseable version in {[version for _, version in pins]}"
+        # Prefer the newest pinned version that every other constraint admits
+        for op, version in sorted(pins, key=lambda pin: parse_version(pin[1]), reverse=True):
+            if satisfies(version, others):
+                return _format(name, extras, [(op, version)], marker), None
+        return None, f"{name}: no pinned version in {sorted({version for _, version in pins})} satisfies {others}"
+
+    problem = _empty_range(others)
+    if problem:
+        return None, f"{name}: {problem}"
+    return _format(name, extras, sorted(others, key=_spec_sort_key), marker), None
+
+
+def _next_release(prefix) -> str:
+    """The release after every version starting with ``prefix``, e.g. ``1.5`` for ``1.4``."""
+    return ".".join(map(str, prefix[:-1] + (prefix[-1] + 1,)))
+
+
+def _bounds(op, version):
+    """``[(is_lower, version, inclusive), ...]``: the range ``op version`` limits versions to.
+
+    ``~=V`` is ``>=V`` below the next release of V's prefix, and ``==X.*``
+    spans from the first (dev) release of X to the first of X's successor.
+    Raises ValueError for versions that cannot be parsed.
+    """
+    if op in (">=", ">", "<=", "<"):
+        if parse_version(version) is None:
+            raise ValueError(version)
+        return [(op[0] == ">", version, op.endswith("="))]
+    prefix = _release_prefix(version[:-2] if op == "==" else version)
+    if prefix is None or (op == "~=" and len(prefix) < 2) or parse_version(version.rstrip(".*")) is None:
+        raise ValueError(version)
+    if op == "~=":
+        return [(True, version, True), (False, f"{_next_release(prefix[:-1])}.dev0", False)]
+    return [(True, f"{'.'.join(map(str, prefix))}.dev0", True), (False, f"{_next_release(prefix)}.dev0", False)]
+
+
+def _empty_range(specs):
+    """Why no version satisfies the bounds and exclusions in ``specs``, or None if some may."""
+    bounds = []
+    for op, version in specs:
+        if op in (">=", ">", "~=", "<=", "<") or (op == "==" and version.endswith(".*")):
+            try:
+                limits = _bounds(op, version)
+            except ValueError:
+                return f"unparseable version in {op}{version}"
+            bounds.extend((is_lower, bound, inclusive, f"{op}{version}") for is_lower, bound, inclusive in limits)
+    # The tightest bound on each side; at the same version an exclusive bound is tighter
+    lower = max(((parse_version(version), not inclusive, version, spec)
+                 for is_lower, version, inclusive, spec in bounds if is_lower), default=None)
+    upper = min(((parse_version(version), inclusive, version, spec)
+                 for is_lower, version, inclusive, spec in bounds if not is_lower), default=None)
+    if lower is None or upper is None:
+        return None
+    lower_key, lower_exclusive, lower_version, lower_spec = lower
+    upper_key, upper_inclusive, upper_version, upper_spec = upper
+    if lower_key > upper_key:
+        return f"lower bound {lower_spec} exceeds upper bound {upper_spec}"
+    # ~=V and ==X.* bound both sides by themselves
+    bounded_by = lower_spec if lower_spec == upper_spec else f"{lower_spec},{upper_spec}"
+    if lower_key == upper_key and (lower_exclusive or not upper_inclusive):
+        return f"empty range {bounded_by}"
+
+    exclusions = [(op, version) for op, version in specs if op == "!="]
+    if lower_key == upper_key:
+        # Equal inclusive bounds admit exactly one version; an exclusion may rule it out
+        if not satisfies(lower_version, exclusions):
+            return f"the only version {lower_version} its bounds allow is excluded by {exclusions}"
+        return None
+    for op, version in exclusions:
+        if not version.endswith(".*"):
+            continue
+        try:
+            (_, start, _), (_, stop, _) = _bounds("==", version)
+        except ValueError:
+            return f"unparseable version in !={version}"
+        # The whole range lies within the excluded release series
+        if lower_key >= parse_version(start) and upper_key <= parse_version(stop) and (
+                upper_key < parse_version(stop) or not upper_inclusive):
+            return f"range {bounded_by} is excluded by !={version}"
+    return None
+
+
+def normalize(requirements_content: str) -> NormalizeResult:
+    """Merge duplicate requirements and pick one consistent version per package.
+
+    Lines the engine cannot model (URLs, pip options, invalid specifiers) and
+    packages whose constraints conflict are passed through verbatim and
+    reported in ``unresolved``.
+    """
+    groups = {}
+    passthrough = []
+    unresolved = []
+    for raw in requirements_content.splitlines():
+        line = raw.split(" #", 1)[0].strip()
+        if not line or line.startswith("#") or line.startswith("```"):
+            continue
+        req = parse_requirement(line)
+        if req is None:
+            passthrough.append(line)
+            unresolved.append(f"unsupported requirement line: {line}")
+            continue
+        groups.setdefault(req.name, []).append(req)
+
+    requirements = []
+    for name in sorted(groups):
+        line, problem = _merge(name, groups[name])
+        if problem is None:
+            requirements.append(line)
+        else:
+            unresolved.append(problem)
+            requirements.extend(dict.fromkeys(req.line for req in groups[name]))
+    return NormalizeResult(passthrough + requirements, unresolved)
@@ -0,0 +1,135 @@
+"""Requirements for a project that is already on disk.
+
+Scan, resolve and normalize locally, then hand Gemini only what the local
+engine could not settle. This is everything ``--local`` needs, so it must
+not import what only the servers use.
+"""
+import logging
+import os
+
+from dotenv import find_dotenv, load_dotenv
+
+from .llm_cache import LLMCleanup
+from .metrics import record_scan, time_stage
+from .normalizer import normalize
+from .resolver import resolve_requirements
+from .scanner import scan_imports
+
+# Looked up from the working directory, so an installed copy finds .env too.
+# Modules that import this one read their settings after it has loaded.
+load_dotenv(find_dotenv(usecwd=True))
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# Headers of results the LLM should have cleaned up but did not. They are
+# never cached, so a later request gets another chance at the cleanup.
+LLM_ERROR_HEADER = "# Gemini analysis error"
+LLM_SKIPPED_HEADER = "# Gemini cleanup skipped"
+
+
+def _gemini_model():
+    # google.generativeai takes most of a second to import, so only the
+    # first analysis that actually reaches Gemini pays for it
+    import google.generativeai as genai
+
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+
+llm_cleanup = LLMCleanup(
+    _gemini_model,
+    model_name=GEMINI_MODEL,
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(24 * 3600))),
+)
+
+
+def is_fallback(requirements_content: str) -> bool:
+    """Whether ``requirements_content`` is the uncleaned fallback of a failed or skipped LLM cleanup."""
+    return any(line.startswith((LLM_ERROR_HEADER, LLM_SKIPPED_HEADER))
+               for line in requirements_content.splitlines() if line.startswith("#"))
+
+
+def llm_skipped(requirements_content: str) -> str:
+    logger.warning("Gemini API key not set. Returning original requirements.")
+    return f"{LLM_SKIPPED_HEADER}: GEMINI_API_KEY is not set\n{requirements_content}"
+
+
+def llm_failed(requirements_content: str, error: Exception) -> str:
+    logger.error(f"Gemini analysis failed: {error}")
+    return f"{LLM_ERROR_HEADER}: {str(error)}\n{requirements_content}"
+
+
+def analyze_dependencies_with_gemini(requirements_content: str) -> str:
+    if not GEMINI_API_KEY:
+        return llm_skipped(requirements_content)
+
+    try:
+        cleaned = llm_cleanup.cleanup(requirements_content)
+        logger.debug(f"Gemini Analysis Response: {cleaned}")
+        return cleaned
+    except Exception as e:
+        return llm_failed(requirements_content, e)
+
+
+def _no_checkpoint():
+    pass
+
+
+def _no_progress(event, **data):
+    pass
+
+
+def scan_progress_reporter(progress):
+    def on_progress(done, total):
+        progress("scan_progress", files_scanned=done, files_total=total)
+    return on_progress
+
+
+def scan_directory(destination_path: str, workers=None, progress=_no_progress, budget=None) -> set:
+    progress("scan_start")
+    scan_stats = {}
+    with time_stage("scan"):
+        imports = scan_imports(destination_path, workers=workers, progress=scan_progress_reporter(progress),
+                               stats=scan_stats, budget=budget)
+    record_scan(scan_stats)
+    progress("scan_done", imports_found=len(imports), guarded=scan_stats.get("guarded", {}))
+    return imports
+
+
+def local_requirements(destination_path: str, imports, first_party=None, progress=_no_progress):
+    """Resolve and normalize without the LLM; returns ``(raw requirements, NormalizeResult)``."""
+    progress("resolve_start")
+    with time_stage("resolve"):
+        requirements_content = resolve_requirements(imports, destination_path, first_party)
+    progress("resolve_done")
+    # Raw requirements are useful to clients before the LLM cleanup finishes
+    progress("requirements", **{"requirements.txt": requirements_content})
+    logger.info(f"Requirements generated: {len(requirements_content.splitlines())} line(s)")
+    logger.debug(f"Requirements:\n{requirements_content}")
+    with time_stage("normalize"):
+        normalized = normalize(requirements_content)
+    progress("normalize_done", unresolved=normalized.unresolved)
+    if normalized.unresolved:
+        logger.info(f"Local normalizer left {len(normalized.unresolved)} issue(s): {normalized.unresolved}")
+    return requirements_content, normalized
+
+
+def generate_requirements(destination_path: str, workers=None, imports=None, first_party=None,
+                          checkpoint=_no_checkpoint, progress=_no_progress) -> str:
+    if imports is None:
+        imports = scan_directory(destination_path, workers, progress)
+    requirements_content, normalized = local_requirements(destination_path, imports, first_party, progress)
+    if not normalized.unresolved:
+        return normalized.text or requirements_content
+    # Only hand the LLM what the local engine could not settle on its own
+    checkpoint()
+    progress("llm_start")
+    with time_stage("llm"):
+        cleaned = analyze_dependencies_with_gemini(normalized.text)
+    progress("llm_done")
+    return cleaned
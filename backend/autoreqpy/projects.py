@@ -0,0 +1,133 @@
+"""Requirements for each project of a monorepo.
+
+A project is a directory holding one of PROJECT_MARKERS; the root always
+counts as one. The tree is walked and parsed once, through the import
+index, and each file counts towards the innermost project containing it.
+Code of one project imported by another is first-party to both, so it is
+never reported as a requirement.
+"""
+import logging
+import os
+
+from .pipeline import generate_requirements
+from .resolver import first_party_modules
+from .scanner import iter_files
+
+logger = logging.getLogger(__name__)
+
+PROJECT_MARKERS = frozenset({"pyproject.toml", "setup.py", "setup.cfg", "requirements.txt"})
+ROOT_PROJECT = "."
+
+
+def _is_tracked(name: str) -> bool:
+    return name.endswith(".py") or name in PROJECT_MARKERS
+
+
+def scan_tree(root: str):
+    """``(Python files, project directories)`` under ``root``, from one walk.
+
+    Projects are relative to ``root``; the root itself is ``"."``.
+    """
+    python_files = []
+    projects = {ROOT_PROJECT}
+    for path in iter_files(root, _is_tracked):
+        name = os.path.basename(path)
+        if name.endswith(".py"):
+            python_files.append(path)
+        if name in PROJECT_MARKERS:
+            projects.add(os.path.relpath(os.path.dirname(path), root))
+    return python_files, projects
+
+
+def project_of(relpath: str, projects) -> str:
+    """The innermost of ``projects`` containing the root-relative ``relpath``."""
+    directory = os.path.dirname(relpath)
+    while directory:
+        if directory in projects:
+            return directory
+        directory = os.path.dirname(directory)
+    return ROOT_PROJECT
+
+
+def group_by_project(relpaths, projects) -> dict:
+    """``{project: [root-relative paths]}`` for the projects that hold any of ``relpaths``."""
+    groups = {}
+    for rel in relpaths:
+        groups.setdefault(project_of(rel, projects), []).append(rel)
+    return groups
+
+
+def _project_relative(project: str, relpaths):
+    return [os.path.relpath(rel, project) for rel in relpaths]
+
+
+class Monorepo:
+    """Per-project requirements for the tree under ``root``.
+
+    ``scan()`` walks the whole tree; ``refresh()`` only re-checks the given
+    files. Both regenerate just the projects whose files' imports changed,
+    or every project when the layout or the set of first-party modules
+    did, and return the projects whose requirements changed. With
+    ``discover`` off the whole tree is one project.
+    """
+
+    def __init__(self, root: str, index, workers=None, discover: bool = True):
+        self.root = root
+        self.index = index
+        self.workers = workers
+        self.discover = discover
+        self.projects = set()
+        self.file_imports = {}
+        self.first_party = set()
+        self.requirements = {}
+
+    def scan(self) -> list:
+        python_files, projects = scan_tree(self.root)
+        if not self.discover:
+            projects = {ROOT_PROJECT}
+        file_imports = self.index.update(self.root, self.workers, paths=python_files)
+        return self._update(projects, file_imports)
+
+    def refresh(self, relpaths) -> list:
+        if self.discover and any(os.path.basename(rel) in PROJECT_MARKERS for rel in relpaths):
+            # A project may have been added or removed
+            return self.scan()
+        file_imports = self.index.refresh(self.root, relpaths, self.workers)
+        return self._update(self.projects, file_imports)
+
+    def _update(self, projects, file_imports) -> list:
+        groups = group_by_project(file_imports, projects)
+        first_party = set()
+        for project, relpaths in groups.items():
+            first_party |= first_party_modules(_project_relative(project, relpaths))
+
+        if projects != self.projects or first_party != self.first_party:
+            affected = set(groups) | set(self.requirements)
+        else:
+            changed = {rel for rel in file_imports.keys() | self.file_imports.keys()
+                       if file_imports.get(rel) != self.file_imports.get(rel)}
+            affected = {project_of(rel, projects) for rel in changed}
+        self.projects, self.file_imports, self.first_party = projects, dict(file_imports), first_party
+
+        updated = []
+        for project in sorted(affected):
+            if project not in groups:
+                # Its last Python file is gone
+                if self.requirements.pop(project, None) is not None:
+                    updated.append(project)
+                continue
+            imports = set()
+            for rel in groups[project]:
+                imports.update(file_imports[rel])
+            requirements = generate_requirements(os.path.join(self.root, project), self.workers, imports=imports,
+                                                 first_party=first_party)
+            if self.requirements.get(project) != requirements:
+                self.requirements[project] = requirements
+                updated.append(project)
+        try:
+            self.index.save()
+        except OSError as e:
+            logger.warning(f"Failed to save import index {self.index.index_path}: {e}")
+        if updated:
+            logger.info(f"Requirements changed for {len(updated)} project(s): {', '.join(updated)}")
+        return updated
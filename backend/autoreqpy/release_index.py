@@ -0,0 +1,251 @@
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from .mapping_index import DEFAULT_SEED_PATH, MappingIndex, build_index, collect_mappings
+from .normalizer import canonicalize_name, is_prerelease, parse_specifiers, parse_version, satisfies
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ARQREL01"
+# Release lists of long-lived packages outgrow the mapping index's 16-bit lengths
+_LEN = struct.Struct("<I")
+
+DEFAULT_RELEASE_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "releases.idx")
+PYPI_JSON_URL = "https://pypi.org/pypi/{name}/json"
+# How often a running server checks whether the snapshot was rebuilt
+RELOAD_INTERVAL = 60
+
+
+def target_python() -> str:
+    """Python version that pins must support: TARGET_PYTHON, else this interpreter's."""
+    return os.getenv("TARGET_PYTHON") or f"{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+@lru_cache(maxsize=4096)
+def python_supported(requires_python: str, python_version: str) -> bool:
+    if not requires_python:
+        return True
+    try:
+        specs = parse_specifiers(requires_python)
+    except ValueError:
+        # Malformed metadata should not hide an otherwise good release
+        return True
+    return satisfies(python_version, specs)
+
+
+class Release:
+    __slots__ = ("version", "requires_python", "yanked")
+
+    def __init__(self, version, requires_python, yanked):
+        self.version = version
+        self.requires_python = requires_python
+        self.yanked = yanked
+
+
+class ReleaseIndex(MappingIndex):
+    """Memory-mapped snapshot of canonical distribution name -> releases.
+
+    Each value lists ``version<TAB>requires-python<TAB>yanked`` lines, newest
+    first, so picking a pin usually stops at the first line.
+    """
+
+    magic = MAGIC
+    length_format = _LEN
+    description = "a release index"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._latest = {}
+
+    def iter_releases(self, distribution: str):
+        """Releases of ``distribution``, newest first; none if it is not in the snapshot."""
+        value = self.get(canonicalize_name(distribution))
+        for line in value.split("\n") if value else ():
+            version, requires_python, yanked = line.split("\t")
+            yield Release(version, requires_python, yanked == "y")
+
+    def releases(self, distribution: str) -> list:
+        return list(self.iter_releases(distribution))
+
+    def latest(self, distribution: str, python_version=None):
+        """Newest version of ``distribution`` to pin, or None if the snapshot has none.
+
+        Yanked releases and releases whose requires-python excludes
+        ``python_version`` are skipped. Pre-releases are only used when
+        nothing else qualifies, as pip does.
+        """
+        key = (canonicalize_name(distribution), python_version or target_python())
+        if key not in self._latest:
+            prerelease = None
+            for release in self.iter_releases(key[0]):
+                if release.yanked or not python_supported(release.requires_python, key[1]):
+                    continue
+                if not is_prerelease(release.version):
+                    self._latest[key] = release.version
+                    break
+                prerelease = prerelease or release.version
+            else:
+                self._latest[key] = prerelease
+        return self._latest[key]
+
+
+def build_release_index(releases: dict, out_path: str):
+    """Write ``{distribution: {version: (requires_python, yanked)}}`` as a release index."""
+    table = {}
+    for name, versions in releases.items():
+        # Versions that are not PEP 440 cannot be pinned or compared
+        ordered = sorted((v for v in versions if parse_version(v) is not None), key=parse_version, reverse=True)
+        if ordered:
+            table[canonicalize_name(name)] = "\n".join(
+                f"{version}\t{versions[version][0]}\t{'y' if versions[version][1] else ''}" for version in ordered)
+    build_index(table, out_path, magic=MAGIC, length_format=_LEN)
+    return len(table)
+
+
+def fetch_releases(name: str, timeout: float = 30):
+    """``(canonical name, {version: (requires_python, yanked)})`` from PyPI's JSON API."""
+    # Only building a snapshot talks to PyPI; pinning from one stays offline
+    import urllib.parse
+    import urllib.request
+
+    request = urllib.request.Request(PYPI_JSON_URL.format(name=urllib.parse.quote(name)),
+                                     headers={"Accept": "application/json", "User-Agent": "autoreqpy"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = json.load(response)
+    versions = {}
+    for version, files in data.get("releases", {}).items():
+        if not files:
+            continue  # a version with no uploads cannot be installed
+        requires_python = next((f["requires_python"] for f in files if f.get("requires_python")), "")
+        versions[version] = (" ".join(requires_python.split()), all(f.get("yanked") for f in files))
+    return canonicalize_name(data["info"]["name"]), versions
+
+
+def read_dump(path: str) -> dict:
+    """Releases from a ``distribution<TAB>version<TAB>requires-python<TAB>yanked`` dump."""
+    releases = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            name, version, requires_python, yanked = (line.split("\t") + ["", ""])[:4]
+            releases.setdefault(canonicalize_name(name), {})[version] = (requires_python, yanked in ("1", "y"))
+    return releases
+
+
+def write_dump(releases: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# distribution\tversion\trequires-python\tyanked\n")
+        for name in sorted(releases):
+            for version, (requires_python, yanked) in sorted(releases[name].items()):
+                f.write(f"{name}\t{version}\t{requires_python}\t{'1' if yanked else '0'}\n")
+
+
+def _mapped_distributions(seed_path: str = DEFAULT_SEED_PATH) -> set:
+    return set(collect_mappings([seed_path]).values())
+
+
+def _installed_distributions() -> set:
+    from importlib import metadata
+    return {dist.metadata["Name"] for dist in metadata.distributions() if dist.metadata["Name"]}
+
+
+def fetch_all(names, workers: int = 16) -> dict:
+    import urllib.error
+
+    releases = {}
+
+    def fetch(name):
+        try:
+            return fetch_releases(name)
+        except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not fetch releases of {name}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(fetch, sorted(names)):
+            if result is not None:
+                releases[result[0]] = result[1]
+    return releases
+
+
+_index = None
+_index_mtime = None
+_index_checked = 0.0
+_index_lock = threading.Lock()
+
+
+def get_release_index():
+    """The shared snapshot, opened lazily; None when none has been built.
+
+    A snapshot rebuilt in place is picked up within RELOAD_INTERVAL seconds.
+    Readers of the previous one keep their mapping until they drop it.
+    """
+    global _index, _index_mtime, _index_checked
+    now = time.monotonic()
+    if _index is not None and now - _index_checked < RELOAD_INTERVAL:
+        return _index or None
+    with _index_lock:
+        if _index is not None and now - _index_checked < RELOAD_INTERVAL:
+            return _index or None
+        _index_checked = now
+        path = os.getenv("RELEASE_INDEX", DEFAULT_RELEASE_INDEX_PATH)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != _index_mtime or _index is None:
+            _index_mtime = mtime
+            try:
+                _index = ReleaseIndex(path)
+            except (OSError, ValueError) as e:
+                if _index:
+                    logger.warning(f"Could not reload release snapshot ({e}), keeping the loaded one")
+                else:
+                    if _index is None:
+                        logger.info(f"Release snapshot unavailable ({e}), leaving versions unpinned")
+                    _index = False
+    return _index or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline release metadata snapshot used to pin versions")
+    parser.add_argument("names", nargs="*",
+                        help="Distributions to fetch from PyPI (default: every distribution in the import map)")
+    parser.add_argument("--installed", action="store_true", help="Also fetch every distribution installed here")
+    parser.add_argument("--from-dump", action="append", default=[], metavar="PATH",
+                        help="Start from a TSV dump instead of fetching (repeatable)")
+    parser.add_argument("--dump", metavar="PATH", help="Also write the collected releases as a TSV dump")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent PyPI requests")
+    parser.add_argument("-o", "--output", default=DEFAULT_RELEASE_INDEX_PATH, help="Snapshot file to write")
+    args = parser.parse_args(argv)
+
+    releases = {}
+    for path in args.from_dump:
+        releases.update(read_dump(path))
+    names = set(args.names)
+    if args.installed:
+        names |= _installed_distributions()
+    if not names and not args.from_dump:
+        names = _mapped_distributions()
+    if names:
+        releases.update(fetch_all(names, args.workers))
+
+    if args.dump:
+        write_dump(releases, args.dump)
+    count = build_release_index(releases, args.output)
+    print(f"Wrote releases of {count} distributions to {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
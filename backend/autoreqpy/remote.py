@@ -0,0 +1,309 @@
+"""Requirements for a GitHub repository.
+
+Clone it, or read it from the mirror pool, scan it within a resource budget
+and cache the result by commit. Importing this module sets up the
+workspaces, mirror pool and result cache, so only the servers do.
+"""
+import logging
+import os
+import time
+
+from .archive_source import DEFAULT_ARCHIVE_URL, archive_url, read_archive_sources
+from .budgets import Budget, BudgetExceeded
+from .git_source import (bare_clone, full_clone, pack_bytes, pin_commit, read_python_sources, run_git,
+                         scan_git_objects, shared_checkout, sparse_clone)
+from .jobs import JobCancelled
+from .metrics import CLONED_BYTES, STAGE_SECONDS, record_scan, time_analysis, time_stage
+from .mirror_pool import MirrorPool
+from .pipeline import (_no_checkpoint, _no_progress, generate_requirements, is_fallback, scan_directory,
+                       scan_progress_reporter)
+from .resolver import first_party_modules
+from .result_cache import ResultCache
+from .scanner import scan_sources
+from .workspace import WorkspaceManager
+
+logger = logging.getLogger(__name__)
+
+# Use environment variable for base directory or default
+CLONE_BASE_DIR = os.getenv("CLONE_BASE_DIR", "./cloned_repos")
+# "sparse": blob-filtered clone with only *.py checked out
+# "objects": bare clone, .py blobs read from the object store
+# "full": plain shallow clone with a complete work tree
+# "archive": source archive streamed over HTTP, nothing written to disk
+FETCH_MODE = os.getenv("FETCH_MODE", "sparse")
+# Archive location; may use {url}, {owner}, {repo} and {ref}
+ARCHIVE_URL = os.getenv("ARCHIVE_URL", DEFAULT_ARCHIVE_URL)
+ARCHIVE_TIMEOUT = float(os.getenv("ARCHIVE_TIMEOUT", "60"))
+# Leading directories dropped from archive member names
+ARCHIVE_STRIP_COMPONENTS = int(os.getenv("ARCHIVE_STRIP_COMPONENTS", "1"))
+
+# Per-request clone directories; optionally placed on a size-capped tmpfs
+workspaces = WorkspaceManager(
+    CLONE_BASE_DIR,
+    tmpfs_dir=os.getenv("WORKSPACE_TMPFS_DIR") or None,
+    tmpfs_max_bytes=int(os.getenv("WORKSPACE_TMPFS_MAX_BYTES", "0")),
+    tmpfs_workspace_bytes=int(os.getenv("WORKSPACE_TMPFS_RESERVE_BYTES", str(256 * 1024 * 1024))),
+    on_deleted=STAGE_SECONDS.labels(stage="cleanup").observe,
+)
+
+mirror_pool = MirrorPool(
+    os.getenv("MIRROR_POOL_DIR") or os.path.join(CLONE_BASE_DIR, "_mirrors"),
+    max_bytes=int(os.getenv("MIRROR_POOL_MAX_BYTES", str(2 * 1024 ** 3))),
+    min_requests=int(os.getenv("MIRROR_POOL_MIN_REQUESTS", "2")),
+)
+
+# Per-analysis resource budgets; 0 disables a limit
+BUDGET_LIMITS = {
+    "max_clone_bytes": int(os.getenv("MAX_CLONE_BYTES", str(1024 ** 3))),
+    "max_clone_objects": int(os.getenv("MAX_CLONE_OBJECTS", "0")),
+    "max_files": int(os.getenv("MAX_SCAN_FILES", "100000")),
+    "max_file_bytes": int(os.getenv("MAX_FILE_BYTES", str(2 * 1024 * 1024))),
+    "parse_timeout": float(os.getenv("PARSE_TIMEOUT", "10")),
+    "max_memory_bytes": int(os.getenv("MAX_REQUEST_MEMORY_BYTES", str(512 * 1024 * 1024))),
+}
+
+# What a checkpoint raises to stop its own analysis
+CHECKPOINT_ERRORS = (JobCancelled, TimeoutError)
+
+result_cache = ResultCache(
+    os.getenv("RESULT_CACHE_DIR", "./result_cache"),
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    max_age=float(os.getenv("RESULT_CACHE_MAX_AGE", str(7 * 24 * 3600))),
+)
+
+
+def clone_progress_reporter(progress):
+    def on_progress(phase, objects, total, received):
+        progress("clone_progress", phase=phase, objects=objects, total_objects=total, bytes=received)
+    return on_progress
+
+
+def new_budget(workspace=None) -> Budget:
+    """A budget with the configured limits.
+
+    A clone into a tmpfs workspace may not outgrow the space reserved for
+    it, or a single repository could fill the mount. Archives are read in
+    memory, so the archive fetch mode is held to the configured limits.
+    """
+    limits = dict(BUDGET_LIMITS)
+    if workspace is not None and workspace.on_tmpfs and FETCH_MODE != "archive":
+        reserved = workspaces.tmpfs_workspace_bytes
+        limits["max_clone_bytes"] = min(limits["max_clone_bytes"] or reserved, reserved)
+    return Budget(**limits)
+
+
+def resolve_head_sha(repo_url: str) -> str:
+    output = run_git(["ls-remote", repo_url, "HEAD"])
+    if not output.strip():
+        raise ValueError(f"No HEAD found for {repo_url}")
+    return output.split()[0]
+
+
+def scan_objects(git_dir: str, rev: str, workspace, progress=_no_progress, budget=None):
+    """Scan blobs from the object store; returns ``(imports, first-party modules)``."""
+    progress("scan_start")
+    scan_stats = {}
+    with time_stage("scan"):
+        imports, paths = scan_git_objects(git_dir, rev, progress=scan_progress_reporter(progress),
+                                          popen=workspace.popen, stats=scan_stats, budget=budget)
+    record_scan(scan_stats)
+    progress("scan_done", imports_found=len(imports), guarded=scan_stats.get("guarded", {}))
+    return imports, first_party_modules(paths)
+
+
+def fetch_archive(repo_url: str, commit_sha=None, progress=None, budget=None) -> list:
+    """``(path, source)`` of the Python files in the archive of ``commit_sha`` (default HEAD)."""
+    stats = {}
+    sources = read_archive_sources(archive_url(repo_url, commit_sha or "HEAD", ARCHIVE_URL), progress=progress,
+                                   budget=budget, timeout=ARCHIVE_TIMEOUT,
+                                   strip_components=ARCHIVE_STRIP_COMPONENTS, stats=stats)
+    CLONED_BYTES.inc(stats["bytes"])
+    return sources
+
+
+def scan_fetched_sources(sources, progress=_no_progress, budget=None):
+    """Scan in-memory ``(path, source)`` pairs; returns ``(imports, first-party modules)``."""
+    progress("scan_start")
+    scan_stats = {}
+    with time_stage("scan"):
+        imports = scan_sources(sources, progress=scan_progress_reporter(progress), stats=scan_stats, budget=budget)
+    record_scan(scan_stats)
+    progress("scan_done", imports_found=len(imports), guarded=scan_stats.get("guarded", {}))
+    return imports, first_party_modules(path for path, _ in sources)
+
+
+def scan_from_mirror(repo_url: str, workspace, commit_sha: str, progress=_no_progress, recorded=False,
+                     budget=None):
+    """``(imports, first_party)`` read through the mirror pool, or None to clone directly.
+
+    The mirror is only locked while it is read: until the work tree is
+    checked out, or in objects mode until the blobs are in memory. The scan
+    runs after the lock is released, so it never holds up fetches into or
+    the eviction of the mirror.
+    """
+    budget = budget or new_budget(workspace)
+    # The mirror lives in the pool rather than the workspace, so its fetch
+    # is held to the configured limits only
+    on_clone_progress = new_budget().watch_clone(clone_progress_reporter(progress))
+    started = time.perf_counter()
+    sources = None
+    try:
+        with mirror_pool.checkout(repo_url, commit_sha, progress=on_clone_progress, popen=workspace.popen,
+                                  recorded=recorded) as mirror_path:
+            if mirror_path is None:
+                return None
+            if FETCH_MODE == "objects":
+                sources = read_python_sources(mirror_path, commit_sha, popen=workspace.popen, budget=budget)
+            else:
+                shared_checkout(mirror_path, workspace.path, commit_sha, sparse=FETCH_MODE == "sparse",
+                                popen=workspace.popen)
+    except BudgetExceeded as e:
+        # Full history can be over budget where a shallow clone is not
+        logger.warning(f"Mirror of {repo_url} is over budget ({e}); cloning directly")
+        return None
+    STAGE_SECONDS.labels(stage="clone").observe(time.perf_counter() - started)
+    progress("clone_done", mirror=True)
+    if sources is not None:
+        return scan_fetched_sources(sources, progress, budget)
+    return scan_directory(workspace.path, progress=progress, budget=budget), None
+
+
+# The clone of each git fetch mode; "archive" downloads instead
+CLONERS = {
+    "sparse": sparse_clone,
+    "objects": bare_clone,
+    "full": full_clone,
+}
+
+
+def fetch(repo_url: str, workspace, commit_sha=None, progress=None, budget=None):
+    """Fetch ``repo_url`` at ``commit_sha`` (default HEAD) the FETCH_MODE way.
+
+    Returns the archive's ``(path, source)`` pairs, or None after a clone.
+    """
+    if FETCH_MODE == "archive":
+        return fetch_archive(repo_url, commit_sha, progress, budget)
+    CLONERS[FETCH_MODE](repo_url, workspace.path, progress=progress, popen=workspace.popen)
+    if commit_sha:
+        pin_commit(workspace.path, commit_sha, bare=FETCH_MODE == "objects", progress=progress,
+                   popen=workspace.popen)
+    return None
+
+
+def clone_aborted(repo_url: str, error: BudgetExceeded, progress, budget) -> str:
+    """The result of an analysis whose fetch went over budget: the truncation report alone."""
+    logger.warning(f"Clone of {repo_url} aborted: {error}")
+    budget.note(error.limit, str(error))
+    progress("budget_exceeded", truncations=budget.truncations)
+    return budget.report()
+
+
+def scan_fetched(workspace, sources=None, progress=_no_progress, budget=None):
+    """``(imports, first_party)`` of what ``fetch`` got: the archive ``sources``, or the clone in ``workspace``."""
+    if FETCH_MODE != "archive":
+        CLONED_BYTES.inc(pack_bytes(workspace.path))
+    progress("clone_done")
+    if FETCH_MODE == "archive":
+        return scan_fetched_sources(sources, progress, budget)
+    if FETCH_MODE == "objects":
+        return scan_objects(workspace.path, "HEAD", workspace, progress, budget)
+    return scan_directory(workspace.path, progress=progress, budget=budget), None
+
+
+def annotated_result(requirements_content: str, progress, budget) -> str:
+    """``requirements_content`` headed by the truncation report, if ``budget`` cut anything."""
+    if budget.truncated:
+        progress("budget_exceeded", truncations=budget.truncations)
+    return budget.annotate(requirements_content)
+
+
+def clone_and_generate(repo_url: str, workspace, checkpoint=_no_checkpoint,
+                       progress=_no_progress, commit_sha=None, budget=None) -> str:
+    """Requirements for ``repo_url``, headed by a truncation report if ``budget`` cut anything.
+
+    With the archive fetch mode ``workspace.path`` is never created.
+    """
+    budget = budget or new_budget(workspace)
+    progress("clone_start", fetch_mode=FETCH_MODE)
+    scanned = None
+    if commit_sha and FETCH_MODE != "archive":
+        scanned = scan_from_mirror(repo_url, workspace, commit_sha, progress, budget=budget)
+    if scanned is None:
+        on_clone_progress = budget.watch_clone(clone_progress_reporter(progress))
+        try:
+            with time_stage("clone"):
+                sources = fetch(repo_url, workspace, commit_sha, on_clone_progress, budget)
+        except BudgetExceeded as e:
+            return clone_aborted(repo_url, e, progress, budget)
+        checkpoint()
+        scanned = scan_fetched(workspace, sources, progress, budget)
+    checkpoint()
+    imports, first_party = scanned
+    requirements_content = generate_requirements(workspace.path, imports=imports, first_party=first_party,
+                                                 checkpoint=checkpoint, progress=progress)
+    return annotated_result(requirements_content, progress, budget)
+
+
+def new_workspace(repo_url: str):
+    return workspaces.create(repo_url.rstrip("/").split("/")[-1].replace(".git", ""))
+
+
+def analyze_repo(repo_url: str, workspace, checkpoint=_no_checkpoint,
+                 progress=_no_progress) -> str:
+    with time_analysis():
+        try:
+            commit_sha = resolve_head_sha(repo_url)
+        except Exception as e:
+            logger.warning(f"Could not resolve HEAD of {repo_url}, skipping result cache: {e}")
+            commit_sha = None
+
+        checkpoint()
+        budget = new_budget(workspace)
+        if commit_sha:
+            progress("resolved_commit", commit=commit_sha)
+            # Truncated results are not cached, so raising a limit takes effect at once,
+            # and neither are LLM fallbacks, so a passing Gemini failure is retried.
+            # Concurrent requests for the commit wait on one analysis, each with its
+            # own checkpoint; if the one running it is cancelled or times out, the
+            # next waiter takes over instead of failing with it.
+            return result_cache.get_or_compute(
+                repo_url, commit_sha,
+                lambda: clone_and_generate(repo_url, workspace, checkpoint, progress, commit_sha, budget),
+                cacheable=lambda result: not budget.truncated and not is_fallback(result),
+                checkpoint=checkpoint, retry_on=CHECKPOINT_ERRORS)
+        return clone_and_generate(repo_url, workspace, checkpoint, progress, budget=budget)
+
+
+def deadline_checkpoint(timeout: float):
+    deadline = time.time() + timeout
+
+    def checkpoint():
+        if time.time() > deadline:
+            raise TimeoutError(f"Analysis exceeded its {timeout}s timeout")
+    return checkpoint
+
+
+def analyze_repo_result(repo_url: str, timeout=None) -> dict:
+    """``{"requirements.txt": ...}`` or ``{"error": ...}`` for one repository of a batch.
+
+    The ``timeout`` clock starts here, when a worker takes the repository
+    up, not when it was queued.
+    """
+    checkpoint = deadline_checkpoint(timeout) if timeout else _no_checkpoint
+    workspace = new_workspace(repo_url)
+    try:
+        return {"requirements.txt": analyze_repo(repo_url, workspace, checkpoint)}
+    except Exception as e:
+        logger.error(f"Analysis of {repo_url} failed: {str(e)}")
+        return {"error": f"Operation failed: {str(e)}"}
+    finally:
+        workspaces.release(workspace)
+
+
+def run_analysis_job(job, repo_url: str) -> dict:
+    workspace = new_workspace(repo_url)
+    try:
+        return {"requirements.txt": analyze_repo(repo_url, workspace, job.checkpoint)}
+    finally:
+        workspaces.release(workspace)
@@ -0,0 +1,108 @@
+import logging
+import os
+import sys
+from functools import lru_cache
+from importlib import metadata
+
+from .mapping_index import get_mapping_index
+from .release_index import get_release_index
+from .scanner import iter_python_files, top_level
+
+logger = logging.getLogger(__name__)
+
+# sys.stdlib_module_names (new in 3.10) is why AutoReqPy needs Python 3.10
+STDLIB_MODULES = frozenset(sys.stdlib_module_names) | frozenset(sys.builtin_module_names)
+
+
+@lru_cache(maxsize=1)
+def _installed_distributions() -> dict:
+    mapping = {}
+    try:
+        for name, dists in metadata.packages_distributions().items():
+            # Names shared by several distributions are namespace roots
+            if len(set(dists)) == 1:
+                mapping[name] = dists[0]
+    except Exception as e:
+        logger.warning(f"Could not read installed distribution metadata: {e}")
+    return mapping
+
+
+def _pinned_version(distribution: str):
+    """Newest suitable release from the offline snapshot, or None to leave it unpinned.
+
+    What is installed here says nothing about the analyzed project, so it is
+    never used as a pin.
+    """
+    index = get_release_index()
+    return index.latest(distribution) if index is not None else None
+
+
+def first_party_modules(paths) -> set:
+    """Top-level names importable from the given project-relative ``.py`` paths.
+
+    Besides packages, every script directory counts: a module imported by a
+    sibling script is first-party too.
+    """
+    paths = [p.replace(os.sep, "/") for p in paths]
+    package_dirs = {p.rsplit("/", 1)[0] for p in paths if p.endswith("/__init__.py")}
+    names = set()
+    for path in paths:
+        directory, _, filename = path.rpartition("/")
+        if directory not in package_dirs:
+            names.add(filename[:-3])
+        # Walk up to the outermost package containing this file
+        package = None
+        while directory in package_dirs:
+            directory, _, package = directory.rpartition("/")
+        if package:
+            names.add(package)
+    names.discard("__init__")
+    names.discard("setup")
+    return names
+
+
+def local_modules(root: str) -> set:
+    return first_party_modules(os.path.relpath(path, root) for path in iter_python_files(root))
+
+
+def _lookup(module: str):
+    index = get_mapping_index()
+    distribution = index.resolve(module) if index is not None else None
+    if distribution is None:
+        distribution = _installed_distributions().get(top_level(module))
+    return distribution
+
+
+def resolve_distributions(imports, root=None, first_party=None) -> dict:
+    """Map import names to ``{distribution: version or None}``.
+
+    Standard-library and first-party modules are skipped. A top-level name
+    with no known distribution is assumed to be its own distribution, unless
+    it is a namespace root (e.g. ``google``) whose sub-packages did resolve.
+    """
+    if first_party is None:
+        first_party = local_modules(root) if root else frozenset()
+    distributions = set()
+    unmapped = set()
+    namespaces = set()
+    for name in imports:
+        top = top_level(name)
+        if top in STDLIB_MODULES or top in first_party or top.startswith("_"):
+            continue
+        distribution = _lookup(name)
+        if distribution is None:
+            unmapped.add(top)
+            continue
+        distributions.add(distribution)
+        if name != top and _lookup(top) is None:
+            namespaces.add(top)
+
+    distributions.update(unmapped - namespaces)
+    return {dist: _pinned_version(dist) for dist in distributions}
+
+
+def resolve_requirements(imports, root=None, first_party=None) -> str:
+    resolved = resolve_distributions(imports, root, first_party)
+    lines = [f"{dist}=={version}" if version else dist
+             for dist, version in sorted(resolved.items(), key=lambda item: item[0].lower())]
+    return "\n".join(lines) or "# No imports detected"
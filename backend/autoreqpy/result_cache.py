@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape or meaning of cached analysis results changes so that
+# stale entries written by an older pipeline are never served.
+CACHE_VERSION = 7
+
+
+def normalize_repo_url(url: str) -> str:
+    parts = urlsplit(str(url).strip())
+    host = (parts.hostname or "").lower()
+    if host == "www.github.com":
+        host = "github.com"
+    path = parts.path.rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    if host == "github.com":
+        # GitHub owner/repo names are case-insensitive
+        path = path.lower()
+    return f"{host}{path}"
+
+
+class ResultCache:
+    """On-disk analysis cache keyed by (normalized repo URL, commit SHA).
+
+    Entries are JSON files whose mtime doubles as the LRU access time.
+    Eviction drops expired entries first, then the least recently used ones
+    until both the entry count and the total size fit their limits.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024, max_age: float = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(repo_url: str, commit_sha: str) -> str:
+        raw = f"{CACHE_VERSION}\0{normalize_repo_url(repo_url)}\0{commit_sha.strip().lower()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.max_age:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("result")
+
+    def _store(self, key: str, repo_url: str, commit_sha: str, result):
+        entry = {
+            "url": normalize_repo_url(repo_url),
+            "sha": commit_sha,
+            "created_at": time.time(),
+            "result": result,
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+            self._remove(tmp_path)
+            return
+        self._evict()
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        with self._lock:
+            try:
+                scan = list(os.scandir(self.cache_dir))
+            except OSError:
+                return
+            for entry in scan:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            count = len(entries)
+            for mtime, size, path in entries:
+                expired = now - mtime > self.max_age
+                if not expired and count <= self.max_entries and total <= self.max_bytes:
+                    break
+                self._remove(path)
+                self.evictions += 1
+                count -= 1
+                total -= size
+
+    def get(self, repo_url: str, commit_sha: str):
+        result = self._load(self.key_for(repo_url, commit_sha))
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, repo_url: str, commit_sha: str, result):
+        self._store(self.key_for(repo_url, commit_sha), repo_url, commit_sha, result)
+
+    def get_or_compute(self, repo_url: str, commit_sha: str, compute, cacheable=None, checkpoint=None,
+                       retry_on=()):
+        """Cached result, or ``compute()`` stored unless ``cacheable(result)`` is false.
+
+        Concurrent callers share one ``compute()``; ``checkpoint`` and
+        ``retry_on`` are handed to ``SingleFlight.do`` for them.
+        """
+        key = self.key_for(repo_url, commit_sha)
+        result = self._load(key)
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+            return result
+
+        def _fill():
+            # Another leader may have filled the entry since our first look
+            cached = self._load(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                return cached
+            with self._lock:
+                self.misses += 1
+            value = compute()
+            if cacheable is None or cacheable(value):
+                self._store(key, repo_url, commit_sha, value)
+            return value
+
+        result, shared = self._flight.do(key, _fill, checkpoint=checkpoint, retry_on=retry_on)
+        if shared:
+            with self._lock:
+                self.coalesced += 1
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "in_flight": self._flight.in_flight(),
+            }
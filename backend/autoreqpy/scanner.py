@@ -0,0 +1,567 @@
+import ast
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+# Directories that never contain first-party sources worth scanning. They are
+# pruned before descending, so large vendored trees cost nothing.
+PRUNED_DIRS = frozenset({
+    ".git", ".hg", ".svn", "__pycache__", "node_modules",
+    "venv", ".venv", "env", "virtualenv", ".tox", ".nox", "site-packages",
+    "build", "dist", ".eggs", ".mypy_cache", ".pytest_cache", ".ruff_cache",
+})
+
+# Bump whenever get_imports_from_file changes what it extracts; persisted
+# per-file results from an older parser are then discarded.
+PARSER_VERSION = 2
+
+# Imports are recorded with up to this many dotted components so namespace
+# packages such as google.generativeai can be told apart from their siblings.
+MAX_IMPORT_DEPTH = 3
+
+DEFAULT_BATCH_SIZE = 64
+# Below this many files the cost of shipping work to other processes
+# outweighs the parsing itself.
+SERIAL_THRESHOLD = 128
+
+# With a parse timeout, sources at least this large are parsed in a child
+# interpreter that can be killed. ast.parse runs in C without checking for
+# signals, so nothing in-process can interrupt it; smaller files finish in
+# well under a second anyway.
+ISOLATED_PARSE_BYTES = 256 * 1024
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _truncate(module: str) -> str:
+    return '.'.join(module.split('.')[:MAX_IMPORT_DEPTH])
+
+
+def top_level(module: str) -> str:
+    return module.split('.', 1)[0]
+
+
+def _add_from_import(imports: set, module: str, names):
+    imports.add(_truncate(module))
+    if module.count('.') + 1 < MAX_IMPORT_DEPTH:
+        for name in names:
+            if name != '*':
+                imports.add(f"{module}.{name}")
+
+
+# Tier 2 skips over string literals and comments and stops at import
+# statements and at anything that needs the AST: an ``import`` keyword
+# not at the start of a line, or a dynamic import. Every alternative starts
+# with a literal character, which lets the regex engine skip ahead to the
+# next candidate in C; statements are matched by the newline before them.
+_LEXER = re.compile(r'''
+    \'\'\'(?:\\[\s\S]|[^\\])*?\'\'\' | """(?:\\[\s\S]|[^\\])*?""" | '(?:\\[\s\S]|[^'\\\n])*' | "(?:\\[\s\S]|[^"\\\n])*"
+  | \#[^\n]*
+  | \n([ \t]*)(import|from)\b
+  | import(?:lib|_module)?\b | __import__
+''', re.VERBOSE)
+_DOTTED = r"[^\W\d]\w*(?:\.[^\W\d]\w*)*"
+_IMPORT_RE = re.compile(r"import\s+(.+)")
+_FROM_RE = re.compile(rf"from\s+(\.*)\s*({_DOTTED})?\s+import\s+(.+)")
+_ALIAS_RE = re.compile(rf"({_DOTTED}|\*)(?:\s+as\s+[^\W\d]\w*)?")
+
+
+def _logical_line(source: str, start: int):
+    """``(text, end)`` of the statement starting at ``start``, comments removed."""
+    parts = []
+    depth = 0
+    pos = start
+    while True:
+        end = source.find('\n', pos)
+        if end == -1:
+            end = len(source)
+        line = source[pos:end].split('#', 1)[0].rstrip()
+        depth += line.count('(') - line.count(')')
+        continued = line.endswith('\\')
+        parts.append(line[:-1] if continued else line)
+        if end == len(source) or (depth <= 0 and not continued):
+            return ' '.join(parts), end
+        pos = end + 1
+
+
+def _aliases(text: str):
+    text = text.strip()
+    if text.startswith('(') and text.endswith(')'):
+        text = text[1:-1]
+    names = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = _ALIAS_RE.fullmatch(part)
+        if not match:
+            return None
+        names.append(match.group(1))
+    return names or None
+
+
+def fast_imports(source: str):
+    """Imports of a module whose imports are all plain top-level statements.
+
+    Returns None when the AST is needed: nested (possibly guarded) imports,
+    ``import`` after a colon, semicolons, dynamic imports, or any statement
+    the line patterns do not fully understand. Only import statements are
+    looked at, so unlike the AST tier this does not notice syntax errors
+    elsewhere in the file.
+    """
+    imports = set()
+    # The leading newline lets a statement on the first line match too
+    source = '\n' + source
+    pos = 0
+    while True:
+        match = _LEXER.search(source, pos)
+        if match is None:
+            return imports
+        first = source[match.start()]
+        if first in '\'"#':
+            pos = match.end()
+            continue
+        if first != '\n':
+            if source[match.start() - 1].isidentifier() or source[match.start() - 1].isdigit():
+                pos = match.end()  # part of a longer name, e.g. reimport
+                continue
+            return None
+        if match.group(1):
+            return None
+        text, pos = _logical_line(source, match.start(2))
+        if ';' in text:
+            return None
+        if match.group(2) == 'import':
+            statement = _IMPORT_RE.fullmatch(text)
+            names = statement and _aliases(statement.group(1))
+            if not names or '*' in names:
+                return None
+            imports.update(_truncate(name) for name in names)
+        else:
+            statement = _FROM_RE.fullmatch(text)
+            names = statement and _aliases(statement.group(3))
+            if not names:
+                return None
+            # Relative imports always refer to the scanned project itself
+            if statement.group(2) and not statement.group(1):
+                _add_from_import(imports, statement.group(2), names)
+
+
+_TRY_NODES = (ast.Try, ast.TryStar) if hasattr(ast, 'TryStar') else (ast.Try,)
+_IMPORT_ERRORS = frozenset({'ImportError', 'ModuleNotFoundError', 'Exception', 'BaseException'})
+
+
+def _exception_names(node):
+    if node is None:
+        return {'BaseException'}  # bare except
+    if isinstance(node, ast.Tuple):
+        return set().union(*(_exception_names(elt) for elt in node.elts))
+    if isinstance(node, ast.Name):
+        return {node.id}
+    if isinstance(node, ast.Attribute):
+        return {node.attr}
+    return set()
+
+
+def _guards_imports(node) -> bool:
+    return any(_exception_names(handler.type) & _IMPORT_ERRORS for handler in node.handlers)
+
+
+def _is_type_checking(test) -> bool:
+    return (isinstance(test, ast.Name) and test.id == 'TYPE_CHECKING') or (
+        isinstance(test, ast.Attribute) and test.attr == 'TYPE_CHECKING')
+
+
+# Statement lists an import statement can appear in
+_BODY_FIELDS = ('body', 'orelse', 'finalbody', 'handlers', 'cases')
+
+
+def _nested_statements(node, guard):
+    """Statements directly inside ``node``, each with the guard that applies to it."""
+    if isinstance(node, ast.If):
+        inner = guard or ('type_checking' if _is_type_checking(node.test) else 'conditional')
+        return [(child, inner) for child in node.body + node.orelse]
+    if isinstance(node, _TRY_NODES) and _guards_imports(node):
+        return ([(child, guard or 'optional') for child in node.body + node.orelse]
+                + [(child, guard or 'fallback') for child in node.handlers]
+                + [(child, guard) for child in node.finalbody])
+    children = []
+    for field in _BODY_FIELDS:
+        for child in getattr(node, field, ()):
+            children.append((child, guard))
+    return children
+
+
+def _dynamic_import(node):
+    """Module name of ``__import__("x")`` or ``importlib.import_module("x")``, else None."""
+    func = node.func
+    if not ((isinstance(func, ast.Name) and func.id in ('__import__', 'import_module'))
+            or (isinstance(func, ast.Attribute) and func.attr == 'import_module')):
+        return None
+    if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+        name = node.args[0].value
+        if name and not name.startswith('.'):
+            return _truncate(name)
+    return None
+
+
+def ast_imports(source: str, filename='<unknown>'):
+    """``(imports, guarded)`` from a full parse.
+
+    ``guarded`` maps names only imported under a guard to the innermost
+    reason: ``optional`` (in a try that catches ImportError), ``fallback``
+    (in its handler), ``conditional`` (under an ``if``), ``type_checking``
+    or ``dynamic`` (``__import__``/``importlib`` with a literal name;
+    these are reported but not added to ``imports``).
+    """
+    tree = ast.parse(source, filename=filename)
+    imports = set()
+    guarded = {}
+    required = set()
+    # Import statements only occur in statement bodies, so expressions are
+    # skipped; they are only searched when a dynamic import may be present.
+    stack = [(tree, None)]
+    while stack:
+        node, guard = stack.pop()
+        found = set()
+        if isinstance(node, ast.Import):
+            found = {_truncate(name.name) for name in node.names}
+        elif isinstance(node, ast.ImportFrom):
+            # Relative imports always refer to the scanned project itself
+            if node.module and not node.level:
+                _add_from_import(found, node.module, [name.name for name in node.names])
+        else:
+            stack.extend(_nested_statements(node, guard))
+            continue
+        imports |= found
+        if guard is None:
+            required |= found
+        else:
+            for name in found:
+                guarded.setdefault(name, guard)
+    if '__import__' in source or 'import_module' in source:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                name = _dynamic_import(node)
+                if name is not None:
+                    guarded.setdefault(name, 'dynamic')
+    return imports, {name: reason for name, reason in guarded.items() if name not in required}
+
+
+def extract_imports(source, filename='<unknown>'):
+    """``(imports, guarded)`` through the cheapest tier that can answer.
+
+    A byte-level check skips files without ``import`` at all, a line-level
+    pass handles files whose imports are plain top-level statements, and
+    only the rest are parsed into an AST. ``guarded`` is as for
+    ``ast_imports``.
+    """
+    if (b'import' if isinstance(source, bytes) else 'import') not in source:
+        return set(), {}
+    if isinstance(source, bytes):
+        source = source.decode('utf-8', errors='ignore')
+    imports = fast_imports(source)
+    if imports is not None:
+        return imports, {}
+    return ast_imports(source, filename)
+
+
+def get_imports_from_source(source, filename='<unknown>'):
+    return extract_imports(source, filename)[0]
+
+
+def _read_source(filepath):
+    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def _read_imports(filepath):
+    return get_imports_from_source(_read_source(filepath), filepath)
+
+
+def _parse_isolated(source, timeout: float):
+    """``extract_imports`` in a child interpreter, killed after ``timeout`` seconds."""
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+    proc = subprocess.run([sys.executable, "-I", os.path.abspath(__file__)], input=source,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    if proc.returncode != 0:
+        lines = proc.stderr.decode('utf-8', errors='replace').strip().splitlines()
+        raise SyntaxError(lines[-1] if lines else f"parser exited with status {proc.returncode}")
+    result = json.loads(proc.stdout)
+    return set(result["imports"]), result["guarded"]
+
+
+def _parse_limited(source, filename, timeout: float = 0):
+    if timeout and len(source) >= ISOLATED_PARSE_BYTES:
+        return _parse_isolated(source, timeout)
+    return extract_imports(source, filename)
+
+
+def _merge_guarded(guarded: dict, required: set, imports: set, file_guarded: dict):
+    # A name imported unguarded by any file is a plain requirement
+    required |= imports.difference(file_guarded)
+    for name, reason in file_guarded.items():
+        guarded.setdefault(name, reason)
+
+
+def get_imports_from_file(filepath):
+    try:
+        return _read_imports(filepath)
+    except Exception as e:
+        logger.warning(f"Failed to parse {filepath}: {e}")
+        return set()
+
+
+def _parse_source_batch(items, timeout: float = 0):
+    """``(imports, failures, timed out filenames, guarded)`` for a batch of ``(filename, source)`` pairs.
+
+    ``guarded`` maps names that no file in the batch requires outright to
+    why they may be absent at runtime, as in ``ast_imports``.
+    """
+    imports = set()
+    failures = 0
+    timed_out = []
+    guarded, required = {}, set()
+    for filename, source in items:
+        try:
+            file_imports, file_guarded = _parse_limited(source, filename, timeout)
+            imports |= file_imports
+            _merge_guarded(guarded, required, file_imports, file_guarded)
+        except subprocess.TimeoutExpired:
+            timed_out.append(filename)
+        except Exception as e:
+            logger.warning(f"Failed to parse {filename}: {e}")
+            failures += 1
+    return imports, failures, timed_out, {name: r for name, r in guarded.items() if name not in required}
+
+
+def _parse_batch(paths, timeout: float = 0):
+    """``(imports, failures, timed out paths, guarded)`` for a batch of file paths."""
+    imports = set()
+    failures = 0
+    timed_out = []
+    guarded, required = {}, set()
+    for path in paths:
+        try:
+            file_imports, file_guarded = _parse_limited(_read_source(path), path, timeout)
+            imports |= file_imports
+            _merge_guarded(guarded, required, file_imports, file_guarded)
+        except subprocess.TimeoutExpired:
+            timed_out.append(path)
+        except Exception as e:
+            logger.warning(f"Failed to parse {path}: {e}")
+            failures += 1
+    return imports, failures, timed_out, {name: r for name, r in guarded.items() if name not in required}
+
+
+def _parse_each(paths):
+    return [sorted(get_imports_from_file(path)) for path in paths]
+
+
+def is_pruned_path(relpath: str) -> bool:
+    """Name-based pruning for paths that are not on disk (e.g. git trees)."""
+    for part in relpath.replace(os.sep, '/').split('/')[:-1]:
+        if part in PRUNED_DIRS or part.endswith(".egg-info"):
+            return True
+    return False
+
+
+def _is_venv(path: str) -> bool:
+    # Virtualenvs with arbitrary names are recognised by their marker file
+    return os.path.exists(os.path.join(path, "pyvenv.cfg"))
+
+
+def _is_pruned(entry) -> bool:
+    name = entry.name
+    if name in PRUNED_DIRS or name.endswith(".egg-info"):
+        return True
+    return _is_venv(entry.path)
+
+
+def is_pruned_file(root: str, relpath: str) -> bool:
+    """Whether iter_python_files would skip ``relpath`` under ``root``."""
+    if is_pruned_path(relpath):
+        return True
+    directory = root
+    for part in relpath.replace(os.sep, '/').split('/')[:-1]:
+        directory = os.path.join(directory, part)
+        if _is_venv(directory):
+            return True
+    return False
+
+
+def iter_files(root: str, match):
+    """Paths of the files under ``root`` whose name satisfies ``match``, outside pruned directories."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not _is_pruned(entry):
+                                stack.append(entry.path)
+                        elif match(entry.name) and entry.is_file():
+                            yield entry.path
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Cannot scan directory {current}: {e}")
+
+
+def _is_python(name: str) -> bool:
+    return name.endswith(".py")
+
+
+def iter_python_files(root: str):
+    return iter_files(root, _is_python)
+
+
+def resolve_workers(workers=None) -> int:
+    if not workers:
+        workers = int(os.getenv("SCAN_WORKERS", "0") or 0)
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def _get_pool(workers: int):
+    global _pool, _pool_workers
+    # multiprocessing is only imported once a scan is big enough to need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+        _pool_workers = None
+
+
+def _batches(items, batch_size):
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def _effective_batch_size(count: int, workers: int, batch_size: int) -> int:
+    # Keep every worker busy while still giving it several batches to
+    # smooth out files of very different sizes.
+    return max(1, min(batch_size, count // (workers * 4) or 1))
+
+
+def _run_batches(fn, files, workers, batch_size):
+    pool = _get_pool(workers)
+    return pool.map(fn, _batches(files, _effective_batch_size(len(files), workers, batch_size)))
+
+
+def parse_files(paths, workers=None, batch_size: int = DEFAULT_BATCH_SIZE) -> list:
+    """Return the imports of each path, in the same order as ``paths``."""
+    paths = list(paths)
+    workers = resolve_workers(workers)
+    if workers == 1 or len(paths) < SERIAL_THRESHOLD:
+        return _parse_each(paths)
+
+    results = []
+    try:
+        for batch_results in _run_batches(_parse_each, paths, workers, batch_size):
+            results.extend(batch_results)
+    except Exception as e:
+        logger.error(f"Parallel parse failed ({e}), parsing serially")
+        _reset_pool()
+        return _parse_each(paths)
+    return results
+
+
+def _scan(parse, items, workers=None, batch_size: int = DEFAULT_BATCH_SIZE, progress=None,
+          stats=None, budget=None, root=None) -> set:
+    if budget is not None and budget.parse_timeout:
+        parse = partial(parse, timeout=budget.parse_timeout)
+    workers = resolve_workers(workers)
+    parallel = workers > 1 and len(items) >= SERIAL_THRESHOLD
+    if parallel:
+        batch_size = _effective_batch_size(len(items), workers, batch_size)
+    chunks = list(_batches(items, batch_size))
+
+    imports = set()
+    done = 0
+    failures = 0
+    timed_out = []
+    guarded, required = {}, set()
+    try:
+        results = _get_pool(workers).map(parse, chunks) if parallel else map(parse, chunks)
+        for chunk, (batch_imports, batch_failures, batch_timed_out, batch_guarded) in zip(chunks, results):
+            imports |= batch_imports
+            _merge_guarded(guarded, required, batch_imports, batch_guarded)
+            failures += batch_failures
+            timed_out += batch_timed_out
+            done += len(chunk)
+            if progress is not None:
+                progress(done, len(items))
+    except Exception as e:
+        if not parallel:
+            raise
+        logger.error(f"Parallel scan failed ({e}), scanning serially")
+        _reset_pool()
+        return _scan(parse, items, 1, batch_size, progress, stats, budget, root)
+    if parallel:
+        logger.info(f"Scanned {len(items)} files with {workers} workers")
+    if timed_out:
+        logger.warning(f"Parsing timed out for {len(timed_out)} file(s)")
+        budget.note_timeouts([os.path.relpath(path, root) for path in timed_out] if root else timed_out)
+    if stats is not None:
+        stats["files"] = stats.get("files", 0) + len(items)
+        stats["failures"] = stats.get("failures", 0) + failures + len(timed_out)
+        stats.setdefault("guarded", {}).update(
+            (name, reason) for name, reason in sorted(guarded.items()) if name not in required)
+    return imports
+
+
+def scan_imports(root: str, workers=None, batch_size: int = DEFAULT_BATCH_SIZE, progress=None,
+                 stats=None, budget=None) -> set:
+    """Imports of every ``.py`` file under ``root``.
+
+    ``progress(done, total)`` is called as batches of files complete. When
+    given, the ``stats`` dict accumulates ``files`` scanned, parse
+    ``failures`` and the ``guarded`` imports: names only imported inside a
+    try/except ImportError, under an ``if`` or dynamically, mapped to why.
+    These may be optional at runtime. A ``budgets.Budget`` limits which files are parsed and
+    how long each parse may take; whatever it skips is noted on it.
+    """
+    paths = list(iter_python_files(root))
+    if budget is not None:
+        paths = budget.select_files(paths, root)
+    return _scan(_parse_batch, paths, workers, batch_size, progress, stats, budget, root)
+
+
+def scan_sources(items, workers=None, batch_size: int = DEFAULT_BATCH_SIZE, progress=None,
+                 stats=None, budget=None) -> set:
+    """Like scan_imports, for in-memory ``(filename, source)`` pairs."""
+    items = list(items)
+    if budget is not None:
+        items = budget.select_sources(items)
+    return _scan(_parse_source_batch, items, workers, batch_size, progress, stats, budget)
+
+
+if __name__ == "__main__":
+    # Child side of _parse_isolated: source on stdin, imports as JSON on stdout
+    found, guarded_imports = extract_imports(sys.stdin.buffer.read(), '<isolated>')
+    json.dump({"imports": sorted(found), "guarded": guarded_imports}, sys.stdout)
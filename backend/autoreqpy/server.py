@@ -0,0 +1,257 @@
+"""The Flask app: analysis, job, batch and stats routes.
+
+    gunicorn autoreqpy.server:app
+"""
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+from pydantic import BaseModel, HttpUrl, ValidationError
+
+from . import pipeline, remote
+from .jobs import FINISHED_STATES, SUCCEEDED, JobManager, JobQueueFull
+from .logs import configure_logging
+from .metrics import REGISTRY, CallbackMetric
+
+configure_logging()
+logger = logging.getLogger(__name__)
+if not pipeline.GEMINI_API_KEY:
+    logger.warning("Gemini API Key not found. Some features will be limited.")
+
+app = Flask(__name__)
+CORS(app, resources={r"/*": {"origins": "*"}})
+
+BATCH_MAX_REPOS = int(os.getenv("BATCH_MAX_REPOS", "500"))
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+BATCH_REPO_TIMEOUT = float(os.getenv("BATCH_REPO_TIMEOUT", "300"))
+
+job_manager = JobManager(
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_queue=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+    timeout=float(os.getenv("JOB_TIMEOUT", "300")),
+    retention=float(os.getenv("JOB_RETENTION", "3600")),
+)
+
+
+class RepoInput(BaseModel):
+    github_url: HttpUrl
+
+    @classmethod
+    def validate_github_url(cls, v):
+        url_str = str(v)
+        if not (url_str.startswith("https://github.com/") and
+                (url_str.endswith(".git") or url_str.rstrip("/").count("/") >= 2)):
+            raise ValueError("Invalid GitHub repository URL")
+        return v
+
+
+@app.route("/")
+def a():
+    return jsonify({"test": "test"}), 200
+
+
+@app.route("/clone-repo/", methods=["POST"])
+def clone_repo():
+    try:
+        data = request.get_json()
+        repo_input = RepoInput(github_url=data.get("github_url"))
+    except (ValidationError, ValueError) as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
+
+    repo_url = str(repo_input.github_url)
+    workspace = remote.new_workspace(repo_url)
+
+    try:
+        requirements_content = remote.analyze_repo(repo_url, workspace)
+        return jsonify({"requirements.txt": requirements_content})
+
+    except Exception as e:
+        logger.error(f"Cloning operation failed: {str(e)}")
+        return jsonify({"error": f"Operation failed: {str(e)}"}), 400
+    finally:
+        # Deletion happens on the reaper thread, so this never blocks the response
+        remote.workspaces.release(workspace)
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/clone-repo/stream", methods=["GET", "POST"])
+def clone_repo_stream():
+    # GET lets browsers consume the stream with EventSource
+    github_url = request.args.get("github_url") or (request.get_json(silent=True) or {}).get("github_url")
+    try:
+        repo_input = RepoInput(github_url=github_url)
+    except (ValidationError, ValueError) as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
+
+    repo_url = str(repo_input.github_url)
+    events = queue.Queue()
+
+    def emit(event, **data):
+        events.put((event, data))
+
+    def work():
+        workspace = remote.new_workspace(repo_url)
+        try:
+            requirements_content = remote.analyze_repo(repo_url, workspace, progress=emit)
+            emit("result", **{"requirements.txt": requirements_content})
+        except Exception as e:
+            logger.error(f"Cloning operation failed: {str(e)}")
+            emit("error", error=f"Operation failed: {str(e)}")
+        finally:
+            remote.workspaces.release(workspace)
+            events.put(None)
+
+    threading.Thread(target=work, name="sse-analysis", daemon=True).start()
+
+    def generate():
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            yield format_sse(*item)
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/batch/", methods=["POST"])
+def batch_analyze():
+    data = request.get_json(silent=True) or {}
+    urls = data.get("github_urls")
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "Invalid input: github_urls must be a non-empty list"}), 400
+    if len(urls) > BATCH_MAX_REPOS:
+        return jsonify({"error": f"Invalid input: at most {BATCH_MAX_REPOS} repositories per batch"}), 400
+    try:
+        concurrency = int(data.get("concurrency") or BATCH_DEFAULT_CONCURRENCY)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid input: concurrency must be an integer"}), 400
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+
+    def generate():
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+        futures = {}
+        try:
+            for index, url in enumerate(urls):
+                try:
+                    repo_url = str(RepoInput(github_url=url).github_url)
+                except (ValidationError, ValueError) as e:
+                    yield json.dumps({"index": index, "github_url": url, "error": f"Invalid input: {str(e)}"}) + "\n"
+                    continue
+                future = pool.submit(remote.analyze_repo_result, repo_url, BATCH_REPO_TIMEOUT)
+                futures[future] = (index, url)
+
+            # Results stream in completion order, so one slow repository
+            # never delays the lines of the others.
+            for future in as_completed(futures):
+                index, url = futures[future]
+                yield json.dumps({"index": index, "github_url": url, **future.result()}) + "\n"
+        finally:
+            # Client went away or the batch is done: drop anything not started
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
+@app.route("/jobs/", methods=["POST"])
+def submit_job():
+    try:
+        data = request.get_json()
+        repo_input = RepoInput(github_url=data.get("github_url"))
+    except (ValidationError, ValueError, AttributeError) as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
+
+    try:
+        job = job_manager.submit(remote.run_analysis_job, str(repo_input.github_url))
+    except JobQueueFull as e:
+        response = jsonify({"error": f"Too many pending jobs: {str(e)}"})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+
+    response = jsonify(job.to_dict())
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return response, 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job.status not in FINISHED_STATES:
+        return jsonify(job.to_dict()), 202
+    if job.status != SUCCEEDED:
+        return jsonify({"error": f"Operation failed: {job.error}", "status": job.status}), 400
+    return jsonify(job.result), 200
+
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route("/jobs/stats", methods=["GET"])
+def jobs_stats():
+    return jsonify(job_manager.stats()), 200
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify({**remote.result_cache.stats(), "llm": pipeline.llm_cleanup.stats()}), 200
+
+
+def _stats_events(stats, events):
+    return {(event,): stats.get(event, 0) for event in events}
+
+
+CallbackMetric("autoreqpy_result_cache_events_total", "Result cache lookups and evictions.",
+               lambda: _stats_events(remote.result_cache.stats(), ("hits", "misses", "coalesced", "evictions")),
+               kind="counter", labelnames=("event",))
+CallbackMetric("autoreqpy_llm_cache_events_total", "Gemini cleanup cache lookups and evictions.",
+               lambda: _stats_events(pipeline.llm_cleanup.stats(), ("hits", "misses", "coalesced", "evictions")),
+               kind="counter", labelnames=("event",))
+CallbackMetric("autoreqpy_mirror_pool_events_total", "Mirror pool reads, updates and evictions.",
+               lambda: _stats_events(remote.mirror_pool.stats(),
+                                     ("hits", "fetches", "clones", "evictions", "fallbacks")),
+               kind="counter", labelnames=("event",))
+CallbackMetric("autoreqpy_jobs", "Jobs known to the job manager, by status.",
+               lambda: {(status,): count for status, count in job_manager.stats()["jobs"].items()},
+               labelnames=("status",))
+CallbackMetric("autoreqpy_job_queue_depth", "Jobs waiting for a worker.",
+               lambda: job_manager.stats()["jobs"].get("queued", 0))
+CallbackMetric("autoreqpy_workspaces_active", "Workspaces currently in use.",
+               lambda: remote.workspaces.stats()["active"])
+CallbackMetric("autoreqpy_workspace_pending_deletions", "Released workspaces waiting to be deleted.",
+               lambda: remote.workspaces.stats()["pending_deletions"])
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/workspaces/stats", methods=["GET"])
+def workspaces_stats():
+    return jsonify({**remote.workspaces.stats(), "mirrors": remote.mirror_pool.stats()}), 200
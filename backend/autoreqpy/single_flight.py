@@ -0,0 +1,64 @@
+import threading
+
+# How often a waiter given a checkpoint runs it
+WAIT_INTERVAL = 0.1
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight block until it finishes and receive the same result (or error).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, checkpoint=None, retry_on=()):
+        """Return ``(result, shared)`` where ``shared`` is True for waiters.
+
+        Waiters run their own ``checkpoint()``, when given, while they wait,
+        so each can still be cancelled or time out on its own terms. A leader
+        failing with one of the ``retry_on`` exception types, such as its own
+        cancellation, does not fail the waiters: the first of them runs its
+        ``fn`` instead.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+            if leader:
+                break
+
+            while not call.event.wait(None if checkpoint is None else WAIT_INTERVAL):
+                checkpoint()
+            if call.error is None:
+                return call.result, True
+            if not isinstance(call.error, retry_on):
+                raise call.error
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
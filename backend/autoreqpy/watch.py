@@ -0,0 +1,114 @@
+"""Keep a Monorepo's requirements current as its files change.
+
+Filesystem notifications come from watchdog when it is installed
+(``pip install autoreqpy[watch]``); only the files they name are parsed
+again. Without it the tree is polled, relying on the import index's stat
+checks to skip unchanged files.
+"""
+import logging
+import os
+import threading
+import time
+
+from .projects import PROJECT_MARKERS
+from .scanner import is_pruned_path
+
+logger = logging.getLogger(__name__)
+
+# Editors and checkouts touch many files in a burst; wait for it to settle
+DEBOUNCE_SECONDS = 0.3
+
+
+class _Changes:
+    """Paths reported since the last take(); None when only a full scan will do."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._paths = set()
+        self._rescan = False
+        self._last = 0.0
+
+    def add(self, relpath=None):
+        with self._cond:
+            if relpath is None:
+                self._rescan = True
+            else:
+                self._paths.add(relpath)
+            self._last = time.monotonic()
+            self._cond.notify()
+
+    def take(self, debounce: float):
+        with self._cond:
+            while not (self._paths or self._rescan):
+                self._cond.wait()
+            quiet = time.monotonic() - self._last
+            while quiet < debounce:
+                self._cond.wait(debounce - quiet)
+                quiet = time.monotonic() - self._last
+            paths = None if self._rescan else self._paths
+            self._paths, self._rescan = set(), False
+            return paths
+
+
+def _observe(root: str, changes: _Changes, ignored):
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if event.event_type in ("opened", "closed_no_write"):
+                return
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if not path or os.path.abspath(path) in ignored:
+                    continue
+                rel = os.path.relpath(path, root)
+                if event.is_directory:
+                    # Whatever was inside it moved or went away with it
+                    if event.event_type != "modified" and not is_pruned_path(os.path.join(rel, "_")):
+                        changes.add(None)
+                elif (rel.endswith(".py") or os.path.basename(rel) in PROJECT_MARKERS) and not is_pruned_path(rel):
+                    changes.add(rel)
+
+    observer = Observer()
+    observer.schedule(Handler(), root, recursive=True)
+    observer.start()
+    return observer
+
+
+def watch(monorepo, on_change, poll_interval: float = 1.0, ignored=None):
+    """Scan ``monorepo``, then update it whenever its files change; runs until interrupted.
+
+    ``on_change(projects)`` is called with the projects whose requirements
+    changed, starting with every project. Changes to the absolute paths in
+    the set ``ignored``, which the caller may keep adding to (e.g. the
+    requirement files it writes), are not reported.
+    """
+    changes = _Changes()
+    try:
+        # Started before the first scan so nothing changed during it is missed
+        observer = _observe(monorepo.root, changes, set() if ignored is None else ignored)
+    except ImportError:
+        logger.info(f"watchdog is not installed, polling every {poll_interval:g}s")
+        on_change(monorepo.scan())
+        while True:
+            time.sleep(poll_interval)
+            _apply(monorepo, on_change, None)
+    try:
+        on_change(monorepo.scan())
+        logger.info(f"Watching {monorepo.root} for changes")
+        while True:
+            _apply(monorepo, on_change, changes.take(DEBOUNCE_SECONDS))
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def _apply(monorepo, on_change, relpaths):
+    try:
+        updated = monorepo.scan() if relpaths is None else monorepo.refresh(relpaths)
+    except Exception as e:
+        # A half-written file or a failed lookup must not end the watch
+        logger.error(f"Updating requirements failed: {e}")
+        return
+    if updated:
+        on_change(updated)
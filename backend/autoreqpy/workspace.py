@@ -0,0 +1,197 @@
+import logging
+import os
+import queue
+import shutil
+import stat
+import subprocess
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class Workspace:
+    """A scratch directory plus the child processes spawned to work in it."""
+
+    def __init__(self, path: str, on_tmpfs: bool = False):
+        self.path = path
+        self.on_tmpfs = on_tmpfs
+        self.created_at = time.time()
+        self._processes = []
+        self._async_processes = []
+        self._lock = threading.Lock()
+
+    def popen(self, args, **kwargs) -> subprocess.Popen:
+        """``subprocess.Popen`` whose process is tracked for release()."""
+        proc = subprocess.Popen(args, **kwargs)
+        with self._lock:
+            # Drop finished processes so long-lived workspaces stay small
+            self._processes = [p for p in self._processes if p.poll() is None]
+            self._processes.append(proc)
+        return proc
+
+    def track_async(self, proc):
+        """Track an ``asyncio.subprocess.Process`` started for this workspace."""
+        with self._lock:
+            self._async_processes = [p for p in self._async_processes if p.returncode is None]
+            self._async_processes.append(proc)
+
+    def terminate_processes(self, grace: float = 2.0):
+        with self._lock:
+            processes, self._processes = self._processes, []
+            async_processes, self._async_processes = self._async_processes, []
+        for proc in async_processes:
+            # Their event loop reaps them; waiting here could block that loop
+            if proc.returncode is None:
+                logger.warning(f"Killing leftover process {proc.pid} in {self.path}")
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+        for proc in processes:
+            if proc.poll() is not None:
+                continue
+            logger.warning(f"Terminating leftover process {proc.pid} in {self.path}")
+            proc.terminate()
+            try:
+                proc.wait(timeout=grace)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+def _make_writable_and_retry(func, path, _exc_info):
+    # Read-only files (e.g. git pack files on Windows) block rmtree
+    try:
+        os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+        func(path)
+    except OSError:
+        pass
+
+
+class WorkspaceManager:
+    """Owns the lifecycle of per-request clone directories.
+
+    Only processes started through ``Workspace.popen`` are terminated on
+    release. Deletion is handed to a background reaper thread that removes
+    released directories in batches and retries failures with backoff, so
+    requests never wait on the filesystem.
+
+    ``on_deleted(seconds)``, when given, is called with the time each
+    successful deletion took.
+
+    When ``tmpfs_dir`` is set, workspaces are placed there while the sum of
+    their reservations (``tmpfs_workspace_bytes`` each) stays within
+    ``tmpfs_max_bytes``; otherwise they fall back to ``base_dir``.
+    """
+
+    def __init__(self, base_dir: str, tmpfs_dir=None, tmpfs_max_bytes: int = 0,
+                 tmpfs_workspace_bytes: int = 256 * 1024 * 1024,
+                 max_attempts: int = 5, retry_delay: float = 1.0, on_deleted=None):
+        self.base_dir = base_dir
+        self.tmpfs_dir = tmpfs_dir
+        self.tmpfs_max_bytes = tmpfs_max_bytes
+        self.tmpfs_workspace_bytes = tmpfs_workspace_bytes
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.on_deleted = on_deleted
+        os.makedirs(base_dir, exist_ok=True)
+        if tmpfs_dir:
+            os.makedirs(tmpfs_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._active = set()
+        self._tmpfs_reserved = 0
+        self._pending = queue.Queue()
+        self.deleted = 0
+        self.failed = 0
+        self._reaper = threading.Thread(target=self._reap, name="workspace-reaper", daemon=True)
+        self._reaper.start()
+
+    def create(self, name: str) -> Workspace:
+        folder = f"{name}_{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            on_tmpfs = bool(self.tmpfs_dir) and (
+                self._tmpfs_reserved + self.tmpfs_workspace_bytes <= self.tmpfs_max_bytes)
+            if on_tmpfs:
+                self._tmpfs_reserved += self.tmpfs_workspace_bytes
+            workspace = Workspace(os.path.join(self.tmpfs_dir if on_tmpfs else self.base_dir, folder), on_tmpfs)
+            self._active.add(workspace)
+        return workspace
+
+    def release(self, workspace: Workspace):
+        """Stop the workspace's own processes and queue its directory for deletion."""
+        workspace.terminate_processes()
+        with self._lock:
+            if workspace not in self._active:
+                return
+            self._active.discard(workspace)
+            if workspace.on_tmpfs:
+                self._tmpfs_reserved -= self.tmpfs_workspace_bytes
+        self._pending.put((workspace.path, 0, 0.0))
+
+    def _delete(self, path: str) -> bool:
+        if os.path.lexists(path):
+            shutil.rmtree(path, onerror=_make_writable_and_retry)
+        return not os.path.lexists(path)
+
+    def _reap(self):
+        retries = []
+        while True:
+            timeout = None
+            if retries:
+                timeout = max(0.0, min(not_before for _, _, not_before in retries) - time.time())
+            try:
+                batch = [self._pending.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            # Drain everything already queued so deletions happen in batches
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = [item for item in batch if item is not None]
+                stopping = True
+            else:
+                stopping = False
+
+            now = time.time()
+            due = [item for item in retries if item[2] <= now]
+            retries = [item for item in retries if item[2] > now]
+            for path, attempt, _ in batch + due:
+                started = time.perf_counter()
+                if self._delete(path):
+                    self.deleted += 1
+                    if self.on_deleted is not None:
+                        self.on_deleted(time.perf_counter() - started)
+                elif attempt + 1 >= self.max_attempts:
+                    self.failed += 1
+                    logger.error(f"Failed to clean up {path} after {self.max_attempts} attempts")
+                else:
+                    delay = self.retry_delay * (2 ** attempt)
+                    retries.append((path, attempt + 1, time.time() + delay))
+            if stopping:
+                return
+
+    def shutdown(self, wait: bool = True):
+        """Release every active workspace and stop the reaper once it is done."""
+        with self._lock:
+            active = list(self._active)
+        for workspace in active:
+            self.release(workspace)
+        self._pending.put(None)
+        if wait:
+            self._reaper.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self._active),
+                "pending_deletions": self._pending.qsize(),
+                "deleted": self.deleted,
+                "failed": self.failed,
+                "tmpfs_reserved_bytes": self._tmpfs_reserved,
+            }
@@ -0,0 +1,587 @@
+"""Benchmarks for the analysis pipeline on synthetic local repositories.
+
+Repositories are generated once per (profile, scale) as bare git
+repositories under ``--work-dir`` and served to the app through a
+``url.<file>.insteadOf`` rewrite, so ``https://github.com/bench/...`` URLs
+go through exactly the same clone, scan, resolve and cleanup code as real
+requests. With ``--fetch-mode archive`` they are served instead as
+``git archive`` output by a local HTTP stand-in for the forge's archive
+endpoint. Gemini is replaced by a local stub with a fixed latency.
+
+    python benchmark.py --scales 100,1000 --output bench.json
+    python benchmark.py --fetch-mode archive --archive-format zip
+    python benchmark.py --baseline bench.json --threshold 0.2
+    python benchmark.py --corpus [PATH ...]
+    python benchmark.py --startup --startup-budget 120
+
+The second form fetches zip archives from the HTTP stand-in instead of
+cloning. The third exits with status 1 when any metric regressed by more
+than the threshold relative to the baseline results. The fourth checks
+the tiered import extractor against a full AST walk over every ``.py``
+file under the given paths (default: the standard library) and exits
+with status 1 if any file's imports differ. The fifth times the imports
+of ``autoreqpy --local`` and exits with status 1 if they take longer than
+the budget in milliseconds, or if any module only the servers need is
+loaded.
+"""
+import argparse
+import ast
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_URL_PREFIX = "https://github.com/bench/"
+PROFILES = ("wide", "deep", "huge", "binary")
+DEFAULT_SCALES = "100,1000,10000"
+STAGES = ("clone", "scan", "resolve", "normalize", "llm", "cleanup")
+# Heavy dependencies and app modules that ``autoreqpy --local`` must not load
+SERVER_ONLY_MODULES = ("flask", "flask_cors", "pydantic", "git", "google.generativeai", "asgiref", "uvicorn",
+                       "autoreqpy.server", "autoreqpy.remote", "autoreqpy.asgi")
+DEFAULT_STARTUP_BUDGET_MS = 120
+
+THIRD_PARTY = ["requests", "numpy", "pandas", "yaml", "flask", "pydantic", "git", "dotenv",
+               "PIL", "sklearn", "bs4", "google.generativeai", "dateutil", "jinja2", "click"]
+STDLIB = ["os", "sys", "json", "re", "time", "logging", "typing", "pathlib", "collections",
+          "itertools", "functools", "subprocess", "threading", "dataclasses", "hashlib"]
+
+
+def _module_source(rng: random.Random, package: str, index: int, functions: int = 6) -> str:
+    lines = [f'"""Synthetic module {index}."""']
+    for name in rng.sample(STDLIB, 4):
+        lines.append(f"import {name}")
+    for name in rng.sample(THIRD_PARTY, 2):
+        lines.append(f"import {name}")
+    lines.append(f"from {package}.mod_{rng.randrange(max(index, 1))} import helper_0")
+    lines.append("from . import sibling")
+    lines.append("")
+    for f in range(functions):
+        lines += [
+            f"def helper_{f}(value, *args, **kwargs):",
+            f"    total = value * {f} + len(args)",
+            "    for key, item in sorted(kwargs.items()):",
+            "        if isinstance(item, (int, float)):",
+            "            total += item",
+            "        else:",
+            "            total += len(str(key))",
+            "    return total",
+            "",
+        ]
+    lines += [
+        f"class Model{index}:",
+        "    def __init__(self, data):",
+        "        self.data = list(data)",
+        "",
+        "    def summary(self):",
+        "        return {k: helper_0(v) for k, v in enumerate(self.data)}",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def synthetic_files(profile: str, scale: int, seed: int = 0):
+    """Yield ``(path, bytes)`` for a repository of the given shape.
+
+    wide:   ``scale`` modules, 100 per package directory
+    deep:   ``scale`` modules spread along directory chains up to 64 levels deep
+    huge:   one module of roughly ``scale * 10`` functions plus a few small ones
+    binary: ``scale`` modules plus ``scale`` incompressible 8 KiB data files
+    """
+    rng = random.Random(f"{profile}-{scale}-{seed}")
+    package = "benchpkg"
+    yield "setup.py", b"from setuptools import setup\nsetup(name='benchpkg')\n"
+    yield f"{package}/__init__.py", b""
+    if profile == "huge":
+        yield f"{package}/huge.py", _module_source(rng, package, 0, functions=scale * 10).encode()
+        for i in range(1, 4):
+            yield f"{package}/mod_{i}.py", _module_source(rng, package, i).encode()
+        return
+    for i in range(scale):
+        if profile == "deep":
+            depth = i % 64
+            directory = "/".join([package] + [f"d{level}" for level in range(depth)])
+        else:
+            directory = f"{package}/group_{i // 100}"
+        yield f"{directory}/mod_{i}.py", _module_source(rng, package, i).encode()
+        if profile == "binary":
+            yield f"assets/blob_{i // 100}/data_{i}.bin", rng.randbytes(8192)
+
+
+def make_repository(path: str, files):
+    """Create a bare repository at ``path`` with one commit holding ``files``.
+
+    Uses ``git fast-import`` so 100k-file trees never touch a work tree.
+    """
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "main", path], check=True)
+    proc = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=path, stdin=subprocess.PIPE)
+    write = proc.stdin.write
+    write(b"commit refs/heads/main\n"
+          b"committer Bench <bench@example.com> 0 +0000\n"
+          b"data 10\nbenchmark\n")
+    for file_path, content in files:
+        write(f"M 100644 inline {file_path}\ndata {len(content)}\n".encode())
+        write(content)
+        write(b"\n")
+    write(b"\n")
+    proc.stdin.close()
+    if proc.wait() != 0:
+        raise RuntimeError(f"git fast-import failed for {path}")
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"], cwd=path, check=True)
+
+
+def ensure_repository(work_dir: str, profile: str, scale: int, regenerate: bool = False) -> str:
+    name = f"{profile}-{scale}"
+    path = os.path.join(work_dir, "repos", f"{name}.git")
+    if regenerate and os.path.isdir(path):
+        shutil.rmtree(path)
+    if not os.path.isdir(path):
+        started = time.perf_counter()
+        make_repository(path, synthetic_files(profile, scale))
+        print(f"Generated {name} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return name
+
+
+def configure_environment(work_dir: str):
+    """Route bench URLs to local repositories and isolate app state in ``work_dir``."""
+    repos = os.path.abspath(os.path.join(work_dir, "repos"))
+    count = int(os.environ.get("GIT_CONFIG_COUNT", "0"))
+    os.environ[f"GIT_CONFIG_KEY_{count}"] = f"url.file://{repos}/.insteadOf"
+    os.environ[f"GIT_CONFIG_VALUE_{count}"] = BENCH_URL_PREFIX
+    os.environ["GIT_CONFIG_COUNT"] = str(count + 1)
+    os.environ["CLONE_BASE_DIR"] = os.path.join(work_dir, "clones")
+    os.environ["RESULT_CACHE_DIR"] = os.path.join(work_dir, "result_cache")
+    os.environ["MIRROR_POOL_MAX_BYTES"] = "0"
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Serves ``/<owner>/<repo>/<format>/<ref>`` as ``git archive`` output, streamed as git writes it."""
+
+    repos_dir = None
+
+    def do_GET(self):
+        _, _, repo, archive_format, ref = self.path.split("/", 4)
+        git_dir = os.path.join(self.repos_dir, f"{repo}.git")
+        if archive_format not in ("tar", "tar.gz", "zip") or not os.path.isdir(git_dir):
+            self.send_error(404)
+            return
+        proc = subprocess.Popen(["git", "archive", f"--format={archive_format}", f"--prefix={repo}/", ref],
+                                cwd=git_dir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.end_headers()
+        try:
+            shutil.copyfileobj(proc.stdout, self.wfile)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def archive_server(work_dir: str, archive_format: str):
+    """Serve the generated repositories' archives; yields an ``ARCHIVE_URL`` template."""
+    handler = type("BenchArchiveHandler", (ArchiveHandler,),
+                   {"repos_dir": os.path.abspath(os.path.join(work_dir, "repos"))})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, name="archive-server", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_port}/{{owner}}/{{repo}}/{archive_format}/{{ref}}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+class StubModel:
+    """Stands in for ``genai.GenerativeModel``: echoes the input after a delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_content(self, prompt: str):
+        time.sleep(self.latency)
+        text = prompt.split("Input:", 1)[-1].split("Output:", 1)[0].strip()
+        return type("StubResponse", (), {"text": text})()
+
+
+class PassthroughCache:
+    """Result cache stand-in that always recomputes, for cold-path throughput."""
+
+    def get_or_compute(self, repo_url, commit_sha, compute, **options):
+        return compute()
+
+    def stats(self) -> dict:
+        return {}
+
+
+def load_app(llm_latency: float):
+    """The ``autoreqpy.server`` module, with Gemini replaced by the stub."""
+    from autoreqpy import pipeline, server
+    from autoreqpy.llm_cache import LLMCleanup
+
+    # Per-request INFO logs would dominate the timings of small repositories
+    logging.getLogger("autoreqpy").setLevel(logging.WARNING)
+    pipeline.GEMINI_API_KEY = pipeline.GEMINI_API_KEY or "benchmark-stub"
+    pipeline.llm_cleanup = LLMCleanup(lambda: StubModel(llm_latency), model_name="benchmark-stub")
+    return server
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def __call__(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = time.perf_counter() - started
+
+
+def run_stages(server, repo_name: str, fetch_mode: str, llm_latency: float) -> dict:
+    """Time each pipeline stage once for ``repo_name``; returns stage -> seconds."""
+    from autoreqpy.git_source import bare_clone, full_clone, scan_git_objects, sparse_clone
+    from autoreqpy.llm_cache import LLMCleanup
+    from autoreqpy.normalizer import normalize
+    from autoreqpy.resolver import first_party_modules, resolve_requirements
+    from autoreqpy.scanner import scan_imports, scan_sources
+
+    url = f"{BENCH_URL_PREFIX}{repo_name}.git"
+    workspace = server.remote.new_workspace(url)
+    path = workspace.path
+    timer = StageTimer()
+    try:
+        with timer("clone"):
+            if fetch_mode == "archive":
+                sources = server.remote.fetch_archive(url)
+            else:
+                clone = {"objects": bare_clone, "sparse": sparse_clone, "full": full_clone}[fetch_mode]
+                clone(url, path, popen=workspace.popen)
+        with timer("scan"):
+            if fetch_mode == "archive":
+                imports = scan_sources(sources)
+                first_party = first_party_modules(path for path, _ in sources)
+            elif fetch_mode == "objects":
+                imports, paths = scan_git_objects(path, popen=workspace.popen)
+                first_party = first_party_modules(paths)
+            else:
+                imports, first_party = scan_imports(path), None
+        with timer("resolve"):
+            content = resolve_requirements(imports, path, first_party)
+        with timer("normalize"):
+            normalize(content)
+        # A fresh cache per run so the stub call is actually made
+        server.pipeline.llm_cleanup = LLMCleanup(lambda: StubModel(llm_latency), model_name="benchmark-stub")
+        with timer("llm"):
+            server.pipeline.analyze_dependencies_with_gemini(content)
+    finally:
+        with timer("cleanup"):
+            server.remote.workspaces.release(workspace)
+            while os.path.lexists(path):
+                time.sleep(0.005)
+    return timer.timings
+
+
+def run_throughput(server, repo_name: str, concurrency: int, requests: int, cold: bool) -> dict:
+    """Drive ``/clone-repo/`` from ``concurrency`` threads; latency and req/s."""
+    url = f"{BENCH_URL_PREFIX}{repo_name}.git"
+    saved_cache = server.remote.result_cache
+    if cold:
+        server.remote.result_cache = PassthroughCache()
+    else:
+        # Warm the cache so every timed request is a hit
+        server.app.test_client().post("/clone-repo/", json={"github_url": url})
+    local = threading.local()
+    failures = []
+
+    def one(_):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = server.app.test_client()
+        started = time.perf_counter()
+        response = client.post("/clone-repo/", json={"github_url": url})
+        if response.status_code != 200:
+            failures.append(response.get_json())
+        return time.perf_counter() - started
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.remote.result_cache = saved_cache
+    if failures:
+        raise RuntimeError(f"{len(failures)} request(s) failed, first: {failures[0]}")
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def _metric(runs, better: str) -> dict:
+    return {"value": statistics.median(runs), "better": better, "runs": runs}
+
+
+def collect(args) -> dict:
+    configure_environment(args.work_dir)
+    server = load_app(args.llm_latency)
+    server.remote.FETCH_MODE = args.fetch_mode
+    if args.fetch_mode != "archive":
+        return collect_metrics(server, args)
+    with archive_server(args.work_dir, args.archive_format) as url_template:
+        server.remote.ARCHIVE_URL = url_template
+        return collect_metrics(server, args)
+
+
+def collect_metrics(server, args) -> dict:
+    metrics = {}
+
+    for profile in args.profiles:
+        for scale in args.scales:
+            repo_name = ensure_repository(args.work_dir, profile, scale, args.regenerate)
+            runs = [run_stages(server, repo_name, args.fetch_mode, args.llm_latency) for _ in range(args.repeat)]
+            for stage in STAGES:
+                metrics[f"stages/{repo_name}/{stage}"] = _metric([run[stage] for run in runs], "lower")
+            print(f"{repo_name}: " + ", ".join(
+                f"{stage} {metrics[f'stages/{repo_name}/{stage}']['value']:.3f}s" for stage in STAGES),
+                file=sys.stderr)
+
+    repo_name = ensure_repository(args.work_dir, "wide", args.throughput_scale, args.regenerate)
+    for concurrency in args.concurrency:
+        for cold in (True, False):
+            label = f"throughput/{repo_name}/c{concurrency}/{'cold' if cold else 'cached'}"
+            runs = [run_throughput(server, repo_name, concurrency, args.requests, cold) for _ in range(args.repeat)]
+            metrics[f"{label}/requests_per_second"] = _metric([r["requests_per_second"] for r in runs], "higher")
+            metrics[f"{label}/p95"] = _metric([r["p95"] for r in runs], "lower")
+            print(f"{label}: {metrics[f'{label}/requests_per_second']['value']:.1f} req/s", file=sys.stderr)
+
+    return {
+        "meta": {
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "git": subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip(),
+            "fetch_mode": args.fetch_mode,
+            **({"archive_format": args.archive_format} if args.fetch_mode == "archive" else {}),
+            "llm_latency": args.llm_latency,
+            "repeat": args.repeat,
+        },
+        "metrics": metrics,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, noise_floor: float) -> list:
+    """Regressions as ``(metric, baseline, current, change)`` tuples."""
+    regressions = []
+    for name, current in results["metrics"].items():
+        previous = baseline.get("metrics", {}).get(name)
+        if previous is None or not previous["value"]:
+            continue
+        old, new = previous["value"], current["value"]
+        if current["better"] == "lower":
+            # Sub-noise timings jitter by more than any sensible threshold
+            if max(old, new) < noise_floor:
+                continue
+            change = new / old - 1
+        else:
+            change = old / new - 1 if new else float("inf")
+        if change > threshold:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def reference_imports(source: bytes) -> set:
+    """Imports found by walking the whole AST, as the scanner did before its fast paths."""
+    from autoreqpy.scanner import MAX_IMPORT_DEPTH
+
+    def truncate(module):
+        return ".".join(module.split(".")[:MAX_IMPORT_DEPTH])
+
+    imports = set()
+    for node in ast.walk(ast.parse(source.decode("utf-8", errors="ignore"))):
+        if isinstance(node, ast.Import):
+            imports.update(truncate(name.name) for name in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.add(truncate(node.module))
+            if node.module.count(".") + 1 < MAX_IMPORT_DEPTH:
+                imports.update(f"{node.module}.{name.name}" for name in node.names if name.name != "*")
+    return imports
+
+
+def check_corpus(roots) -> int:
+    from autoreqpy.scanner import get_imports_from_source, iter_python_files
+
+    sources = []
+    for root in roots:
+        for path in iter_python_files(root):
+            with open(path, "rb") as f:
+                sources.append((path, f.read()))
+    print(f"{len(sources)} files, {sum(len(s) for _, s in sources) / 1e6:.1f} MB", file=sys.stderr)
+
+    reference_time = tiered_time = 0.0
+    mismatches = skipped = 0
+    for path, source in sources:
+        start = time.perf_counter()
+        try:
+            expected = reference_imports(source)
+        except (SyntaxError, ValueError):
+            skipped += 1  # nothing to compare against
+            continue
+        reference_time += time.perf_counter() - start
+        start = time.perf_counter()
+        found = get_imports_from_source(source, path)
+        tiered_time += time.perf_counter() - start
+        if found != expected:
+            mismatches += 1
+            print(f"MISMATCH {path}: missing {sorted(expected - found)}, extra {sorted(found - expected)}")
+    print(f"Full AST walk {reference_time:.2f}s, tiered extractor {tiered_time:.2f}s "
+          f"({skipped} unparseable file(s) skipped)")
+    if mismatches:
+        return 1
+    print(f"Imports of all {len(sources) - skipped} files match")
+    return 0
+
+
+def parse_importtime(output: str):
+    """``(all modules, {top-level module: cumulative us})`` from ``-X importtime`` output."""
+    modules, top_level = set(), {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the column header
+        # Nested imports are indented two spaces per level below their importer
+        module = name.strip()
+        modules.add(module)
+        if len(name) - len(name.lstrip()) == 1:
+            top_level[module] = int(cumulative)
+    return modules, top_level
+
+
+def check_startup(budget_ms: float, repeat: int) -> int:
+    """Time the imports of ``autoreqpy --local`` on a one-file project."""
+    project = tempfile.mkdtemp(prefix="autoreqpy-startup-")
+    try:
+        with open(os.path.join(project, "main.py"), "w", encoding="utf-8") as f:
+            f.write("import os\nimport requests\n")
+        # Without a key nothing reaches Gemini; the run leaves its log in the project
+        env = {**os.environ, "GEMINI_API_KEY": "", "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))}
+        # What the interpreter imports before running anything (site, .pth files) is not ours to budget
+        startup = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], cwd=project, env=env,
+                                 capture_output=True, text=True)
+        interpreter = parse_importtime(startup.stderr)[1]
+        runs = []
+        for _ in range(repeat + 1):
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-m", "autoreqpy", "--local", project, "--no-index"],
+                cwd=project, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                raise RuntimeError(f"autoreqpy --local exited with status {proc.returncode}")
+            modules, top_level = parse_importtime(proc.stderr)
+            runs.append((modules, {m: us for m, us in top_level.items() if m not in interpreter}))
+    finally:
+        shutil.rmtree(project, ignore_errors=True)
+
+    # The first run also compiles bytecode
+    modules, top_level = runs[-1]
+    total_ms = statistics.median(sum(times.values()) for _, times in runs[1:]) / 1000
+    for module, micros in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"{micros / 1000:8.1f} ms  {module}", file=sys.stderr)
+    failed = False
+    loaded = sorted(m for m in modules if m.split(".")[0] in SERVER_ONLY_MODULES or m in SERVER_ONLY_MODULES)
+    if loaded:
+        print(f"Server-only modules imported by --local: {', '.join(loaded)}")
+        failed = True
+    if total_ms > budget_ms:
+        print(f"--local imports took {total_ms:.1f} ms, over the {budget_ms:g} ms budget")
+        failed = True
+    else:
+        print(f"--local imports took {total_ms:.1f} ms (budget {budget_ms:g} ms)")
+    return 1 if failed else 0
+
+
+def _int_list(value: str):
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic repositories")
+    parser.add_argument("--work-dir", default="./bench_work", help="Generated repositories and scratch state")
+    parser.add_argument("--scales", type=_int_list, default=_int_list(DEFAULT_SCALES),
+                        help=f"Comma-separated .py file counts (default: {DEFAULT_SCALES})")
+    parser.add_argument("--profiles", type=lambda v: v.split(","), default=list(PROFILES),
+                        help=f"Comma-separated repository shapes from {', '.join(PROFILES)}")
+    parser.add_argument("--fetch-mode", choices=("sparse", "objects", "full", "archive"), default="sparse")
+    parser.add_argument("--archive-format", choices=("tar.gz", "tar", "zip"), default="tar.gz",
+                        help="Archive format served with --fetch-mode archive")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the median is kept")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the stub LLM sleeps per call")
+    parser.add_argument("--throughput-scale", type=int, default=100,
+                        help="Size of the wide repository used for /clone-repo/ throughput")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4], help="Comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=16, help="Requests per throughput run")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild repositories even if present")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="Where to write JSON results")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Fail when a metric is this much worse than the baseline (0.2 = 20%%)")
+    parser.add_argument("--noise-floor", type=float, default=0.01,
+                        help="Ignore timings below this many seconds when comparing")
+    parser.add_argument("--corpus", nargs="*", metavar="PATH",
+                        help="Only check the import extractor against a full AST walk over these "
+                             "directories (default: the standard library)")
+    parser.add_argument("--startup", action="store_true",
+                        help="Only check the import time of autoreqpy --local against --startup-budget")
+    parser.add_argument("--startup-budget", type=float, default=DEFAULT_STARTUP_BUDGET_MS,
+                        help="Milliseconds autoreqpy --local may spend importing modules")
+    args = parser.parse_args(argv)
+    if args.startup:
+        return check_startup(args.startup_budget, args.repeat)
+    if args.corpus is not None:
+        return check_corpus(args.corpus or [sysconfig.get_paths()["stdlib"]])
+    unknown = set(args.profiles) - set(PROFILES)
+    if unknown:
+        parser.error(f"unknown profile(s): {', '.join(sorted(unknown))}")
+
+    os.makedirs(os.path.join(args.work_dir, "repos"), exist_ok=True)
+    results = collect(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Wrote {len(results['metrics'])} metrics to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.noise_floor)
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: {old:.4f} -> {new:.4f} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions above {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Shared fixtures. Everything runs against local repositories and stubs:
+nothing here reaches GitHub, PyPI or Gemini."""
+import os
+import tempfile
+
+import pytest
+
+# autoreqpy.remote sets up its workspaces and caches when imported, from
+# these settings; GEMINI_API_KEY and RELEASE_INDEX keep the output free of
+# anything the host happens to have configured.
+_STATE_DIR = tempfile.mkdtemp(prefix="autoreqpy-tests-")
+os.environ.update({
+    "CLONE_BASE_DIR": os.path.join(_STATE_DIR, "clones"),
+    "RESULT_CACHE_DIR": os.path.join(_STATE_DIR, "result_cache"),
+    "MIRROR_POOL_DIR": os.path.join(_STATE_DIR, "mirrors"),
+    "MIRROR_POOL_MAX_BYTES": "0",
+    "RELEASE_INDEX": os.path.join(_STATE_DIR, "releases.idx"),
+    "GEMINI_API_KEY": "",
+})
+
+from benchmark import make_repository  # noqa: E402
+
+# A small project covering what the fetch modes must agree on: packages,
+# sibling scripts, pruned directories and files that are not Python
+PROJECT_FILES = {
+    "app/__init__.py": b"",
+    "app/core.py": b"import os\nimport requests\nfrom app import util\nfrom yaml import safe_load\n",
+    "app/util.py": b"import json\ntry:\n    import ujson\nexcept ImportError:\n    ujson = None\n",
+    "scripts/run.py": b"import helper\nimport click\n",
+    "scripts/helper.py": b"from dateutil import parser\n",
+    "venv/lib/site.py": b"import numpy\n",
+    "docs/logo.png": b"\x89PNG\r\n\x1a\n" + bytes(256),
+    "README.md": b"# Project\n",
+}
+PROJECT_IMPORTS = {"os", "requests", "app", "app.util", "yaml", "yaml.safe_load", "json", "ujson", "helper",
+                   "click", "dateutil", "dateutil.parser"}
+PROJECT_REQUIREMENTS = "click\npython-dateutil\npyyaml\nrequests\nujson"
+
+
+@pytest.fixture
+def make_repo(tmp_path):
+    """``make_repo(files, name)`` creates a bare repository and returns its file:// URL."""
+    def make(files=None, name="project"):
+        path = tmp_path / "repos" / f"{name}.git"
+        make_repository(str(path), sorted((files if files is not None else PROJECT_FILES).items()))
+        return f"file://{path}"
+    return make
+
+
+@pytest.fixture
+def moved_repo(make_repo):
+    """``(file:// URL, commit)`` of a repository whose HEAD has moved on from ``commit``, as after a push.
+
+    The old commit imports requests, HEAD imports flask.
+    """
+    from autoreqpy.git_source import run_git
+
+    old_url = make_repo({"app.py": b"import requests\n"}, name="old")
+    url = make_repo({"app.py": b"import flask\n"}, name="project")
+    git_dir = url[len("file://"):]
+    run_git(["fetch", old_url, "HEAD:refs/tags/old"], cwd=git_dir)
+    return url, run_git(["rev-parse", "refs/tags/old"], cwd=git_dir).strip()
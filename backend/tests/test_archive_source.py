@@ -0,0 +1,236 @@
+import http.server
+import io
+import random
+import struct
+import subprocess
+import tarfile
+import threading
+import tracemalloc
+import urllib.error
+import zipfile
+
+import pytest
+
+from autoreqpy.archive_source import ArchiveError, archive_url, iter_python_sources, read_archive_sources, _Download
+from autoreqpy.budgets import Budget
+from conftest import PROJECT_FILES
+
+# Forges wrap the project in one directory, which strip_components drops
+PREFIX = "project-0123abc/"
+PROJECT_SOURCES = {path: content for path, content in PROJECT_FILES.items()
+                   if path.endswith(".py") and not path.startswith("venv/")}
+
+
+class _Unseekable(io.RawIOBase):
+    """A write-only stream, which makes zipfile use data descriptors, like a forge does."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def make_tar(files, compression="gz"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=f"w:{compression}") as tar:
+        for path, content in files.items():
+            info = tarfile.TarInfo(PREFIX + path)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def make_zip(files, streamed=True, compression=zipfile.ZIP_DEFLATED):
+    output = _Unseekable() if streamed else io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=compression) as archive:
+        for path, content in files.items():
+            archive.writestr(PREFIX + path, content)
+    return (output.buffer if streamed else output).getvalue()
+
+
+def read(data, select=None):
+    return dict(iter_python_sources(_Download(io.BytesIO(data)), select))
+
+
+@pytest.mark.parametrize("make", [make_tar, lambda files: make_tar(files, "xz"), make_zip,
+                                  lambda files: make_zip(files, streamed=False)],
+                         ids=["tar.gz", "tar.xz", "zip-streamed", "zip"])
+def test_archive_formats_yield_the_same_sources(make):
+    assert read(make(PROJECT_FILES)) == PROJECT_SOURCES
+
+
+def test_streamed_zip_members_carry_data_descriptors():
+    data = make_zip({"a.py": b"import os\n"})
+    assert zipfile.ZipFile(io.BytesIO(data)).infolist()[0].flag_bits & 0x08
+
+
+@pytest.mark.parametrize("make", [make_tar, make_zip, lambda files: make_zip(files, streamed=False)],
+                         ids=["tar.gz", "zip-streamed", "zip"])
+def test_file_and_memory_limits_skip_and_note_members(make):
+    files = {"a.py": b"import os\n", "b.py": b"import sys\n" * 10, "big.py": b"x = 1\n" * 1000}
+    budget = Budget(max_file_bytes=1024, max_memory_bytes=len(files["a.py"]) + 20)
+    with budget.stream_selector() as select:
+        sources = read(make(files), select)
+    assert sources == {"a.py": files["a.py"]}
+    assert budget.truncations == [
+        "skipped 1 file(s) larger than the 1 KiB per-file limit: big.py",
+        "skipped 1 file(s) beyond the 30 B memory limit: b.py",
+    ]
+
+
+def test_zip_bomb_is_never_held_in_memory():
+    # About 64 MiB that compresses to some 64 KiB, in a member whose size
+    # is only known once it has been inflated
+    bomb = make_zip({"bomb.py": b"\0" * (64 * 1024 * 1024), "app.py": b"import requests\n"})
+    assert len(bomb) < 256 * 1024
+    budget = Budget(max_file_bytes=1024 * 1024)
+    tracemalloc.start()
+    try:
+        with budget.stream_selector() as select:
+            sources = read(bomb, select)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert sources == {"app.py": b"import requests\n"}
+    assert budget.truncations == ["skipped 1 file(s) larger than the 1 MiB per-file limit: bomb.py"]
+    assert peak < 8 * 1024 * 1024
+
+
+def test_members_outside_the_project_are_never_kept():
+    data = make_zip({"venv/lib/huge.py": b"import numpy\n" * 100000, "app.py": b"import requests\n"})
+    assert read(data) == {"app.py": b"import requests\n"}
+
+
+def test_read_archive_sources_reports_download_progress(tmp_path):
+    path = tmp_path / "project.tar.gz"
+    path.write_bytes(make_tar(PROJECT_FILES))
+    events, stats = [], {}
+    sources = read_archive_sources(f"file://{path}", progress=lambda *event: events.append(event), stats=stats)
+    assert dict(sources) == PROJECT_SOURCES
+    assert stats["bytes"] == path.stat().st_size
+    assert events[-1] == ("receiving", len(PROJECT_SOURCES), 0, path.stat().st_size)
+
+
+def _encrypted(data):
+    """``data`` with the first member's local header flagged as encrypted."""
+    data = bytearray(data)
+    data[6] |= 0x01
+    return bytes(data)
+
+
+@pytest.mark.parametrize("data, kind", [
+    (make_zip({"app.py": b"import requests\n"}, compression=zipfile.ZIP_STORED), "stored"),
+    (_encrypted(make_zip({"app.py": b"import requests\n"})), "encrypted"),
+], ids=["stored", "encrypted"])
+def test_zip_members_sized_after_their_data_name_the_member_and_the_way_out(data, kind):
+    with pytest.raises(ArchiveError, match=f"cannot stream {PREFIX}app.py, a {kind} zip member") as error:
+        read(data)
+    assert "FETCH_MODE=sparse" in str(error.value) and "tar.gz ARCHIVE_URL" in str(error.value)
+
+
+def test_archives_truncated_inside_a_member_are_reported():
+    data = make_zip({"app.py": random.Random(0).randbytes(10000)})
+    with pytest.raises(ArchiveError, match="ended inside a compressed member"):
+        read(data[:2000])
+
+
+class _ArchiveHandler(http.server.BaseHTTPRequestHandler):
+    """Serves ``server.routes``: ``{path: (body, declared length)}``."""
+
+    def do_GET(self):
+        if self.path not in self.server.routes:
+            self.send_error(404)
+            return
+        body, length = self.server.routes[self.path]
+        self.send_response(200)
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+        self.wfile.write(body)
+        if len(body) < length:
+            # Either stall with the connection open or, once released, close it
+            self.server.release.wait(5)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def archive_server():
+    """A loopback HTTP server standing in for a forge's archive endpoint."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ArchiveHandler)
+    server.routes = {}
+    server.release = threading.Event()
+    server.release.set()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+    thread.join(5)
+
+
+def _git_archive(url, archive_format):
+    return subprocess.run(["git", "archive", f"--format={archive_format}", f"--prefix={PREFIX}", "HEAD"],
+                          cwd=url[len("file://"):], capture_output=True, check=True).stdout
+
+
+def _serve(server, path, body, length=None):
+    server.routes[path] = (body, len(body) if length is None else length)
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+@pytest.mark.parametrize("archive_format", ["tar.gz", "zip"])
+def test_git_archive_is_read_over_http(make_repo, archive_server, archive_format):
+    body = _git_archive(make_repo(), archive_format)
+    url = _serve(archive_server, f"/project.{archive_format}", body)
+    stats = {}
+    assert dict(read_archive_sources(url, timeout=5, stats=stats)) == PROJECT_SOURCES
+    # The central directory at the end of a zip is never downloaded
+    assert 0 < stats["bytes"] <= len(body)
+
+
+def test_missing_archive_raises_url_error(archive_server):
+    url = _serve(archive_server, "/project.tar.gz", b"")
+    with pytest.raises(urllib.error.URLError):
+        read_archive_sources(url.replace("project", "other"), timeout=5)
+
+
+def _zip_member_offsets(body, path):
+    """``(header offset, data offset, compressed size)`` of a member of a zip."""
+    info = zipfile.ZipFile(io.BytesIO(body)).getinfo(PREFIX + path)
+    name_length, extra_length = struct.unpack_from("<2H", body, info.header_offset + 26)
+    return info.header_offset, info.header_offset + 30 + name_length + extra_length, info.compress_size
+
+
+@pytest.mark.parametrize("archive_format, cut", [
+    ("tar.gz", lambda body: len(body) // 2),
+    ("zip", lambda body: sum(_zip_member_offsets(body, "app/core.py")[1:]) - 10),
+    # Between two members, where the stream alone looks like it ended
+    ("zip", lambda body: _zip_member_offsets(body, "app/util.py")[0]),
+], ids=["tar.gz", "zip-mid-member", "zip-between-members"])
+def test_body_cut_off_mid_download_raises(make_repo, archive_server, archive_format, cut):
+    body = _git_archive(make_repo(), archive_format)
+    # The server promises the whole archive, then closes the connection
+    url = _serve(archive_server, f"/project.{archive_format}", body[:cut(body)], len(body))
+    with pytest.raises(ArchiveError):
+        read_archive_sources(url, timeout=5)
+
+
+def test_stalled_download_times_out(make_repo, archive_server):
+    body = _git_archive(make_repo(), "tar.gz")
+    url = _serve(archive_server, "/project.tar.gz", body[:len(body) // 2], len(body))
+    archive_server.release.clear()
+    with pytest.raises(ArchiveError, match="timed out"):
+        read_archive_sources(url, timeout=0.2)
+
+
+def test_archive_url_fills_in_the_template():
+    assert archive_url("https://github.com/owner/repo.git", "abc") == \
+        "https://codeload.github.com/owner/repo/tar.gz/abc"
+    assert archive_url("https://gitlab.com/group/repo/", "main", "{url}/-/archive/{ref}/{repo}-{ref}.zip") == \
+        "https://gitlab.com/group/repo/-/archive/main/repo-main.zip"
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+import pytest
+
+from autoreqpy import asgi, pipeline, remote
+from conftest import PROJECT_REQUIREMENTS
+
+
+@pytest.mark.parametrize("fetch_mode", ["sparse", "objects", "full"])
+def test_async_analysis_matches_the_threaded_one(make_repo, monkeypatch, fetch_mode):
+    monkeypatch.setattr(remote, "FETCH_MODE", fetch_mode)
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    url = make_repo()
+    events = []
+
+    async def analyze():
+        return await asgi.AsyncAnalyzer().analyze(url, progress=lambda event, **data: events.append(event))
+
+    assert asyncio.run(analyze()) == PROJECT_REQUIREMENTS
+    assert events[:2] == ["resolved_commit", "clone_start"]
+    assert {"clone_done", "scan_done", "requirements"} <= set(events)
+    workspace = remote.new_workspace(url)
+    try:
+        assert remote.clone_and_generate(url, workspace) == PROJECT_REQUIREMENTS
+    finally:
+        remote.workspaces.release(workspace)
+
+
+@pytest.mark.parametrize("fetch_mode", ["sparse", "objects", "full"])
+def test_async_clone_analyzes_the_resolved_commit_after_head_moved(moved_repo, monkeypatch, fetch_mode):
+    monkeypatch.setattr(remote, "FETCH_MODE", fetch_mode)
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    url, old_commit = moved_repo
+
+    async def analyze():
+        return await asgi.AsyncAnalyzer()._compute(url, old_commit, lambda event, **data: None)
+
+    assert asyncio.run(analyze()) == "requests"
+
+
+def test_clone_over_budget_returns_the_truncation_report(make_repo, monkeypatch):
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    monkeypatch.setitem(remote.BUDGET_LIMITS, "max_clone_objects", 1)
+    url = make_repo()
+    events = []
+
+    async def analyze():
+        return await asgi.AsyncAnalyzer().analyze(url, progress=lambda event, **data: events.append(event))
+
+    result = asyncio.run(analyze())
+    assert result.startswith("# Partial result") and "object limit" in result
+    assert events.count("budget_exceeded") == 1
+    # Partial results are not cached
+    assert asyncio.run(analyze()).startswith("# Partial result")
+    assert events.count("budget_exceeded") == 2
+
+
+async def _stream(app, repo_url, events, disconnect=None):
+    """Run one /clone-repo/stream request, collecting its SSE event names into ``events``."""
+    scope = {"type": "http", "method": "GET", "path": "/clone-repo/stream",
+             "query_string": f"github_url={repo_url}".encode()}
+
+    async def receive():
+        await (disconnect or asyncio.Event()).wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        for block in message.get("body", b"").decode().split("\n\n"):
+            if block.startswith("event: "):
+                events.append(block.splitlines()[0][len("event: "):])
+
+    await app(scope, receive, send)
+
+
+def test_coalesced_streams_each_get_every_progress_event(make_repo, monkeypatch):
+    url = make_repo()
+    github_url = "https://github.com/owner/project"
+    # Point the GitHub URL at the local repository, as the benchmark does
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+    monkeypatch.setenv("GIT_CONFIG_KEY_0", f"url.{url}.insteadOf")
+    monkeypatch.setenv("GIT_CONFIG_VALUE_0", github_url)
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    scanning = threading.Event()
+    release = threading.Event()
+    scan_fetched = remote.scan_fetched
+
+    def gated_scan(*args):
+        scanning.set()
+        assert release.wait(10)
+        return scan_fetched(*args)
+
+    monkeypatch.setattr(remote, "scan_fetched", gated_scan)
+
+    async def run():
+        app = asgi.AsgiApp()
+        app.analyzer = analyzer = asgi.AsyncAnalyzer()
+        first, second, gone = [], [], []
+        leave = asyncio.Event()
+        streams = [asyncio.ensure_future(_stream(app, github_url, first))]
+        await asyncio.to_thread(scanning.wait, 10)
+        (flight,) = analyzer._flights.values()
+        streams.append(asyncio.ensure_future(_stream(app, github_url, second)))
+        streams.append(asyncio.ensure_future(_stream(app, github_url, gone, disconnect=leave)))
+        while len(flight._subscribers) < 3:
+            await asyncio.sleep(0.01)
+        leave.set()
+        await streams.pop()
+        assert len(flight._subscribers) == 2
+        release.set()
+        await asyncio.gather(*streams)
+        return first, second, gone
+
+    first, second, gone = asyncio.run(run())
+    assert first == second
+    for events in (first, second):
+        assert {"clone_start", "clone_done", "scan_done", "requirements", "result"} <= set(events)
+    # Joining late replays what was missed, up to the disconnect
+    assert "clone_start" in gone and "result" not in gone
+
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from autoreqpy import pipeline, remote
+from autoreqpy.git_source import (bare_clone, full_clone, list_python_blobs, parse_progress_line, scan_git_objects,
+                                  sparse_clone)
+from autoreqpy.resolver import first_party_modules
+from autoreqpy.scanner import scan_imports
+from conftest import PROJECT_IMPORTS, PROJECT_REQUIREMENTS
+
+
+def _work_tree_files(path):
+    files = set()
+    for directory, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        files.update(os.path.relpath(os.path.join(directory, name), path) for name in names)
+    return files
+
+
+def test_sparse_clone_checks_out_only_python_files(make_repo, tmp_path):
+    destination = tmp_path / "sparse"
+    sparse_clone(make_repo(), str(destination))
+    files = _work_tree_files(destination)
+    assert "app/core.py" in files
+    assert all(name.endswith(".py") for name in files)
+    assert scan_imports(str(destination)) == PROJECT_IMPORTS
+
+
+def test_full_clone_scans_the_same_imports(make_repo, tmp_path):
+    destination = tmp_path / "full"
+    full_clone(make_repo(), str(destination))
+    assert "docs/logo.png" in _work_tree_files(destination)
+    assert scan_imports(str(destination)) == PROJECT_IMPORTS
+
+
+def test_objects_mode_reads_blobs_without_a_work_tree(make_repo, tmp_path):
+    git_dir = tmp_path / "objects.git"
+    bare_clone(make_repo(), str(git_dir))
+    assert not (git_dir / "app").exists()
+    imports, paths = scan_git_objects(str(git_dir))
+    assert imports == PROJECT_IMPORTS
+    # Pruned directories are skipped by name, as on disk
+    assert sorted(paths) == ["app/__init__.py", "app/core.py", "app/util.py", "scripts/helper.py", "scripts/run.py"]
+    assert first_party_modules(paths) == {"app", "helper", "run"}
+
+
+def test_identical_files_are_read_once(make_repo, tmp_path):
+    git_dir = tmp_path / "dupes.git"
+    bare_clone(make_repo({"a/x.py": b"import requests\n", "b/x.py": b"import requests\n"}), str(git_dir))
+    blobs = list_python_blobs(str(git_dir), sizes=True)
+    assert len({oid for _, oid, _ in blobs}) == 1
+    assert all(size == len(b"import requests\n") for _, _, size in blobs)
+
+
+@pytest.mark.parametrize("fetch_mode", ["sparse", "objects", "full"])
+def test_fetch_modes_agree_end_to_end(make_repo, monkeypatch, fetch_mode):
+    monkeypatch.setattr(remote, "FETCH_MODE", fetch_mode)
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    url = make_repo()
+    workspace = remote.new_workspace(url)
+    events = []
+    try:
+        result = remote.clone_and_generate(url, workspace, progress=lambda event, **data: events.append(event))
+    finally:
+        remote.workspaces.release(workspace)
+    assert result == PROJECT_REQUIREMENTS
+    assert events[0] == "clone_start" and "scan_done" in events
+
+
+@pytest.mark.parametrize("fetch_mode", ["sparse", "objects", "full"])
+def test_clone_analyzes_the_resolved_commit_after_head_moved(moved_repo, monkeypatch, fetch_mode):
+    monkeypatch.setattr(remote, "FETCH_MODE", fetch_mode)
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    url, old_commit = moved_repo
+    workspace = remote.new_workspace(url)
+    try:
+        assert remote.clone_and_generate(url, workspace, commit_sha=old_commit) == "requests"
+    finally:
+        remote.workspaces.release(workspace)
+    workspace = remote.new_workspace(url)
+    try:
+        assert remote.clone_and_generate(url, workspace) == "flask"
+    finally:
+        remote.workspaces.release(workspace)
+
+
+def test_clone_progress_is_parsed_from_git_output():
+    assert parse_progress_line("Receiving objects:  42% (21/50), 1.50 MiB | 2.00 MiB/s") == \
+        ("receiving", 21, 50, int(1.5 * 1024 * 1024))
+    assert parse_progress_line("Resolving deltas: 100% (3/3), done.") is None
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from autoreqpy import import_index
+from autoreqpy.import_index import RACY_WINDOW_NS, ImportIndex
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Names of the files each run actually parsed."""
+    calls = []
+    parse_files = import_index.parse_files
+
+    def counting_parse(paths, workers=None):
+        calls.append(sorted(os.path.basename(path) for path in paths))
+        return parse_files(paths, workers=workers)
+
+    monkeypatch.setattr(import_index, "parse_files", counting_parse)
+    return calls
+
+
+def _tree(root, files):
+    for rel, content in files.items():
+        (root / rel).write_text(content)
+    return str(root)
+
+
+def _settle(index_path):
+    """Move the saved index's write time past the racy window, as if written long ago."""
+    with open(index_path) as f:
+        data = json.load(f)
+    data["written_at_ns"] += 2 * RACY_WINDOW_NS
+    with open(index_path, "w") as f:
+        json.dump(data, f)
+
+
+def _scan(root, index_path):
+    index = ImportIndex(str(index_path))
+    imports = index.update(root)
+    index.save()
+    return imports
+
+
+def test_unchanged_files_are_not_parsed_again(tmp_path, parsed):
+    root = _tree(tmp_path, {"a.py": "import requests\n", "b.py": "import flask\n"})
+    index_path = tmp_path / "index" / "index.json"
+    assert _scan(root, index_path) == {"a.py": ["requests"], "b.py": ["flask"]}
+    _settle(index_path)
+    (tmp_path / "b.py").write_text("import click\n")
+    assert _scan(root, index_path) == {"a.py": ["requests"], "b.py": ["click"]}
+    assert parsed == [["a.py", "b.py"], ["b.py"]]
+
+
+def test_parser_version_bump_rebuilds_the_index(tmp_path, parsed, monkeypatch):
+    root = _tree(tmp_path, {"a.py": "import requests\n"})
+    index_path = tmp_path / "index.json"
+    _scan(root, index_path)
+    _settle(index_path)
+    monkeypatch.setattr(import_index, "PARSER_VERSION", import_index.PARSER_VERSION + 1)
+    assert _scan(root, index_path) == {"a.py": ["requests"]}
+    assert parsed == [["a.py"], ["a.py"]]
+    with open(index_path) as f:
+        assert json.load(f)["parser"] == import_index.PARSER_VERSION
+
+
+def test_change_within_the_mtime_granularity_is_seen(tmp_path, parsed):
+    root = _tree(tmp_path, {"a.py": "import requests\n"})
+    index_path = tmp_path / "index.json"
+    _scan(root, index_path)
+    # Rewritten in the same mtime tick as the index: same size, same stat data
+    st = os.stat(tmp_path / "a.py")
+    (tmp_path / "a.py").write_text("import requestz\n")
+    os.utime(tmp_path / "a.py", ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert os.stat(tmp_path / "a.py").st_size == st.st_size
+    assert _scan(root, index_path) == {"a.py": ["requestz"]}
+    assert parsed == [["a.py"], ["a.py"]]
+
+
+def test_deleted_files_are_dropped(tmp_path):
+    root = _tree(tmp_path, {"a.py": "import requests\n", "b.py": "import flask\n"})
+    index_path = tmp_path / "index" / "index.json"
+    _scan(root, index_path)
+    os.remove(tmp_path / "b.py")
+    assert _scan(root, index_path) == {"a.py": ["requests"]}
+    assert ImportIndex(str(index_path)).imports() == {"requests"}
+
+    index = ImportIndex(str(index_path))
+    index.refresh(root, ["a.py"])
+    os.remove(tmp_path / "a.py")
+    assert index.refresh(root, ["a.py"]) == {}
+
+
+@pytest.mark.parametrize("content", [
+    '{"format": 1, "parser": ',
+    "\x00\x01binary",
+    "[1, 2, 3]",
+    '{"format": 99, "files": {}}',
+    json.dumps({"format": 1, "parser": import_index.PARSER_VERSION, "written_at_ns": 0,
+                "files": {"a.py": "import os"}}),
+    json.dumps({"format": 1, "parser": import_index.PARSER_VERSION, "written_at_ns": 0,
+                "files": {"a.py": [0, 0, None, ["os"]]}}),
+    json.dumps({"format": 1, "parser": import_index.PARSER_VERSION, "files": []}),
+])
+def test_corrupt_or_foreign_index_is_ignored(tmp_path, content):
+    root = _tree(tmp_path, {"a.py": "import requests\n"})
+    index_path = tmp_path / "index.json"
+    index_path.write_text(content)
+    assert _scan(root, index_path) == {"a.py": ["requests"]}
+    # The rebuilt index replaced it
+    assert ImportIndex(str(index_path)).files["a.py"][3] == ["requests"]
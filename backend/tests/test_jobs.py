@@ -0,0 +1,188 @@
+import threading
+
+import pytest
+
+from autoreqpy.jobs import CANCELLED, FAILED, SUCCEEDED, TIMED_OUT, JobCancelled, JobManager, JobQueueFull
+from autoreqpy.result_cache import ResultCache
+
+
+def _blocking_job(started, release):
+    def run(job):
+        started.set()
+        while not release.wait(0.01):
+            job.checkpoint()
+        return "done"
+    return run
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(workers=1, max_queue=0, timeout=30)
+    yield manager
+    manager._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def test_job_succeeds(manager):
+    job = manager.submit(lambda job, value: value * 2, 21)
+    job.future.result(timeout=5)
+    assert manager.get(job.id).status == SUCCEEDED
+    assert job.result == 42
+
+
+def test_failed_job_reports_its_error(manager):
+    def fail(job):
+        raise ValueError("boom")
+
+    job = manager.submit(fail)
+    job.future.result(timeout=5)
+    assert job.status == FAILED and job.error == "boom"
+
+
+def test_cancel_stops_a_running_job_at_its_next_checkpoint(manager):
+    started, release = threading.Event(), threading.Event()
+    job = manager.submit(_blocking_job(started, release))
+    assert started.wait(5)
+    manager.cancel(job.id)
+    assert job.status == CANCELLED
+    job.future.result(timeout=5)
+    assert job.status == CANCELLED and job.result is None
+
+
+def test_running_job_times_out():
+    manager = JobManager(workers=1, max_queue=0, timeout=0.05)
+    started = threading.Event()
+    job = manager.submit(_blocking_job(started, threading.Event()))
+    job.future.result(timeout=5)
+    assert job.status == TIMED_OUT
+    assert "timeout" in job.error
+    manager._executor.shutdown(wait=True)
+
+
+def test_cancelled_job_holds_its_worker_until_it_stops():
+    manager = JobManager(workers=1, max_queue=0, timeout=30)
+    started, release = threading.Event(), threading.Event()
+
+    def ignores_cancellation(job):
+        started.set()
+        release.wait(5)
+
+    job = manager.submit(ignores_cancellation)
+    assert started.wait(5)
+    manager.cancel(job.id)
+    # The worker is still busy, so another job would only queue behind it
+    with pytest.raises(JobQueueFull):
+        manager.submit(lambda job: None)
+    release.set()
+    job.future.result(timeout=5)
+    manager.submit(lambda job: None).future.result(timeout=5)
+    manager._executor.shutdown(wait=True)
+
+
+class _Checkpoint:
+    """A job's checkpoint; ``called`` is set once a waiter has run it."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.called.set()
+        if self.cancelled.is_set():
+            raise JobCancelled("Job was cancelled")
+
+
+def test_cancelling_the_leader_does_not_cancel_waiters(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    leader_checkpoint, waiter_checkpoint = _Checkpoint(), _Checkpoint()
+    leader_started = threading.Event()
+    outcomes = {}
+
+    def leader_compute():
+        leader_started.set()
+        while True:
+            leader_checkpoint()
+            threading.Event().wait(0.01)
+
+    def run(name, compute, checkpoint):
+        try:
+            outcomes[name] = cache.get_or_compute("https://github.com/o/r", "abc", compute,
+                                                  checkpoint=checkpoint, retry_on=(JobCancelled, TimeoutError))
+        except Exception as e:
+            outcomes[name] = e
+
+    leader = threading.Thread(target=run, args=("leader", leader_compute, leader_checkpoint))
+    leader.start()
+    assert leader_started.wait(5)
+    waiter = threading.Thread(target=run, args=("waiter", lambda: "requests", waiter_checkpoint))
+    waiter.start()
+    assert waiter_checkpoint.called.wait(5)
+    leader_checkpoint.cancelled.set()
+    leader.join(5)
+    waiter.join(5)
+    assert isinstance(outcomes["leader"], JobCancelled)
+    # The waiter ran the analysis itself, and its result was cached
+    assert outcomes["waiter"] == "requests"
+    assert cache.get("https://github.com/o/r", "abc") == "requests"
+
+
+def test_waiter_stops_on_its_own_checkpoint(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    release, leader_started = threading.Event(), threading.Event()
+    waiter_checkpoint = _Checkpoint()
+    outcomes = {}
+
+    def leader_compute():
+        leader_started.set()
+        release.wait(5)
+        return "requests"
+
+    def run(name, compute, checkpoint):
+        try:
+            outcomes[name] = cache.get_or_compute("https://github.com/o/r", "abc", compute, checkpoint=checkpoint,
+                                                  retry_on=(JobCancelled, TimeoutError))
+        except Exception as e:
+            outcomes[name] = e
+
+    leader = threading.Thread(target=run, args=("leader", leader_compute, None))
+    leader.start()
+    assert leader_started.wait(5)
+    waiter = threading.Thread(target=run, args=("waiter", lambda: "unused", waiter_checkpoint))
+    waiter.start()
+    waiter_checkpoint.cancelled.set()
+    waiter.join(5)
+    assert isinstance(outcomes["waiter"], JobCancelled)
+    release.set()
+    leader.join(5)
+    assert outcomes["leader"] == "requests"
+
+
+def test_other_leader_errors_are_shared(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    leader_started, release = threading.Event(), threading.Event()
+    outcomes = {}
+
+    def leader_compute():
+        leader_started.set()
+        release.wait(5)
+        raise ValueError("clone failed")
+
+    waiter_checkpoint = _Checkpoint()
+
+    def run(name, compute, checkpoint):
+        try:
+            outcomes[name] = cache.get_or_compute("https://github.com/o/r", "abc", compute, checkpoint=checkpoint,
+                                                  retry_on=(JobCancelled, TimeoutError))
+        except Exception as e:
+            outcomes[name] = e
+
+    threads = [threading.Thread(target=run, args=("leader", leader_compute, None))]
+    threads[0].start()
+    assert leader_started.wait(5)
+    threads.append(threading.Thread(target=run, args=("waiter", lambda: "unused", waiter_checkpoint)))
+    threads[1].start()
+    assert waiter_checkpoint.called.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert isinstance(outcomes["leader"], ValueError)
+    assert outcomes["waiter"] is outcomes["leader"]
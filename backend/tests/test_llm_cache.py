@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+from autoreqpy import pipeline
+from autoreqpy.llm_cache import LLMCleanup, TTLCache, normalize_requirements
+
+
+class StubModel:
+    """Stands in for ``genai.GenerativeModel``: echoes the requirements it was given."""
+
+    def __init__(self, gate=None):
+        self.calls = 0
+        self.gate = gate
+
+    def generate_content(self, prompt: str):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        text = prompt.split("Input:", 1)[-1].split("Output:", 1)[0].strip()
+        return type("StubResponse", (), {"text": text})()
+
+
+class FailingModel:
+    def generate_content(self, prompt: str):
+        raise RuntimeError("quota exceeded")
+
+
+def test_equivalent_inputs_share_one_call():
+    model = StubModel()
+    cleanup = LLMCleanup(lambda: model, model_name="stub")
+    first = cleanup.cleanup("requests==2.0\nflask\n")
+    # Order, blank lines, comments and spacing do not change the key
+    second = cleanup.cleanup("# generated\nflask\n\n  requests==2.0  \n")
+    assert first == second == "flask\nrequests==2.0"
+    assert model.calls == 1
+    assert cleanup.stats()["hits"] == 1 and cleanup.stats()["misses"] == 1
+
+
+def test_cache_key_depends_on_the_model():
+    cleanup = LLMCleanup(StubModel, model_name="a")
+    other = LLMCleanup(StubModel, model_name="b")
+    assert cleanup.key_for("flask") != other.key_for("flask")
+
+
+def test_concurrent_calls_are_coalesced():
+    gate = threading.Event()
+    model = StubModel(gate)
+    cleanup = LLMCleanup(lambda: model, model_name="stub")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cleanup.cleanup("flask"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while cleanup.stats()["in_flight"] == 0:
+        threading.Event().wait(0.01)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["flask"] * 4
+    stats = cleanup.stats()
+    assert model.calls == 1 and stats["coalesced"] + stats["hits"] == 3
+
+
+def test_async_cleanup_shares_the_cache():
+    model = StubModel()
+    cleanup = LLMCleanup(lambda: model, model_name="stub")
+
+    async def main():
+        return await asyncio.gather(*(cleanup.acleanup("flask\nrequests") for _ in range(3)))
+
+    assert asyncio.run(main()) == ["flask\nrequests"] * 3
+    assert cleanup.cleanup("requests\nflask") == "flask\nrequests"
+    assert model.calls == 1
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(max_entries=2, ttl=0)
+    cache.put("a", 1)
+    threading.Event().wait(0.001)
+    assert cache.get("a") is None
+    cache = TTLCache(max_entries=2)
+    for key in "abc":
+        cache.put(key, key)
+    assert cache.get("a") is None and cache.get("c") == "c" and cache.evictions == 1
+
+
+def test_failed_cleanup_falls_back_and_is_not_cached(monkeypatch):
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", "stub")
+    monkeypatch.setattr(pipeline, "llm_cleanup", LLMCleanup(FailingModel, model_name="stub"))
+    result = pipeline.analyze_dependencies_with_gemini("flask\nFlask>=2")
+    assert result.startswith(pipeline.LLM_ERROR_HEADER) and result.endswith("flask\nFlask>=2")
+    assert pipeline.is_fallback(result)
+    assert len(pipeline.llm_cleanup._cache) == 0
+
+
+def test_missing_key_skips_the_cleanup(monkeypatch):
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    result = pipeline.analyze_dependencies_with_gemini("flask")
+    assert pipeline.is_fallback(result) and result.endswith("\nflask")
+    assert not pipeline.is_fallback(normalize_requirements("# comment\nflask"))
+
+
+def test_async_cleanup_creates_the_client_off_the_event_loop():
+    model = StubModel()
+    factory_threads = []
+
+    def factory():
+        factory_threads.append(threading.current_thread())
+        return model
+
+    cleanup = LLMCleanup(factory, model_name="stub")
+
+    async def main():
+        result = await cleanup.acleanup("flask")
+        return result, threading.current_thread()
+
+    result, loop_thread = asyncio.run(main())
+    assert result == "flask"
+    assert factory_threads and factory_threads[0] is not loop_thread
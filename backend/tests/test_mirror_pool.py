@@ -0,0 +1,105 @@
+import pytest
+
+from autoreqpy import mirror_pool as mirror_pool_module
+from autoreqpy import pipeline, remote
+from autoreqpy.git_source import GitCommandError, run_git
+from autoreqpy.mirror_pool import MirrorPool
+from conftest import PROJECT_IMPORTS, PROJECT_REQUIREMENTS
+
+
+def _head(url):
+    return run_git(["rev-parse", "HEAD"], cwd=url[len("file://"):]).strip()
+
+
+def _pool(tmp_path, **options):
+    options.setdefault("min_requests", 1)
+    return MirrorPool(str(tmp_path / "mirrors"), max_bytes=options.pop("max_bytes", 1024 ** 3), **options)
+
+
+def test_mirror_is_created_once_the_repository_is_hot(make_repo, tmp_path):
+    url = make_repo()
+    pool = _pool(tmp_path, min_requests=2)
+    with pool.checkout(url, _head(url)) as path:
+        assert path is None
+    with pool.checkout(url, _head(url)) as path:
+        assert path is not None
+    with pool.checkout(url, _head(url)) as path:
+        assert path is not None
+    assert pool.stats()["clones"] == 1 and pool.stats()["hits"] == 1
+
+
+def test_failed_mirror_clone_falls_back(tmp_path):
+    pool = _pool(tmp_path)
+    with pool.checkout(f"file://{tmp_path}/missing.git", "0" * 40) as path:
+        assert path is None
+    assert pool.stats()["fallbacks"] == 1 and pool.stats()["mirrors"] == 0
+    assert not pool._locks
+
+
+def test_failed_mirror_fetch_falls_back(make_repo, tmp_path):
+    url = make_repo()
+    pool = _pool(tmp_path)
+    with pool.checkout(url, _head(url)) as path:
+        assert path is not None
+    # A commit the mirror lacks forces a fetch, which fails once the remote is gone
+    run_git(["config", "remote.origin.url", f"file://{tmp_path}/missing.git"], cwd=path)
+    with pool.checkout(url, "1" * 40) as path:
+        assert path is None
+    assert pool.stats()["fallbacks"] == 1
+
+
+def test_eviction_drops_the_mirrors_lock(make_repo, tmp_path):
+    first, second = make_repo(name="first"), make_repo(name="second")
+    pool = _pool(tmp_path, max_bytes=1)
+    with pool.checkout(first, _head(first)) as path:
+        assert path is not None
+    with pool.checkout(second, _head(second)) as path:
+        assert path is not None
+    assert pool.stats()["evictions"] == 1
+    assert set(pool._locks) == set(pool._mirrors) == {pool.key_for(second)}
+
+
+@pytest.mark.parametrize("fetch_mode", ["sparse", "objects", "full"])
+def test_scan_runs_after_the_mirror_is_unlocked(make_repo, tmp_path, monkeypatch, fetch_mode):
+    url = make_repo()
+    pool = _pool(tmp_path)
+    monkeypatch.setattr(remote, "mirror_pool", pool)
+    monkeypatch.setattr(remote, "FETCH_MODE", fetch_mode)
+    unlocked = []
+
+    def check_unlocked(scan):
+        def scan_without_lock(*args, **kwargs):
+            lock, _ = pool._locks[pool.key_for(url)]
+            # An eviction or a fetch could take the mirror now
+            unlocked.append(lock.acquire_write(blocking=False))
+            lock.release_write()
+            return scan(*args, **kwargs)
+        return scan_without_lock
+
+    monkeypatch.setattr(remote, "scan_directory", check_unlocked(remote.scan_directory))
+    monkeypatch.setattr(remote, "scan_fetched_sources", check_unlocked(remote.scan_fetched_sources))
+    workspace = remote.new_workspace(url)
+    try:
+        imports, _ = remote.scan_from_mirror(url, workspace, _head(url))
+    finally:
+        remote.workspaces.release(workspace)
+    assert unlocked == [True]
+    assert imports == PROJECT_IMPORTS
+
+
+def test_analysis_clones_directly_when_the_mirror_fails(make_repo, tmp_path, monkeypatch):
+    def failing_mirror_clone(*args, **kwargs):
+        raise GitCommandError("git clone --bare failed: out of disk space")
+
+    url = make_repo()
+    pool = _pool(tmp_path)
+    monkeypatch.setattr(remote, "mirror_pool", pool)
+    monkeypatch.setattr(mirror_pool_module, "mirror_clone", failing_mirror_clone)
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    workspace = remote.new_workspace(url)
+    try:
+        result = remote.clone_and_generate(url, workspace, commit_sha=_head(url))
+    finally:
+        remote.workspaces.release(workspace)
+    assert result == PROJECT_REQUIREMENTS
+    assert pool.stats()["fallbacks"] == 1
@@ -0,0 +1,94 @@
+import pytest
+
+from autoreqpy.normalizer import canonicalize_name, normalize, parse_version, specifier_contains
+
+
+def test_duplicates_are_merged_under_canonical_names():
+    result = normalize("Flask>=2.0\nflask<4\nPyYAML\npyyaml\nrequests[socks]\nRequests[security]\n")
+    assert result.requirements == ["flask>=2.0,<4", "pyyaml", "requests[security,socks]"]
+    assert result.unresolved == []
+
+
+def test_newest_pin_satisfying_the_other_constraints_wins():
+    result = normalize("numpy==1.24.0\nnumpy==1.26.4\nnumpy<1.26\n")
+    assert result.requirements == ["numpy==1.24.0"]
+    assert normalize("numpy==1.24.0\nnumpy==1.26.4\n").requirements == ["numpy==1.26.4"]
+
+
+def test_comments_blank_lines_and_fences_are_dropped():
+    result = normalize("```requirements.txt\n# header\n\nclick  # cli\n```\n")
+    assert result.requirements == ["click"] and result.unresolved == []
+
+
+@pytest.mark.parametrize("requirements", [
+    "a>=2,<2",
+    "a>2,<=2",
+    "a>=2.0\na<2.0",
+    "a>2.0\na<2",
+    "a>=2,>2,<=2",
+    "a~=2.0\na<2.0",
+    "a>=3\na<2",
+    "a>=2,<=2,!=2.0",
+    "a>=2.0\na<=2\na!=2.*",
+    "a~=1.4\na>=2.0",
+    "a~=1.4.2\na>=1.5",
+    "a==1.*\na==2.*",
+    "a~=1.4\na!=1.*",
+    "a==1.4.*\na>=1.4,<=1.4.9\na!=1.4.*",
+])
+def test_empty_ranges_are_unresolved(requirements):
+    result = normalize(requirements)
+    assert len(result.unresolved) == 1 and result.unresolved[0].startswith("a: ")
+    # The original lines are passed through for the LLM to settle
+    assert result.requirements == requirements.split("\n")
+
+
+@pytest.mark.parametrize("requirements, merged", [
+    ("a>=2,<=2", "a<=2,>=2"),
+    ("a>=2\na<=2.0\na!=3", "a<=2.0,>=2,!=3"),
+    ("a>=2,<2.0.1", "a>=2,<2.0.1"),
+    ("a>=2.0rc1,<2.0", "a>=2.0rc1,<2.0"),
+    ("a~=1.4\na<1.9", "a~=1.4,<1.9"),
+    ("a~=1.4.2\na==1.4.*", "a==1.4.*,~=1.4.2"),
+    ("a==1.*\na>=1.5", "a==1.*,>=1.5"),
+])
+def test_narrow_ranges_that_admit_a_version_merge(requirements, merged):
+    result = normalize(requirements)
+    assert result.unresolved == []
+    assert result.requirements == [merged]
+
+
+@pytest.mark.parametrize("requirements", ["a==2\na!=2", "a==2.0\na!=2.*", "a==1.0\na>=2", "a==2.0\na~=1.4",
+                                          "a==1.9\na==2.*"])
+def test_exclusions_and_bounds_apply_to_pins(requirements):
+    result = normalize(requirements)
+    assert len(result.unresolved) == 1 and "no pinned version" in result.unresolved[0]
+
+
+def test_conflicting_markers_and_unmodelled_lines_are_unresolved():
+    result = normalize('pywin32; sys_platform == "win32"\npywin32\n'
+                       "pkg @ https://example.com/pkg.whl\n--index-url https://example.com\n")
+    assert "pkg @ https://example.com/pkg.whl" in result.requirements
+    assert len(result.unresolved) == 3
+
+
+def test_version_ordering_follows_pep_440():
+    versions = ["1.0.dev1", "1.0a1", "1.0b2", "1.0rc1", "1.0", "1.0.post1", "1.1"]
+    assert sorted(versions, key=parse_version) == versions
+    assert parse_version("1.0") == parse_version("1.0.0")
+    assert parse_version("not-a-version") is None
+
+
+@pytest.mark.parametrize("op, spec, candidate, expected", [
+    ("~=", "2.2", "2.9", True),
+    ("~=", "2.2", "3.0", False),
+    ("==", "2.*", "2.7.1", True),
+    ("!=", "2.*", "2.7.1", False),
+    ("===", "2.0", "2.0.0", False),
+])
+def test_specifier_contains(op, spec, candidate, expected):
+    assert specifier_contains(op, spec, candidate) is expected
+
+
+def test_canonicalize_name():
+    assert canonicalize_name("Foo.Bar_baz--Qux") == "foo-bar-baz-qux"
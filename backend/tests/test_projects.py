@@ -0,0 +1,128 @@
+import os
+
+import pytest
+
+from autoreqpy import cli, import_index, pipeline, projects, watch
+from autoreqpy.import_index import ImportIndex
+from autoreqpy.projects import Monorepo, project_of
+
+# Two projects under the root, one nested in the other, and a shared
+# library the service imports from its sibling project
+MONOREPO_FILES = {
+    "scripts/run.py": "import click\n",
+    "services/api/pyproject.toml": "[project]\nname = 'api'\n",
+    "services/api/api/__init__.py": "",
+    "services/api/api/app.py": "import flask\nfrom shared.util import helper\nfrom api import models\n",
+    "services/api/api/models.py": "import sqlalchemy\n",
+    "services/api/tools/pyproject.toml": "[project]\nname = 'tools'\n",
+    "services/api/tools/lint.py": "import yaml\n",
+    "libs/shared/setup.cfg": "[metadata]\nname = shared\n",
+    "libs/shared/shared/__init__.py": "",
+    "libs/shared/shared/util.py": "import requests\n",
+}
+
+
+@pytest.fixture
+def monorepo_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", None)
+    root = tmp_path / "monorepo"
+    for rel, content in MONOREPO_FILES.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(content)
+    return str(root)
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Root-relative paths of the files each update actually parsed."""
+    calls = []
+    parse_files = import_index.parse_files
+
+    def counting_parse(paths, workers=None):
+        calls.append(sorted(path.split(f"monorepo{os.sep}", 1)[1] for path in paths))
+        return parse_files(paths, workers=workers)
+
+    monkeypatch.setattr(import_index, "parse_files", counting_parse)
+    return calls
+
+
+def test_files_belong_to_the_innermost_project():
+    found = {".", "services/api", "services/api/tools", "libs/shared"}
+    assert project_of("services/api/api/app.py", found) == "services/api"
+    assert project_of("services/api/tools/lint.py", found) == "services/api/tools"
+    assert project_of("services/apis/app.py", found) == "."
+    assert project_of("setup.py", found) == "."
+
+
+def test_each_project_gets_its_own_requirements(monorepo_root):
+    monorepo = Monorepo(monorepo_root, ImportIndex())
+    assert monorepo.scan() == [".", "libs/shared", "services/api", "services/api/tools"]
+    assert monorepo.requirements == {
+        ".": "click",
+        # shared is first-party: it comes from a sibling project, not PyPI
+        "services/api": "flask\nsqlalchemy",
+        "services/api/tools": "pyyaml",
+        "libs/shared": "requests",
+    }
+
+
+def test_without_discovery_the_tree_is_one_project(monorepo_root):
+    monorepo = Monorepo(monorepo_root, ImportIndex(), discover=False)
+    assert monorepo.scan() == ["."]
+    assert monorepo.requirements == {".": "click\nflask\npyyaml\nrequests\nsqlalchemy"}
+
+
+def test_write_puts_requirements_in_each_project(monorepo_root, capsys):
+    assert cli.process_projects(monorepo_root, use_index=False, output_name="requirements.txt") == 0
+    written = {}
+    for directory, _, names in os.walk(monorepo_root):
+        if "requirements.txt" in names:
+            with open(os.path.join(directory, "requirements.txt")) as f:
+                written[os.path.relpath(directory, monorepo_root)] = f.read()
+    assert written == {
+        ".": "click\n",
+        "services/api": "flask\nsqlalchemy\n",
+        "services/api/tools": "pyyaml\n",
+        "libs/shared": "requests\n",
+    }
+    assert capsys.readouterr().out == ""
+
+
+class _StopWatching(Exception):
+    pass
+
+
+def test_polling_refresh_regenerates_only_the_changed_project(monorepo_root, parsed, monkeypatch):
+    def no_watchdog(*args):
+        raise ImportError("No module named 'watchdog'")
+
+    polls = []
+
+    def poll(interval):
+        polls.append(interval)
+        if len(polls) == 1:
+            with open(os.path.join(monorepo_root, "libs/shared/shared/util.py"), "w") as f:
+                f.write("import requests\nimport ujson\n")
+        elif len(polls) == 3:
+            raise _StopWatching
+
+    monkeypatch.setattr(watch, "_observe", no_watchdog)
+    monkeypatch.setattr(watch.time, "sleep", poll)
+    generated = []
+    generate_requirements = projects.generate_requirements
+
+    def counting_generate(path, *args, **kwargs):
+        generated.append(os.path.relpath(path, monorepo_root))
+        return generate_requirements(path, *args, **kwargs)
+
+    monkeypatch.setattr(projects, "generate_requirements", counting_generate)
+    monorepo = Monorepo(monorepo_root, ImportIndex())
+    changes = []
+    with pytest.raises(_StopWatching):
+        watch.watch(monorepo, changes.append, poll_interval=0.5)
+
+    assert polls == [0.5, 0.5, 0.5]
+    assert changes == [[".", "libs/shared", "services/api", "services/api/tools"], ["libs/shared"]]
+    assert monorepo.requirements["libs/shared"] == "requests\nujson"
+    assert parsed[1:] == [["libs/shared/shared/util.py"]]
+    assert generated[4:] == ["libs/shared"]
@@ -0,0 +1,86 @@
+import pytest
+
+from autoreqpy import release_index
+from autoreqpy.release_index import ReleaseIndex, build_release_index
+from autoreqpy.resolver import resolve_requirements
+
+# {distribution: {version: (requires_python, yanked)}}, as fetch_releases returns them
+SNAPSHOT = {
+    "requests": {
+        "3.0.0": ("", True),
+        "2.32.0": (">=3.8", False),
+        "2.31.0": (">=3.7", False),
+    },
+    "Flask": {
+        "3.1.0rc1": (">=3.9", False),
+        "3.0.3": (">=3.8", False),
+    },
+    "click": {
+        "8.2.0": (">=3.10", False),
+        "8.1.7": (">=3.7", False),
+    },
+    "PyYAML": {
+        "7.0.0b1": ("", False),
+        "7.0.0a1": ("", False),
+    },
+}
+
+
+def _use_release_index(monkeypatch, path):
+    monkeypatch.setenv("RELEASE_INDEX", path)
+    # Forget the shared snapshot, so get_release_index() opens ``path`` now
+    monkeypatch.setattr(release_index, "_index", None)
+    monkeypatch.setattr(release_index, "_index_mtime", None)
+    monkeypatch.setattr(release_index, "_index_checked", 0.0)
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    """Build SNAPSHOT and make it the release index the resolver pins from."""
+    path = str(tmp_path / "releases.idx")
+    assert build_release_index(SNAPSHOT, path) == len(SNAPSHOT)
+    _use_release_index(monkeypatch, path)
+    return path
+
+
+def test_releases_are_stored_newest_first(snapshot):
+    releases = ReleaseIndex(snapshot).releases("flask")
+    assert [release.version for release in releases] == ["3.1.0rc1", "3.0.3"]
+    assert ReleaseIndex(snapshot).releases("unknown") == []
+
+
+def test_yanked_releases_are_skipped(snapshot):
+    assert ReleaseIndex(snapshot).latest("requests", "3.12") == "2.32.0"
+
+
+def test_requires_python_is_honoured(snapshot, monkeypatch):
+    index = ReleaseIndex(snapshot)
+    assert index.latest("click", "3.12") == "8.2.0"
+    assert index.latest("click", "3.9") == "8.1.7"
+    assert index.latest("requests", "3.7") == "2.31.0"
+    assert index.latest("requests", "3.6") is None
+    monkeypatch.setenv("TARGET_PYTHON", "3.9")
+    assert index.latest("click") == "8.1.7"
+
+
+def test_prereleases_are_only_pinned_when_nothing_else_qualifies(snapshot):
+    index = ReleaseIndex(snapshot)
+    assert index.latest("flask", "3.12") == "3.0.3"
+    assert index.latest("pyyaml", "3.12") == "7.0.0b1"
+
+
+def test_resolver_pins_from_the_snapshot(snapshot, monkeypatch):
+    monkeypatch.setenv("TARGET_PYTHON", "3.9")
+    imports = {"requests", "flask", "click", "yaml", "acme_internal_sdk", "os"}
+    assert resolve_requirements(imports).splitlines() == [
+        "acme_internal_sdk",  # not in the snapshot: left unpinned
+        "click==8.1.7",
+        "Flask==3.0.3",
+        "PyYAML==7.0.0b1",
+        "requests==2.32.0",
+    ]
+
+
+def test_without_a_snapshot_nothing_is_pinned(tmp_path, monkeypatch):
+    _use_release_index(monkeypatch, str(tmp_path / "missing.idx"))
+    assert resolve_requirements({"requests", "flask"}) == "Flask\nrequests"
@@ -0,0 +1,177 @@
+import os
+import threading
+
+import pytest
+
+from autoreqpy import pipeline, remote
+from autoreqpy.jobs import JobCancelled
+from autoreqpy.llm_cache import LLMCleanup
+from autoreqpy.result_cache import ResultCache
+from autoreqpy.single_flight import SingleFlight
+
+URL = "https://github.com/o/r"
+
+
+def _entries(cache):
+    return sorted(name for name in os.listdir(cache.cache_dir) if name.endswith(".json"))
+
+
+def _age(cache, repo_url, commit_sha, seconds_ago):
+    """Backdate an entry's LRU access time."""
+    path = cache._path(cache.key_for(repo_url, commit_sha))
+    when = os.stat(path).st_mtime - seconds_ago
+    os.utime(path, (when, when))
+
+
+def test_hit_and_miss_go_through_the_disk(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get(URL, "abc") is None
+    cache.put(URL, "abc", "requests")
+    # A fresh instance, as after a restart, reads the same entry
+    reopened = ResultCache(str(tmp_path))
+    assert reopened.get("https://www.github.com/O/R.git/", "ABC") == "requests"
+    assert reopened.get(URL, "def") is None
+    assert cache.stats()["misses"] == 1
+    assert reopened.stats()["hits"] == 1 and reopened.stats()["misses"] == 1
+
+
+def test_unreadable_and_expired_entries_are_dropped(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put(URL, "abc", "requests")
+    with open(cache._path(cache.key_for(URL, "abc")), "w") as f:
+        f.write('{"result": "requ')
+    assert cache.get(URL, "abc") is None
+    assert _entries(cache) == []
+
+    expiring = ResultCache(str(tmp_path), max_age=0)
+    expiring.put(URL, "abc", "requests")
+    threading.Event().wait(0.01)
+    assert expiring.get(URL, "abc") is None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path), max_entries=2)
+    cache.put(URL, "a", "flask")
+    cache.put(URL, "b", "requests")
+    _age(cache, URL, "a", 20)
+    _age(cache, URL, "b", 10)
+    # Reading "a" makes "b" the least recently used
+    assert cache.get(URL, "a") == "flask"
+    cache.put(URL, "c", "click")
+    assert cache.get(URL, "b") is None
+    assert cache.get(URL, "a") == "flask" and cache.get(URL, "c") == "click"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_are_evicted_to_fit_the_size_limit(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put(URL, "a", "x" * 1000)
+    entry_bytes = os.path.getsize(cache._path(cache.key_for(URL, "a")))
+    cache.max_bytes = 2 * entry_bytes + entry_bytes // 2
+    cache.put(URL, "b", "y" * 1000)
+    _age(cache, URL, "a", 20)
+    _age(cache, URL, "b", 10)
+    cache.put(URL, "c", "z" * 1000)
+    assert len(_entries(cache)) == 2
+    assert cache.get(URL, "a") is None and cache.get(URL, "c") == "z" * 1000
+
+
+def test_uncacheable_results_are_returned_but_not_stored(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    computed = []
+
+    def compute():
+        computed.append(1)
+        return "requests"
+
+    for _ in range(2):
+        assert cache.get_or_compute(URL, "abc", compute, cacheable=lambda result: False) == "requests"
+    assert len(computed) == 2 and _entries(cache) == []
+    assert cache.get_or_compute(URL, "abc", compute) == "requests"
+    assert cache.get_or_compute(URL, "abc", compute) == "requests"
+    assert len(computed) == 3
+
+
+@pytest.fixture
+def fresh_cache(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "results"))
+    monkeypatch.setattr(remote, "result_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def echo_llm(monkeypatch):
+    """A Gemini cleanup that succeeds, so results are not LLM fallbacks."""
+    from test_llm_cache import StubModel
+
+    monkeypatch.setattr(pipeline, "GEMINI_API_KEY", "stub")
+    monkeypatch.setattr(pipeline, "llm_cleanup", LLMCleanup(StubModel, model_name="stub"))
+
+
+def _analyze(url):
+    workspace = remote.new_workspace(url)
+    try:
+        return remote.analyze_repo(url, workspace)
+    finally:
+        remote.workspaces.release(workspace)
+
+
+def test_analysis_is_cached_under_its_commit(make_repo, fresh_cache, echo_llm):
+    url = make_repo()
+    assert _analyze(url) == _analyze(url)
+    assert len(_entries(fresh_cache)) == 1
+    assert fresh_cache.stats()["hits"] == 1
+
+
+def test_truncated_analysis_is_not_cached(make_repo, fresh_cache, echo_llm, monkeypatch):
+    monkeypatch.setitem(remote.BUDGET_LIMITS, "max_files", 1)
+    url = make_repo()
+    assert _analyze(url).startswith("# Partial result")
+    assert _entries(fresh_cache) == []
+
+
+def test_llm_fallback_is_not_cached(make_repo, fresh_cache, monkeypatch):
+    # As when the local normalizer leaves a conflict for an LLM cleanup that is unavailable
+    monkeypatch.setattr(remote, "generate_requirements",
+                        lambda *args, **kwargs: pipeline.llm_skipped("requests>=3\nrequests<2"))
+    url = make_repo()
+    assert pipeline.is_fallback(_analyze(url))
+    assert _entries(fresh_cache) == []
+
+
+@pytest.mark.parametrize("error", [JobCancelled("Job was cancelled"), TimeoutError("Analysis timed out")])
+def test_waiter_takes_over_when_the_leader_checkpoint_raises(error):
+    flight = SingleFlight()
+    leader_started, stop_leader = threading.Event(), threading.Event()
+    waiter_checked = threading.Event()
+    outcomes = {}
+
+    def leader_fn():
+        leader_started.set()
+        # The leader's own checkpoint, run inside its computation
+        stop_leader.wait(5)
+        raise error
+
+    def waiter_checkpoint():
+        waiter_checked.set()
+
+    def run(name, fn, checkpoint):
+        try:
+            outcomes[name] = flight.do("key", fn, checkpoint=checkpoint, retry_on=remote.CHECKPOINT_ERRORS)
+        except Exception as e:
+            outcomes[name] = e
+
+    leader = threading.Thread(target=run, args=("leader", leader_fn, None))
+    leader.start()
+    assert leader_started.wait(5)
+    waiter = threading.Thread(target=run, args=("waiter", lambda: "requests", waiter_checkpoint))
+    waiter.start()
+    assert waiter_checked.wait(5)
+    stop_leader.set()
+    leader.join(5)
+    waiter.join(5)
+    assert outcomes["leader"] is error
+    # Not shared: the waiter ran its own computation as the new leader
+    assert outcomes["waiter"] == ("requests", False)
+    assert flight.in_flight() == 0
+
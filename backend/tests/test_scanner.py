@@ -0,0 +1,91 @@
+import pytest
+
+from autoreqpy.scanner import ast_imports, extract_imports, fast_imports, get_imports_from_source, scan_imports
+from benchmark import reference_imports
+
+# Sources the tiered extractor must read exactly as a full AST walk does
+AGREEMENT_CASES = {
+    "plain": "import os\nimport a.b.c.d as abcd, json\nfrom x.y import z, w as v\n",
+    "relative": "from . import sibling\nfrom ..pkg import thing\nfrom .mod import name\nimport real\n",
+    "star": "from x import *\nfrom x.y.z import *\n",
+    "depth": "from a.b import c\nfrom a.b.c import d\nimport a.b.c.d.e\n",
+    "parenthesized": "from x import (\n    a,  # the first\n    b as c,\n)\nimport y\n",
+    "continuation": "from x import a, \\\n    b\nimport y, \\\n    z\n",
+    "semicolons": "import os; import sys\nx = 1; from json import loads\n",
+    "after_colon": "if True: import os\nclass A: from json import loads\n",
+    "function": "def load():\n    import yaml\n    from toml import load\n    return yaml, load\n",
+    "try_except": "try:\n    import ujson as json\nexcept ImportError:\n    import json\n",
+    "type_checking": "from typing import TYPE_CHECKING\nif TYPE_CHECKING:\n    from pandas import DataFrame\n",
+    "dynamic": "import importlib\nmod = importlib.import_module('plugin')\nother = __import__('legacy')\n",
+    "strings": "s = 'import fake'\nt = \"from fake import x\"\nu = '''\nimport fake_block\n'''\nimport real\n",
+    "docstring": '"""Usage:\n\nimport fake_doc\nfrom fake_doc import x\n"""\nimport real\n',
+    "comments": "# import fake_comment\nimport real  # from fake import x\n",
+    "escaped_quotes": "s = 'it\\'s \\\\'\nimport real\nt = \"\\\"import fake\\\"\"\n",
+    "names_containing_import": "reimport = 1\nimportant = reimport\nimport real\n",
+    "match": "match x:\n    case 1:\n        import one\n    case _:\n        from two import three\n",
+    "with_and_loops": "with open(p):\n    import a\nfor i in x:\n    import b\nelse:\n    import c\nwhile y:\n    import d\n",
+    "unicode": "import naïve\nfrom données import valeur\n",
+    "no_imports": "x = 1\n",
+    "first_line_no_newline": "import os",
+    "crlf": "import a\r\nfrom b import c\r\n",
+    "f_string": "s = f'{x} import fake'\nimport real\n",
+    "paren_in_comment": "from x import (a,  # closing ) here\n    b)\nfrom y import (c,  # opening ( here\n    d)\n",
+    "backslash_in_comment": "from x import a  # trailing \\\nimport y\n",
+}
+
+
+@pytest.mark.parametrize("name", sorted(AGREEMENT_CASES))
+def test_extractor_matches_a_full_ast_walk(name):
+    source = AGREEMENT_CASES[name]
+    assert get_imports_from_source(source) == reference_imports(source.encode("utf-8"))
+    assert get_imports_from_source(source.encode("utf-8")) == reference_imports(source.encode("utf-8"))
+
+
+@pytest.mark.parametrize("name", ["plain", "relative", "star", "depth", "parenthesized", "continuation", "strings",
+                                  "docstring", "comments", "escaped_quotes", "names_containing_import", "crlf",
+                                  "f_string", "paren_in_comment", "backslash_in_comment"])
+def test_plain_modules_skip_the_ast(name):
+    assert fast_imports(AGREEMENT_CASES[name]) is not None
+
+
+@pytest.mark.parametrize("name", ["semicolons", "after_colon", "function", "try_except", "type_checking",
+                                  "dynamic", "match", "with_and_loops"])
+def test_modules_the_line_patterns_cannot_read_fall_back_to_the_ast(name):
+    assert fast_imports(AGREEMENT_CASES[name]) is None
+
+
+def test_guarded_imports_are_reported_with_their_reason():
+    source = "\n".join([
+        "import os",
+        "try:",
+        "    import ujson",
+        "except ImportError:",
+        "    import simplejson",
+        "if TYPE_CHECKING:",
+        "    import pandas",
+        "if sys.platform == 'win32':",
+        "    import winreg",
+        "    import os",
+        "plugin = __import__('plugin')",
+    ])
+    imports, guarded = extract_imports(source)
+    assert imports == {"os", "ujson", "simplejson", "pandas", "winreg"}
+    assert guarded == {"ujson": "optional", "simplejson": "fallback", "pandas": "type_checking",
+                       "winreg": "conditional", "plugin": "dynamic"}
+
+
+def test_syntax_errors_are_only_reported_by_the_ast_tier():
+    with pytest.raises(SyntaxError):
+        ast_imports("import os\ndef broken(:\n")
+    with pytest.raises(SyntaxError):
+        extract_imports("def load():\n    import os\n  broken\n")
+
+
+def test_scan_prunes_virtualenvs_and_unparseable_files(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_text("import requests\n")
+    (tmp_path / "pkg" / "broken.py").write_text("def load():\n    import broken\n  oops\n")
+    (tmp_path / "env" / "lib").mkdir(parents=True)
+    (tmp_path / "env" / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    (tmp_path / "env" / "lib" / "site.py").write_text("import numpy\n")
+    assert scan_imports(str(tmp_path)) == {"requests"}
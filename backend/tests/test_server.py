@@ -0,0 +1,50 @@
+import json
+import time
+
+import pytest
+
+from autoreqpy import remote, server
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def test_batch_timeout_starts_when_a_repository_is_picked_up(client, monkeypatch):
+    def slow_analysis(repo_url, workspace, checkpoint):
+        time.sleep(0.3)
+        checkpoint()
+        return repo_url.rsplit("/", 1)[-1]
+
+    monkeypatch.setattr(remote, "analyze_repo", slow_analysis)
+    monkeypatch.setattr(server, "BATCH_REPO_TIMEOUT", 0.5)
+    urls = [f"https://github.com/owner/repo{i}" for i in range(4)]
+    # One worker: the last repository waits about 0.9s before it starts
+    response = client.post("/batch/", json={"github_urls": urls, "concurrency": 1})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert all("error" not in line for line in lines), lines
+    assert {line["requirements.txt"] for line in lines} == {f"repo{i}" for i in range(4)}
+
+
+def test_batch_repository_over_its_timeout_fails_alone(client, monkeypatch):
+    def analysis(repo_url, workspace, checkpoint):
+        if repo_url.endswith("slow"):
+            time.sleep(0.3)
+        checkpoint()
+        return "requests"
+
+    monkeypatch.setattr(remote, "analyze_repo", analysis)
+    monkeypatch.setattr(server, "BATCH_REPO_TIMEOUT", 0.2)
+    response = client.post("/batch/", json={"github_urls": ["https://github.com/o/slow", "https://github.com/o/fast"],
+                                            "concurrency": 2})
+    lines = {line["index"]: line for line in map(json.loads, response.get_data(as_text=True).splitlines())}
+    assert "timeout" in lines[0]["error"]
+    assert lines[1]["requirements.txt"] == "requests"
+
+
+def test_batch_rejects_invalid_input(client):
+    assert client.post("/batch/", json={"github_urls": []}).status_code == 400
+    response = client.post("/batch/", json={"github_urls": ["not a url"]})
+    assert "Invalid input" in json.loads(response.get_data(as_text=True))["error"]
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import pytest
+
+from autoreqpy import remote
+from autoreqpy.workspace import WorkspaceManager
+
+MiB = 1024 * 1024
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = WorkspaceManager(str(tmp_path / "disk"), tmpfs_dir=str(tmp_path / "tmpfs"),
+                               tmpfs_max_bytes=2 * 64 * MiB, tmpfs_workspace_bytes=64 * MiB, retry_delay=0.01)
+    yield manager
+    manager.shutdown()
+
+
+def _wait_deleted(path, timeout=5.0):
+    deadline = time.time() + timeout
+    while os.path.lexists(path):
+        assert time.time() < deadline, f"{path} was not deleted"
+        time.sleep(0.01)
+
+
+def test_tmpfs_reservations_fall_back_to_disk(manager, tmp_path):
+    first, second, third = (manager.create("repo") for _ in range(3))
+    assert first.on_tmpfs and second.on_tmpfs and not third.on_tmpfs
+    assert third.path.startswith(str(tmp_path / "disk"))
+    manager.release(first)
+    assert manager.create("repo").on_tmpfs
+
+
+def test_release_stops_processes_and_deletes_the_directory(manager):
+    workspace = manager.create("repo")
+    os.makedirs(os.path.join(workspace.path, "pkg"))
+    proc = workspace.popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    manager.release(workspace)
+    assert proc.poll() is not None
+    _wait_deleted(workspace.path)
+    assert manager.stats()["active"] == 0
+
+
+def test_tmpfs_workspace_clone_budget_is_capped_at_its_reservation(manager, monkeypatch):
+    monkeypatch.setattr(remote, "workspaces", manager)
+    monkeypatch.setitem(remote.BUDGET_LIMITS, "max_clone_bytes", 1024 * MiB)
+    on_tmpfs, _, on_disk = (manager.create("repo") for _ in range(3))
+    assert on_tmpfs.on_tmpfs and not on_disk.on_tmpfs
+    assert remote.new_budget(on_tmpfs).max_clone_bytes == 64 * MiB
+    assert remote.new_budget(on_disk).max_clone_bytes == 1024 * MiB
+    # A disabled limit is still capped on tmpfs
+    monkeypatch.setitem(remote.BUDGET_LIMITS, "max_clone_bytes", 0)
+    assert remote.new_budget(on_tmpfs).max_clone_bytes == 64 * MiB
+    monkeypatch.setattr(remote, "FETCH_MODE", "archive")
+    assert remote.new_budget(on_tmpfs).max_clone_bytes == 0
+
+
+def test_watch_clone_stops_a_clone_over_the_cap(manager, monkeypatch):
+    from autoreqpy.budgets import BudgetExceeded
+
+    monkeypatch.setattr(remote, "workspaces", manager)
+    watched = remote.new_budget(manager.create("a")).watch_clone()
+    watched("receiving", 10, 100, 32 * MiB)
+    with pytest.raises(BudgetExceeded):
+        watched("receiving", 20, 100, 65 * MiB)